@@ -1,6 +1,31 @@
 from django.apps import AppConfig
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
     verbose_name = 'виджеты'
+
+    def ready(self):
+        from core.auth import forget_user
+        from core.db import check_connections, configure_sqlite
+        from core.querycache import install_invalidation
+        from core.routers import (
+            install_write_tracking,
+            remember_replica_snapshot,
+            reopen_stale_replicas,
+        )
+
+        connection_created.connect(configure_sqlite)
+        connection_created.connect(remember_replica_snapshot)
+        connection_created.connect(install_invalidation)
+        connection_created.connect(install_write_tracking)
+        request_started.connect(check_connections)
+        request_started.connect(reopen_stale_replicas)
+        post_save.connect(forget_user, sender=get_user_model())
+        post_delete.connect(forget_user, sender=get_user_model())
+        user_logged_out.connect(forget_user)
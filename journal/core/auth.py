@@ -0,0 +1,75 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY,
+    HASH_SESSION_KEY,
+    SESSION_KEY,
+)
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+
+def version_key(user_id):
+    return f'authuser:version:{user_id}'
+
+
+def user_version(user_id):
+    """Версия пользователя; меняется при каждом сохранении и выходе."""
+    key = version_key(user_id)
+    cache.add(key, uuid.uuid4().hex, None)
+    return cache.get(key)
+
+
+def forget_user(sender, instance=None, user=None, **kwargs):
+    """Сбрасывает снимки пользователя во всех сессиях.
+
+    Подключается к post_save и post_delete модели пользователя
+    и к user_logged_out в CoreConfig.ready().
+    """
+    user = instance or user
+    if user is not None and user.pk is not None:
+        cache.set(version_key(user.pk), uuid.uuid4().hex, None)
+
+
+def get_cached_user(request):
+    """Пользователь сессии из кеша, при промахе — auth.get_user().
+
+    Ключ включает id пользователя, бэкенд, хеш пароля из сессии и версию
+    пользователя. auth.get_user() проверяет этот хеш и при расхождении
+    завершает сессию; пока версия не изменилась, повторная проверка дала
+    бы тот же результат, поэтому её можно брать из кеша.
+    """
+    if not hasattr(request, '_cached_user'):
+        session = request.session
+        try:
+            user_id = session[SESSION_KEY]
+            backend = session[BACKEND_SESSION_KEY]
+            session_hash = session[HASH_SESSION_KEY]
+        except KeyError:
+            request._cached_user = auth.get_user(request)
+            return request._cached_user
+        fingerprint = hashlib.sha256(
+            f'{user_id}:{backend}:{session_hash}'.encode(),
+        ).hexdigest()
+        key = f'authuser:{fingerprint}:{user_version(user_id)}'
+        user = cache.get(key)
+        if user is None:
+            user = auth.get_user(request)
+            if user.is_authenticated:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        request._cached_user = user
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware без запроса пользователя к базе на каждой
+    странице.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# busy_timeout идёт первым, чтобы смена journal_mode ждала чужие блокировки.
+DEFAULT_PRAGMAS = {
+    'busy_timeout': 5000,
+    # Действует только для новой базы; см. sqlite_maintenance vacuum.
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,  # В КиБ, если значение отрицательное.
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def get_pragmas(settings_dict=None):
+    """PRAGMA по умолчанию с переопределениями из SQLITE_PRAGMAS
+    и ключа PRAGMAS настроек конкретной базы.
+    """
+    return {
+        **DEFAULT_PRAGMAS,
+        **settings.SQLITE_PRAGMAS,
+        **(settings_dict or {}).get('PRAGMAS', {}),
+    }
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        if value is not None:
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение с SQLite.
+
+    Подключается к сигналу connection_created в CoreConfig.ready().
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, get_pragmas(connection.settings_dict))
+
+
+def check_connections(**kwargs):
+    """Закрывает сломанные постоянные соединения перед запросом.
+
+    При CONN_MAX_AGE > 0 соединение живёт между запросами, и если файл базы
+    подменили или диск отвалился, ошибку получил бы уже пользователь.
+    """
+    for conn in connections.all():
+        if conn.connection is None or conn.vendor != 'sqlite':
+            continue
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except DatabaseError:
+            conn.close()
+
+
+def online_backup(path, using=DEFAULT_DB_ALIAS):
+    """Снимает копию базы онлайн-бэкапом SQLite и подменяет ею ``path``.
+
+    Копия снимается за один шаг в одной читающей транзакции. Порционный
+    бэкап начинается заново после каждой записи другого соединения и при
+    постоянных записях может не закончиться никогда, а в режиме WAL
+    читающая транзакция писателям не мешает. Копия собирается во
+    временном файле рядом с ``path``: открытые читатели дочитывают
+    старый файл. mtime копии — момент начала снимка.
+
+    Returns:
+    Момент начала снимка.
+    """
+    params = connections[using].get_connection_params()
+    source = sqlite3.connect(
+        params['database'],
+        uri=params.get('uri', False),
+        timeout=30,
+    )
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)),
+        suffix='.tmp',
+    )
+    os.close(descriptor)
+    snapshot_at = time.time()
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target)
+            # Копия открывается только на чтение: WAL ей не нужен.
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+        os.utime(temp_path, (snapshot_at, snapshot_at))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    finally:
+        source.close()
+    return snapshot_at
@@ -0,0 +1,94 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.http import Http404
+
+MISSING = 'missing'
+
+
+class IdentityCache:
+    """Кеш поиска объекта по уникальному полю: пользователя по username,
+    группы по slug.
+
+    Найденный объект хранится IDENTITY_CACHE_TIMEOUT секунд, отсутствие
+    объекта — IDENTITY_MISS_TIMEOUT, чтобы перебор несуществующих адресов
+    не стоил запроса каждый раз. Сохранение, переименование и удаление
+    через ORM (в том числе из админки) сбрасывают кеш по сигналам;
+    QuerySet.update() сигналов не шлёт.
+    """
+
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+
+    @property
+    def prefix(self):
+        return f'identity:{self.model._meta.label_lower}:{self.field}'
+
+    def key(self, value):
+        # Значение хешируется: в username бывают символы, недопустимые
+        # в ключах memcached.
+        digest = hashlib.md5(str(value).encode()).hexdigest()
+        return f'{self.prefix}:{digest}'
+
+    def get(self, value):
+        """Объект по значению поля или None."""
+        key = self.key(value)
+        instance = cache.get(key)
+        if instance == MISSING:
+            return None
+        if instance is not None:
+            return instance
+        # Из основной базы: объект из отстающей реплики застрял бы в кеше.
+        instance = (
+            self.model._default_manager.db_manager(DEFAULT_DB_ALIAS)
+            .filter(**{self.field: value})
+            .first()
+        )
+        if instance is None:
+            cache.set(key, MISSING, settings.IDENTITY_MISS_TIMEOUT)
+        else:
+            cache.set(key, instance, settings.IDENTITY_CACHE_TIMEOUT)
+        return instance
+
+    def get_or_404(self, value):
+        instance = self.get(value)
+        if instance is None:
+            raise Http404(
+                f'{self.model._meta.verbose_name} {value} не найден(а).',
+            )
+        return instance
+
+    def connect(self):
+        """Подключает сброс кеша к сигналам модели; из AppConfig.ready()."""
+        uid = self.prefix
+        pre_save.connect(
+            self.remember_old_value,
+            sender=self.model,
+            dispatch_uid=uid,
+        )
+        post_save.connect(self.forget, sender=self.model, dispatch_uid=uid)
+        post_delete.connect(self.forget, sender=self.model, dispatch_uid=uid)
+
+    def remember_old_value(self, sender, instance, update_fields=None, **kw):
+        """Запоминает прежнее значение поля, чтобы сбросить его при
+        переименовании.
+        """
+        if instance.pk is None or (
+            update_fields is not None and self.field not in update_fields
+        ):
+            return
+        instance._identity_old_values = set(
+            self.model._default_manager.filter(pk=instance.pk).values_list(
+                self.field,
+                flat=True,
+            ),
+        )
+
+    def forget(self, sender, instance, **kwargs):
+        values = {getattr(instance, self.field)}
+        values.update(getattr(instance, '_identity_old_values', ()))
+        cache.delete_many([self.key(value) for value in values])
@@ -0,0 +1,91 @@
+import logging
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import TemplateDoesNotExist, defaultfilters
+from django.template.backends.jinja2 import Jinja2
+from django.templatetags.static import static
+from django.urls import reverse
+from jinja2 import Environment
+from markupsafe import Markup
+from sorl.thumbnail import get_thumbnail
+
+from core.templatetags.user_filters import addclass
+
+logger = logging.getLogger(__name__)
+
+
+class Jinja2Backend(Jinja2):
+    """Jinja2 только для шаблонов из JINJA2_TEMPLATES.
+
+    Остальные шаблоны этот бэкенд не находит, и их рендерит следующий
+    в TEMPLATES — шаблонизатор Django. Так движок выбирается
+    для каждого шаблона отдельно, а включения внутри шаблона Jinja2
+    берутся из его же каталога.
+    """
+
+    def get_template(self, template_name):
+        if template_name not in settings.JINJA2_TEMPLATES:
+            raise TemplateDoesNotExist(template_name, backend=self)
+        return self.load(template_name)
+
+    def load(self, template_name):
+        """Шаблон Jinja2 в обход переключателя, для бенчмарка."""
+        return super().get_template(template_name)
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args or None, kwargs=kwargs or None)
+
+
+def thumbnail(file, geometry, **options):
+    """Миниатюра как у тега thumbnail из sorl или None.
+
+    Как и тег, ошибки не ломают страницу, пока не включён
+    THUMBNAIL_DEBUG.
+    """
+    if not file:
+        return None
+    try:
+        return get_thumbnail(file, geometry, **options)
+    except Exception:
+        if getattr(settings, 'THUMBNAIL_DEBUG', False):
+            raise
+        logger.exception('Не удалось сделать миниатюру %s', file)
+        return None
+
+
+def cache(timeout, fragment_name, *vary_on, caller):
+    """Аналог тега cache: ``{% call cache(20, 'name', key) %}``.
+
+    Ключ тот же, что у тега, так что фрагмент, закешированный одним
+    движком, отдаётся и другим.
+    """
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = caches['default']
+    key = make_template_fragment_key(fragment_name, vary_on)
+    value = fragment_cache.get(key)
+    if value is None:
+        value = caller()
+        fragment_cache.set(key, value, timeout)
+    return Markup(value)
+
+
+def environment(**options):
+    env = Environment(**options)
+    env.globals.update(
+        url=url,
+        static=static,
+        thumbnail=thumbnail,
+        cache=cache,
+    )
+    env.filters.update(
+        addclass=addclass,
+        date=defaultfilters.date,
+        linebreaksbr=defaultfilters.linebreaksbr,
+        truncatechars=defaultfilters.truncatechars,
+    )
+    return env
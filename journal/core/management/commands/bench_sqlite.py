@@ -0,0 +1,107 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.db import apply_pragmas, get_pragmas
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite с настройками по умолчанию '
+        'и с профилем из core.db на смешанной нагрузке из нескольких потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument(
+            '--writes',
+            type=float,
+            default=0.2,
+            help='Доля запросов, которые пишут в базу.',
+        )
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('по умолчанию', {}, False),
+            ('core.db', get_pragmas(), True),
+        )
+        for title, pragmas, persistent in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                elapsed, errors = self.run(path, pragmas, persistent, options)
+            total = options['threads'] * options['requests']
+            self.stdout.write(
+                f'{title}: {total / elapsed:.0f} запросов/с, '
+                f'ошибок блокировки: {errors}',
+            )
+
+    def run(self, path, pragmas, persistent, options):
+        self.prepare(path, pragmas)
+        writes = options['writes']
+        every = max(1, round(1 / writes)) if writes else 0
+        errors = []
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(path, pragmas, persistent, every, options, errors),
+            )
+            for _ in range(options['threads'])
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, sum(errors)
+
+    def prepare(self, path, pragmas):
+        setup = sqlite3.connect(path)
+        apply_pragmas(setup, pragmas)
+        setup.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, ts REAL)',
+        )
+        setup.executemany(
+            'INSERT INTO post (text, ts) VALUES (?, ?)',
+            (('x' * 200, time.time()) for _ in range(5000)),
+        )
+        setup.commit()
+        setup.close()
+
+    def worker(self, path, pragmas, persistent, every, options, errors):
+        """Поток нагрузки: чтение ленты и каждый every-й запрос — запись.
+
+        Без persistent соединение открывается на каждый запрос, как
+        у Django с CONN_MAX_AGE = 0.
+        """
+        conn = None
+        failed = 0
+        for number in range(options['requests']):
+            if conn is None:
+                conn = sqlite3.connect(path, timeout=5)
+                apply_pragmas(conn, pragmas)
+            try:
+                self.request(conn, every and number % every == 0)
+            except sqlite3.OperationalError:
+                failed += 1
+            if not persistent:
+                conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+        errors.append(failed)
+
+    def request(self, conn, write):
+        conn.execute(
+            'SELECT id, text FROM post ORDER BY id DESC LIMIT 10',
+        ).fetchall()
+        if write:
+            with conn:
+                conn.execute(
+                    'INSERT INTO post (text, ts) VALUES (?, ?)',
+                    ('y' * 200, time.time()),
+                )
@@ -0,0 +1,44 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет просроченные сессии небольшими пачками, не блокируя '
+        'запись в базу надолго.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.SESSION_CLEANUP_CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Пауза между пачками в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=now).values_list(
+                    'session_key',
+                    flat=True,
+                )[: options['chunk_size']],
+            )
+            if not keys:
+                break
+            Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(f'Удалено сессий: {deleted}')
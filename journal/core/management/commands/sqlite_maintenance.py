@@ -0,0 +1,135 @@
+import glob
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import online_backup
+
+TASKS = ('backup', 'analyze', 'vacuum', 'check')
+
+# Значение PRAGMA auto_vacuum, при котором работает incremental_vacuum.
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживание SQLite без остановки сайта: онлайн-бэкап, ANALYZE, '
+        'incremental_vacuum и проверка целостности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tasks',
+            nargs='*',
+            help=f'Что выполнить из {", ".join(TASKS)}; по умолчанию всё.',
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help='Повторять каждые N секунд; 0 — выполнить один раз.',
+        )
+        parser.add_argument(
+            '--full-check',
+            action='store_true',
+            help='integrity_check вместо более быстрого quick_check.',
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            raise CommandError('Нельзя обслуживать базу внутри транзакции.')
+        tasks = options['tasks'] or TASKS
+        unknown = set(tasks) - set(TASKS)
+        if unknown:
+            raise CommandError(f'Неизвестные задачи: {", ".join(unknown)}')
+        while True:
+            problems = []
+            for task in TASKS:
+                if task not in tasks:
+                    continue
+                started = time.monotonic()
+                if task == 'check':
+                    problems = self.check(options['full_check'])
+                else:
+                    getattr(self, task)()
+                self.stdout.write(
+                    f'{task}: {time.monotonic() - started:.2f} с',
+                )
+            if problems:
+                raise CommandError(
+                    'База повреждена:\n' + '\n'.join(problems),
+                )
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def backup(self):
+        """Снимок в SQLITE_BACKUP_DIR; хранятся последние
+        SQLITE_BACKUP_KEEP, каждый проверяется quick_check.
+        """
+        os.makedirs(settings.SQLITE_BACKUP_DIR, exist_ok=True)
+        path = os.path.join(
+            settings.SQLITE_BACKUP_DIR,
+            time.strftime('db-%Y%m%d-%H%M%S.sqlite3'),
+        )
+        online_backup(path)
+        backup = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            result = backup.execute('PRAGMA quick_check').fetchone()[0]
+        finally:
+            backup.close()
+        if result != 'ok':
+            os.remove(path)
+            raise CommandError(f'Бэкап не прошёл проверку: {result}')
+        self.stdout.write(path)
+
+        pattern = os.path.join(settings.SQLITE_BACKUP_DIR, 'db-*.sqlite3')
+        backups = sorted(glob.glob(pattern))
+        for old in backups[: -settings.SQLITE_BACKUP_KEEP]:
+            os.remove(old)
+
+    def analyze(self):
+        """Обновляет статистику планировщика.
+
+        analysis_limit ограничивает число строк, которые ANALYZE читает
+        из каждого индекса, так что время не растёт вместе с таблицами.
+        """
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                f'PRAGMA analysis_limit = {settings.SQLITE_ANALYSIS_LIMIT}',
+            )
+            cursor.execute('ANALYZE')
+
+    def vacuum(self):
+        """Возвращает системе до SQLITE_VACUUM_PAGES свободных страниц."""
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute('PRAGMA auto_vacuum')
+            if cursor.fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+                self.stdout.write(
+                    'incremental_vacuum пропущен: база создана без '
+                    'auto_vacuum = INCREMENTAL. Включить его можно один раз '
+                    'вне часов нагрузки: PRAGMA auto_vacuum = INCREMENTAL; '
+                    'VACUUM;',
+                )
+                return
+            cursor.execute('PRAGMA freelist_count')
+            free = cursor.fetchone()[0]
+            cursor.execute(
+                f'PRAGMA incremental_vacuum({settings.SQLITE_VACUUM_PAGES})',
+            )
+            cursor.fetchall()
+        self.stdout.write(
+            f'свободных страниц было: {free}, '
+            f'освобождено не больше {settings.SQLITE_VACUUM_PAGES}',
+        )
+
+    def check(self, full):
+        pragma = 'integrity_check' if full else 'quick_check'
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'PRAGMA {pragma}')
+            rows = [row[0] for row in cursor.fetchall()]
+        return [] if rows == ['ok'] else rows
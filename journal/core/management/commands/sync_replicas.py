@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.db import online_backup
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет локальные реплики для чтения онлайн-бэкапом SQLite '
+        'из основной базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.REPLICA_SYNC_INTERVAL,
+            help='Повторять каждые N секунд; 0 — обновить один раз.',
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            raise CommandError('Нельзя снимать реплику внутри транзакции.')
+        while True:
+            started = time.monotonic()
+            for path in settings.DATABASE_REPLICAS:
+                self.sync(path)
+            self.stdout.write(
+                f'Реплик обновлено: {len(settings.DATABASE_REPLICAS)} '
+                f'за {time.monotonic() - started:.2f} с',
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, path):
+        """Обновляет реплику целиком; mtime файла — момент снимка."""
+        online_backup(path)
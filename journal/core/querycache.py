@@ -0,0 +1,211 @@
+import contextlib
+import hashlib
+import re
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models, transaction
+
+from core.routers import snapshot_of
+
+KEY_PREFIX = 'querycache'
+
+READ_TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+"(\w+)"', re.IGNORECASE)
+WRITE_TABLE_RE = re.compile(
+    r'^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE|'
+    r'DELETE\s+FROM)\s+"?(\w+)"?',
+    re.IGNORECASE,
+)
+
+
+def get_cache():
+    return caches[settings.QUERY_CACHE_ALIAS]
+
+
+def version_key(table):
+    return f'{KEY_PREFIX}:version:{table}'
+
+
+def table_versions(tables):
+    """Текущие версии таблиц; недостающие заводятся заново.
+
+    Новая версия — случайный токен, а не 0: иначе после вытеснения ключа
+    из кеша ожили бы записи, сохранённые при старой нулевой версии.
+    """
+    cache = get_cache()
+    keys = {version_key(table): table for table in tables}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, uuid.uuid4().hex, None)
+        found[key] = cache.get(key)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def invalidate_tables(*tables):
+    """Сбрасывает закешированные результаты запросов к таблицам.
+
+    Записи через ORM сбрасывают кеш сами; вызывать это нужно после
+    записи в обход соединений Django.
+    """
+    get_cache().set_many(
+        {version_key(table): uuid.uuid4().hex for table in tables},
+        None,
+    )
+
+
+def dirty_tables(connection):
+    """Таблицы, изменённые в ещё не зафиксированной транзакции."""
+    if not connection.in_atomic_block:
+        connection.querycache_dirty = set()
+    return getattr(connection, 'querycache_dirty', set())
+
+
+def invalidate_on_write(execute, sql, params, many, context):
+    """execute_wrapper соединения: запись в таблицу меняет её версию.
+
+    Версия меняется сразу — чтобы никто не прочитал из кеша данные
+    до записи — и ещё раз после фиксации: чтение, успевшее между ними
+    закешировать незафиксированное состояние, станет недействительным.
+    Пока транзакция открыта, запросы к изменённым таблицам идут мимо кеша.
+    """
+    match = WRITE_TABLE_RE.match(sql)
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        # И после неудачной записи: лишний сброс кеша безвреден.
+        if match:
+            table_written(context['connection'], match.group(1))
+
+
+def table_written(connection, table):
+    invalidate_tables(table)
+    dirty = dirty_tables(connection)
+    if connection.in_atomic_block and table not in dirty:
+        dirty.add(table)
+        transaction.on_commit(
+            lambda: invalidate_tables(table),
+            using=connection.alias,
+        )
+
+
+def install_invalidation(sender, connection, **kwargs):
+    """Подключается к сигналу connection_created в CoreConfig.ready()."""
+    if invalidate_on_write not in connection.execute_wrappers:
+        connection.execute_wrappers.append(invalidate_on_write)
+
+
+@contextlib.contextmanager
+def record_tables(connection):
+    """Собирает таблицы, которые читают запросы внутри блока."""
+    tables = set()
+
+    def record(execute, sql, params, many, context):
+        tables.update(READ_TABLE_RE.findall(sql))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        yield tables
+
+
+class CachedQuerySet(models.QuerySet):
+    """QuerySet, результаты которого можно кешировать вызовом cached().
+
+    Ключ — собранный SQL с параметрами. Таблицы, которые прочитал запрос
+    вместе с select_related и prefetch_related, запоминаются при первом
+    выполнении; результат сохраняется со следующего раза вместе с
+    версиями этих таблиц и выдаётся, пока версии не изменились.
+    """
+
+    cache_timeout = None
+
+    def cached(self, timeout=None):
+        clone = self._chain()
+        clone.cache_timeout = timeout or settings.QUERY_CACHE_TIMEOUT
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone.cache_timeout = self.cache_timeout
+        return clone
+
+    def _fetch_all(self):
+        if self.cache_timeout is None or self._result_cache is not None:
+            return super()._fetch_all()
+
+        def fetch():
+            super(CachedQuerySet, self)._fetch_all()
+            return self._result_cache
+
+        self._result_cache = self.cache_lookup('rows', fetch)
+        self._prefetch_done = True
+        return None
+
+    def count(self):
+        if self.cache_timeout is None or self._result_cache is not None:
+            return super().count()
+        return self.cache_lookup('count', super().count)
+
+    def exists(self):
+        if self.cache_timeout is None or self._result_cache is not None:
+            return super().exists()
+        return self.cache_lookup('exists', super().exists)
+
+    def cache_key(self, kind):
+        try:
+            sql, params = self.query.get_compiler(using=self.db).as_sql()
+        except EmptyResultSet:
+            return None
+        path = connections[self.db].settings_dict.get('REPLICA_PATH')
+        signature = repr((
+            self.db,
+            path and snapshot_of(self.db, path),
+            kind,
+            sql,
+            params,
+            self._iterable_class.__name__,
+            [
+                getattr(lookup, 'prefetch_to', lookup)
+                for lookup in self._prefetch_related_lookups
+            ],
+        ))
+        digest = hashlib.sha1(signature.encode()).hexdigest()
+        return f'{KEY_PREFIX}:{digest}'
+
+    def cache_lookup(self, kind, compute):
+        key = self.cache_key(kind)
+        if key is None:
+            return compute()
+        cache = get_cache()
+        connection = connections[self.db]
+        dirty = dirty_tables(connection)
+        entry = cache.get(key) or {}
+        tables = entry.get('tables')
+        versions = table_versions(tables) if tables else None
+        if (
+            'result' in entry
+            and entry['versions'] == versions
+            and not dirty.intersection(tables)
+        ):
+            return entry['result']
+
+        with record_tables(connection) as touched:
+            result = compute()
+        if dirty.intersection(touched):
+            return result
+        if versions is not None and touched == set(tables):
+            # Версии прочитаны до запроса: запись во время него
+            # сделает сохранённый результат недействительным.
+            entry = {'tables': tables, 'versions': versions, 'result': result}
+        else:
+            entry = {'tables': sorted(touched)}
+        cache.set(key, entry, self.cache_timeout)
+        return result
+
+
+class CachedManager(models.Manager.from_queryset(CachedQuerySet)):
+    """Менеджер, у которого кешируются все запросы."""
+
+    def get_queryset(self):
+        return super().get_queryset().cached()
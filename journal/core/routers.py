@@ -0,0 +1,183 @@
+import functools
+import os
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+PIN_COOKIE = 'pin_primary'
+
+WRITE_SQL_RE = re.compile(r'^\s*(?:INSERT|REPLACE|UPDATE|DELETE)\b', re.I)
+
+_state = threading.local()
+
+
+def replica_paths():
+    """Псевдонимы реплик и пути к их файлам."""
+    return {
+        alias: options['REPLICA_PATH']
+        for alias, options in settings.DATABASES.items()
+        if 'REPLICA_PATH' in options
+    }
+
+
+def synced_at(path):
+    """Момент снимка основной базы, из которого собрана реплика.
+
+    sync_replicas ставит его файлу реплики как mtime.
+    """
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0
+
+
+def snapshot_of(alias, path):
+    """Снимок, который прочитает соединение с репликой."""
+    conn = connections[alias]
+    if conn.connection is not None:
+        return getattr(conn, 'replica_synced_at', 0)
+    return synced_at(path)
+
+
+def replica_reads(view):
+    """Разрешает представлению читать ленту из реплик."""
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        _state.feed = True
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _state.feed = False
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Отправляет чтение ленты на локальные реплики, запись — в основную базу.
+
+    В реплики уходят только модели из REPLICA_MODELS и только внутри
+    представлений с @replica_reads. Реплика выбирается, лишь если её снимок
+    снят позже последней записи пользователя (PrimaryPinMiddleware), так
+    что свои изменения пользователь видит сразу, как бы редко ни
+    обновлялись реплики. Чтение внутри транзакции остаётся в основной базе.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            not getattr(_state, 'feed', False)
+            or model._meta.label_lower not in settings.REPLICA_MODELS
+            or transaction.get_connection().in_atomic_block
+        ):
+            return None
+        last_write = getattr(_state, 'last_write', 0)
+        fresh = [
+            alias
+            for alias, path in replica_paths().items()
+            if snapshot_of(alias, path) > last_write
+        ]
+        if not fresh:
+            return None
+        return random.choice(fresh)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class PrimaryPinMiddleware:
+    """Запоминает момент последней записи пользователя.
+
+    Запрос, который записал в основную базу, — небезопасный или GET,
+    пишущий по ходу дела, — ставит cookie со временем записи; пока
+    реплика не обновится после этого момента, чтение идёт из основной
+    базы. Срок cookie REPLICA_PIN_MAX_SECONDS должен быть больше
+    интервала sync_replicas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+        try:
+            last_write = float(request.COOKIES.get(PIN_COOKIE, 0))
+        except ValueError:
+            last_write = 0
+        # Сам пишущий запрос целиком читает из основной базы.
+        _state.last_write = float('inf') if writes else last_write
+        _state.wrote = writes
+        _state.in_request = True
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.last_write = 0
+            _state.wrote = _state.in_request = False
+        if wrote and replica_paths():
+            # Время ставится после ответа, когда запись уже зафиксирована.
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time()),
+                max_age=settings.REPLICA_PIN_MAX_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+def note_write():
+    """Отмечает, что текущий запрос сайта записал в основную базу.
+
+    Остаток запроса читает только из основной базы, а ответ получит
+    cookie PrimaryPinMiddleware. Вне запроса ничего не делает.
+    """
+    if getattr(_state, 'in_request', False):
+        _state.wrote = True
+        _state.last_write = float('inf')
+
+
+def track_writes(execute, sql, params, many, context):
+    """execute_wrapper основной базы: замечает запись в запросе."""
+    if WRITE_SQL_RE.match(sql):
+        note_write()
+    return execute(sql, params, many, context)
+
+
+def install_write_tracking(sender, connection, **kwargs):
+    """Подключается к сигналу connection_created в CoreConfig.ready()."""
+    if (
+        connection.alias == DEFAULT_DB_ALIAS
+        and track_writes not in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(track_writes)
+
+
+def remember_replica_snapshot(sender, connection, **kwargs):
+    """Отмечает, с какого снимка открыто соединение с репликой."""
+    path = connection.settings_dict.get('REPLICA_PATH')
+    if path:
+        connection.replica_synced_at = synced_at(path)
+
+
+def reopen_stale_replicas(**kwargs):
+    """Закрывает постоянные соединения со старыми снимками реплик.
+
+    sync_replicas подменяет файл целиком, а открытое соединение продолжает
+    читать прежний файл, пока его не переоткрыть.
+    """
+    for alias, path in replica_paths().items():
+        conn = connections[alias]
+        if conn.connection is None:
+            continue
+        if getattr(conn, 'replica_synced_at', 0) < synced_at(path):
+            conn.close()
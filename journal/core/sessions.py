@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import (
+    SessionStore as CachedDBStore,
+)
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.utils import timezone
+
+
+class SessionStore(CachedDBStore):
+    """Сессии из кеша с базой как запасным хранилищем.
+
+    В отличие от cached_db, сессия записывается в базу, только если её
+    данные изменились или с прошлой записи прошло больше
+    SESSION_REFRESH_INTERVAL секунд. Поэтому SESSION_SAVE_EVERY_REQUEST
+    почти ничего не стоит: срок cookie продлевается на каждом ответе,
+    а срок строки в базе — не чаще раза за интервал.
+    """
+
+    cache_key_prefix = 'core.sessions'
+
+    def load(self):
+        try:
+            entry = self._cache.get(self.cache_key)
+        except Exception:
+            # Как в cached_db: недопустимый ключ сбрасывает сессию.
+            entry = None
+
+        if entry is None:
+            session = self._get_session_from_db()
+            if session is None:
+                self.stored = None
+                return {}
+            entry = (self.decode(session.session_data), session.expire_date)
+            self._cache.set(
+                self.cache_key,
+                entry,
+                self.get_expiry_age(expiry=session.expire_date),
+            )
+        data, expire_date = entry
+        self.stored = (self.serializer().dumps(data), expire_date)
+        return data
+
+    def is_unchanged(self):
+        """Данные те же, что в базе, и срок строки ещё не пора продлевать."""
+        stored = getattr(self, 'stored', None)
+        if stored is None or self.session_key is None:
+            return False
+        serialized, expire_date = stored
+        if self.serializer().dumps(self._session) != serialized:
+            return False
+        saved_at = expire_date - timedelta(seconds=self.get_expiry_age())
+        refresh_after = timedelta(seconds=settings.SESSION_REFRESH_INTERVAL)
+        return timezone.now() < saved_at + refresh_after
+
+    def save(self, must_create=False):
+        if not must_create and self.is_unchanged():
+            return
+        DBStore.save(self, must_create)
+        expire_date = self.get_expiry_date()
+        self._cache.set(
+            self.cache_key,
+            (self._session, expire_date),
+            self.get_expiry_age(),
+        )
+        self.stored = (self.serializer().dumps(self._session), expire_date)
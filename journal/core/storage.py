@@ -0,0 +1,79 @@
+import os
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+
+def shard_parts():
+    """Случайные шестнадцатеричные префиксы, по одному на уровень.
+
+    Имя файла присылает клиент, и у мобильных браузеров это почти всегда
+    ``image.jpg``, поэтому шард берётся из uuid, а не из имени.
+    """
+    digest = uuid.uuid4().hex
+    width = settings.MEDIA_SHARD_WIDTH
+    return [
+        digest[level * width:(level + 1) * width]
+        for level in range(settings.MEDIA_SHARD_DEPTH)
+    ]
+
+
+def shard_name(name):
+    """Раскладывает файл по случайным подкаталогам.
+
+    ``posts/cat.jpg`` -> ``posts/3b/a1/cat.jpg``.
+    """
+    dirname, filename = posixpath.split(name)
+    return posixpath.join(dirname, *shard_parts(), filename)
+
+
+def is_sharded(name):
+    """Проверяет, лежит ли файл уже в шардированном подкаталоге."""
+    parts = name.split('/')[:-1]
+    depth = settings.MEDIA_SHARD_DEPTH
+    if len(parts) < depth:
+        return False
+    width = settings.MEDIA_SHARD_WIDTH
+    return all(
+        len(part) == width and all(char in '0123456789abcdef' for char in part)
+        for part in parts[-depth:]
+    )
+
+
+class ShardedFileSystemStorage(FileSystemStorage):
+    """Хранилище, раскладывающее загрузки по двухуровневым подкаталогам.
+
+    Плоский ``MEDIA_ROOT/posts/`` с миллионами файлов замедляет поиск
+    в каталоге, бэкапы и проверки существования файла.
+    """
+
+    def generate_filename(self, filename):
+        return super().generate_filename(shard_name(filename))
+
+
+def iter_files_sorted(storage, top):
+    """Обходит файлы каталога хранилища в порядке сравнения строк.
+
+    Порядок совпадает с ``ORDER BY`` по имени файла в SQLite, поэтому
+    результат можно сливать с отсортированной выборкой из базы. В памяти
+    держится только листинг одного каталога на каждом уровне.
+
+    Yields:
+    Пары (имя файла относительно хранилища, время изменения).
+    """
+    root = storage.path(top)
+    if not os.path.isdir(root):
+        return
+    with os.scandir(root) as entries:
+        listing = sorted(
+            (entry.name + '/' if entry.is_dir() else entry.name, entry)
+            for entry in entries
+        )
+    for key, entry in listing:
+        name = posixpath.join(top, entry.name)
+        if key.endswith('/'):
+            yield from iter_files_sorted(storage, name)
+        else:
+            yield name, entry.stat().st_mtime
@@ -1,4 +1,41 @@
-from django.test import Client, TestCase
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import (
+    Client,
+    RequestFactory,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core import routers
+from core.routers import PIN_COOKIE, PrimaryPinMiddleware, ReplicaRouter
+from core.sessions import SessionStore
+from core.writer import WriteQueue, WriteTimeout, run_write, writer
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +45,474 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ServeMediaTest(TestCase):
+    content = b'0123456789'
+    hashed_name = 'cache/ab/cd/' + 'a' * 32 + '.jpg'
+    hash_like_upload = 'posts/ab/cd/' + 'b' * 32 + '.jpg'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in (
+            'posts/pic.gif',
+            'private/doc.txt',
+            cls.hashed_name,
+            cls.hash_like_upload,
+        ):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(cls.content)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_full_response(self):
+        """Файл отдаётся целиком с валидаторами кеша."""
+        response = self.client.get('/media/posts/pic.gif')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('ETag', response)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_range_request(self):
+        """Запрос диапазона возвращает 206 и нужные байты."""
+        response = self.client.get(
+            '/media/posts/pic.gif',
+            HTTP_RANGE='bytes=2-5',
+        )
+        self.assertEqual(response.status_code, HTTPStatus.PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(response['Content-Length'], '4')
+
+        response = self.client.get(
+            '/media/posts/pic.gif',
+            HTTP_RANGE='bytes=20-',
+        )
+        self.assertEqual(
+            response.status_code,
+            HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+        )
+        self.assertNotIn('Cache-Control', response)
+        self.assertNotIn('ETag', response)
+
+    def test_conditional_request(self):
+        """Совпавший ETag даёт 304 без тела."""
+        etag = self.client.get('/media/posts/pic.gif')['ETag']
+        response = self.client.get(
+            '/media/posts/pic.gif',
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_hashed_name_is_immutable(self):
+        """Файлы с хешем в имени кешируются навсегда."""
+        response = self.client.get('/media/' + self.hashed_name)
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_hash_like_upload_is_not_immutable(self):
+        """Загрузка с похожим на хеш именем не кешируется навсегда."""
+        response = self.client.get('/media/' + self.hash_like_upload)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    @override_settings(MEDIA_ACCEL_HEADER='X-Accel-Redirect')
+    def test_accel_redirect(self):
+        """Передача файла отдаётся фронтовому веб-серверу."""
+        response = self.client.get('/media/posts/pic.gif')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            settings.MEDIA_ACCEL_PREFIX + 'posts/pic.gif',
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_forbidden_paths(self):
+        """Закрытые каталоги и выход за MEDIA_ROOT дают 404."""
+        for url in ('/media/private/doc.txt', '/media/../manage.py'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class SqliteProfileTest(TestCase):
+    def test_pragmas_applied(self):
+        """Соединение настроено по профилю из core.db."""
+        expected = {
+            'busy_timeout': 5000,
+            'synchronous': 1,
+            'temp_store': 2,
+            'cache_size': -64 * 1024,
+        }
+        with connection.cursor() as cursor:
+            for name, value in expected.items():
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+    def test_benchmark_command(self):
+        """Бенчмарк выводит результат для обоих профилей."""
+        out = StringIO()
+        call_command('bench_sqlite', threads=2, requests=5, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+@override_settings(SQLITE_WRITE_QUEUE=True)
+class WriteQueueTest(TransactionTestCase):
+    def test_writes_visible_after_result(self):
+        """После результата запись писателя видна вызывающему."""
+        user = run_write(User.objects.create_user, username='Batman')
+        self.assertTrue(User.objects.filter(pk=user.pk).exists())
+
+    def test_failure_isolated_in_batch(self):
+        """Ошибка одной записи не откатывает остальные в пачке."""
+        queue = WriteQueue()
+
+        def fail():
+            User.objects.create_user(username='Joker')
+            raise ValueError('boom')
+
+        futures = [
+            queue.submit(User.objects.create_user, username='Robin'),
+            queue.submit(fail),
+            queue.submit(User.objects.create_user, username='Alfred'),
+        ]
+        self.assertEqual(futures[0].result(timeout=5).username, 'Robin')
+        with self.assertRaises(ValueError):
+            futures[1].result(timeout=5)
+        futures[2].result(timeout=5)
+        self.assertEqual(
+            set(User.objects.values_list('username', flat=True)),
+            {'Robin', 'Alfred'},
+        )
+
+    def test_queued_write_pins_primary(self):
+        """Запись в потоке писателя закрепляет основную базу за запросом."""
+
+        def view(request):
+            run_write(User.objects.create_user, username='Robin')
+            return HttpResponse()
+
+        middleware = PrimaryPinMiddleware(view)
+        with mock.patch(
+            'core.routers.replica_paths',
+            return_value={'replica0': 'replica.sqlite3'},
+        ):
+            response = middleware(RequestFactory().get('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(
+        SQLITE_WRITE_QUEUE=True,
+        SQLITE_WRITE_QUEUE_TIMEOUT=0.01,
+    )
+    def test_timeout_cancels_queued_write(self):
+        """Не дождавшаяся писателя запись отменяется и даёт 503."""
+        futures = []
+
+        def submit(*args, **kwargs):
+            futures.append(Future())
+            return futures[-1]
+
+        with mock.patch.object(writer, 'submit', side_effect=submit):
+            with self.assertRaises(WriteTimeout):
+                run_write(User.objects.create_user, username='Robin')
+            self.assertTrue(futures[0].cancelled())
+
+            client = Client()
+            client.force_login(User.objects.create_user(username='Batman'))
+            response = client.post(
+                reverse('posts:post_create'),
+                {'text': 'Пост в очереди'},
+            )
+            self.assertEqual(
+                response.status_code,
+                HTTPStatus.SERVICE_UNAVAILABLE,
+            )
+            self.assertFalse(Post.objects.exists())
+
+            User.objects.create_user(username='Joker')
+            response = client.get(
+                reverse('posts:profile_follow', args=('Joker',)),
+            )
+            self.assertEqual(
+                response.status_code,
+                HTTPStatus.SERVICE_UNAVAILABLE,
+            )
+
+
+class ReplicaRouterTest(TestCase):
+    router = ReplicaRouter()
+
+    def setUp(self):
+        self.replica = tempfile.NamedTemporaryFile(suffix='.sqlite3')
+        feed = mock.patch.object(routers._state, 'feed', True, create=True)
+        feed.start()
+        self.addCleanup(feed.stop)
+        self.addCleanup(self.replica.close)
+
+    def replicas(self):
+        return mock.patch(
+            'core.routers.replica_paths',
+            return_value={'replica0': self.replica.name},
+        )
+
+    def route(self, model, last_write=0):
+        with mock.patch.object(
+            routers._state,
+            'last_write',
+            last_write,
+            create=True,
+        ), mock.patch(
+            'core.routers.transaction.get_connection',
+        ) as get_connection, mock.patch(
+            'core.routers.snapshot_of',
+            side_effect=lambda alias, path: routers.synced_at(path),
+        ):
+            get_connection.return_value.in_atomic_block = False
+            return self.router.db_for_read(model)
+
+    def test_no_replicas_reads_primary(self):
+        """Без настроенных реплик чтение идёт в основную базу."""
+        self.assertIsNone(self.route(Post))
+
+    def test_feed_reads_routed_to_replica(self):
+        """Лента читается из реплики, остальные модели — из основной."""
+        with self.replicas():
+            self.assertEqual(self.route(Post), 'replica0')
+            self.assertIsNone(self.route(User))
+            self.assertIsNone(self.route(Session))
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_replica_older_than_write_skipped(self):
+        """Реплика старше последней записи пользователя не используется."""
+        synced = routers.synced_at(self.replica.name)
+        with self.replicas():
+            self.assertEqual(self.route(Post, synced - 1), 'replica0')
+            self.assertIsNone(self.route(Post, synced + 1))
+
+    def test_write_sets_pin_cookie(self):
+        """После записи пользователь получает cookie со временем записи."""
+        middleware = PrimaryPinMiddleware(lambda request: HttpResponse())
+        factory = RequestFactory()
+        with self.replicas():
+            response = middleware(factory.post('/'))
+            self.assertIn(PIN_COOKIE, response.cookies)
+            response = middleware(factory.get('/'))
+            self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_writing_get_sets_pin_cookie(self):
+        """GET, который записал в базу, тоже закрепляет основную базу."""
+
+        def view(request):
+            Group.objects.create(title='Готэм', slug='gotham')
+            # После записи и сам запрос читает из основной базы.
+            self.assertIsNone(self.route(Post, routers._state.last_write))
+            return HttpResponse()
+
+        middleware = PrimaryPinMiddleware(view)
+        with self.replicas():
+            response = middleware(RequestFactory().get('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+
+class SyncReplicasTest(TransactionTestCase):
+    def test_sync_replicas(self):
+        """Реплика получает снимок основной базы и его время в mtime."""
+        User.objects.create_user(username='Batman')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            started = time.time()
+            with override_settings(DATABASE_REPLICAS=[path]):
+                call_command('sync_replicas', interval=0, stdout=StringIO())
+            self.assertGreaterEqual(routers.synced_at(path), int(started))
+            self.assertEqual(os.listdir(directory), ['replica.sqlite3'])
+            replica = sqlite3.connect(path)
+            count = replica.execute(
+                'SELECT COUNT(*) FROM auth_user WHERE username = ?',
+                ('Batman',),
+            ).fetchone()[0]
+            journal_mode = replica.execute('PRAGMA journal_mode').fetchone()
+            replica.close()
+        self.assertEqual(count, 1)
+        self.assertEqual(journal_mode[0], 'delete')
+
+
+class SqliteMaintenanceTest(TransactionTestCase):
+    def test_maintenance(self):
+        """Бэкап снимается и проверяется, старые удаляются, база цела."""
+        User.objects.create_user(username='Batman')
+        with tempfile.TemporaryDirectory() as directory:
+            old = os.path.join(directory, 'db-20000101-000000.sqlite3')
+            open(old, 'wb').close()
+            out = StringIO()
+            with override_settings(
+                SQLITE_BACKUP_DIR=directory,
+                SQLITE_BACKUP_KEEP=1,
+            ):
+                call_command('sqlite_maintenance', stdout=out)
+            backups = os.listdir(directory)
+            self.assertEqual(len(backups), 1)
+            self.assertNotIn(os.path.basename(old), backups)
+            backup = sqlite3.connect(os.path.join(directory, backups[0]))
+            count = backup.execute('SELECT COUNT(*) FROM auth_user').fetchone()
+            backup.close()
+        self.assertEqual(count[0], 1)
+        for task in ('backup', 'analyze', 'vacuum', 'check'):
+            self.assertIn(f'{task}:', out.getvalue())
+
+    def test_single_task(self):
+        """Можно выполнить одну задачу."""
+        out = StringIO()
+        call_command('sqlite_maintenance', 'check', stdout=out)
+        self.assertEqual(out.getvalue().count(':'), 1)
+
+
+class QueryCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Batman')
+        self.group = Group.objects.create(
+            title='Готэм',
+            slug='gotham',
+            description='Город',
+        )
+
+    def test_repeated_query_served_from_cache(self):
+        """Повторный запрос не доходит до базы, пока таблицы не менялись."""
+        for _ in range(2):
+            Group.objects.get(slug='gotham')
+        with self.assertNumQueries(0):
+            self.assertEqual(Group.objects.get(slug='gotham'), self.group)
+
+    def test_write_invalidates(self):
+        """Запись в таблицу через ORM сбрасывает кеш её запросов."""
+        for _ in range(2):
+            Group.objects.get(slug='gotham')
+        Group.objects.filter(pk=self.group.pk).update(title='Метрополис')
+        self.assertEqual(Group.objects.get(slug='gotham').title, 'Метрополис')
+
+    def test_prefetched_tables_tracked(self):
+        """Новый комментарий сбрасывает закешированную ленту с prefetch."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        feed = Post.objects.cached().prefetch_related('comments')
+        for _ in range(2):
+            self.assertEqual(len(list(feed.all())[0].comments.all()), 0)
+        Comment.objects.create(author=self.user, post=post, text='Привет')
+        self.assertEqual(len(list(feed.all())[0].comments.all()), 1)
+
+    def test_uncommitted_writes_bypass_cache(self):
+        """Внутри транзакции с записью запросы к таблице идут мимо кеша."""
+        for _ in range(2):
+            Group.objects.count()
+        with transaction.atomic():
+            Group.objects.create(title='Метрополис', slug='metropolis')
+            with self.assertNumQueries(1):
+                self.assertEqual(Group.objects.count(), 2)
+            transaction.set_rollback(True)
+        self.assertEqual(Group.objects.count(), 1)
+
+
+class CachedAuthenticationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='Batman',
+            password='alfred-1939',
+        )
+        self.client.force_login(self.user)
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:follow_index'))
+        return response, [
+            query['sql']
+            for query in queries.captured_queries
+            if 'FROM "auth_user"' in query['sql']
+        ]
+
+    def test_user_loaded_once(self):
+        """Пользователь сессии читается из базы только на первой странице."""
+        self.user_queries()
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(queries, [])
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_password_change_logs_out(self):
+        """Смена пароля завершает сессии со старым хешем."""
+        self.user_queries()
+        self.user.set_password('joker-1940')
+        self.user.save()
+        response, _ = self.user_queries()
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_logout_forgets_user(self):
+        """После выхода страница снова требует входа."""
+        self.user_queries()
+        self.client.logout()
+        response, _ = self.user_queries()
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class SessionStoreTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = SessionStore()
+        self.session['theme'] = 'dark'
+        self.session.save()
+
+    def session_writes(self, session):
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        return [
+            query
+            for query in queries.captured_queries
+            if 'django_session' in query['sql']
+            and not query['sql'].startswith('SELECT')
+        ]
+
+    def test_unchanged_session_not_written(self):
+        """Неизменённая сессия не записывается в базу повторно."""
+        session = SessionStore(self.session.session_key)
+        self.assertEqual(session['theme'], 'dark')
+        self.assertEqual(self.session_writes(session), [])
+
+    def test_changed_session_written_and_survives_cache_loss(self):
+        """Изменения пишутся в базу и переживают потерю кеша."""
+        session = SessionStore(self.session.session_key)
+        session['theme'] = 'light'
+        self.assertNotEqual(self.session_writes(session), [])
+        cache.clear()
+        self.assertEqual(
+            SessionStore(self.session.session_key)['theme'],
+            'light',
+        )
+
+    @override_settings(SESSION_REFRESH_INTERVAL=60)
+    def test_expiry_refreshed_after_interval(self):
+        """Срок строки продлевается, когда с записи прошёл интервал."""
+        Session.objects.filter(pk=self.session.session_key).update(
+            expire_date=timezone.now()
+            + timedelta(seconds=settings.SESSION_COOKIE_AGE - 120),
+        )
+        cache.clear()
+        session = SessionStore(self.session.session_key)
+        session.load()
+        self.assertNotEqual(self.session_writes(session), [])
+
+    def test_clear_sessions(self):
+        """Команда удаляет только просроченные сессии."""
+        expired = SessionStore()
+        expired.set_expiry(-1)
+        expired.save()
+        call_command('clear_sessions', chunk_size=1, stdout=StringIO())
+        self.assertEqual(
+            list(Session.objects.values_list('session_key', flat=True)),
+            [self.session.session_key],
+        )
@@ -1,6 +1,25 @@
+import mimetypes
+import os
+import re
 from http import HTTPStatus
+from urllib.parse import quote
 
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+CACHEABLE_STATUSES = (
+    HTTPStatus.OK,
+    HTTPStatus.PARTIAL_CONTENT,
+    HTTPStatus.NOT_MODIFIED,
+)
+HASHED_NAME_RE = re.compile(r'[0-9a-f]{32}\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
 
 
 def page_not_found(request, exception):
@@ -18,3 +37,148 @@ def csrf_failure(request, reason=''):
     """Страница 403."""
     del reason
     return render(request, 'core/403csrf.html')
+
+
+class FileRange:
+    """Файл, из которого читается только заданный диапазон байтов."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def can_access_media(request, name):
+    """Публичные каталоги открыты всем, остальное — только персоналу."""
+    if name.startswith(settings.MEDIA_PUBLIC_PREFIXES):
+        return True
+    return request.user.is_staff
+
+
+def parse_range(header, size):
+    """Разбирает одиночный диапазон ``bytes=start-end``.
+
+    Returns:
+    Пару (начало, длина), None для неподдерживаемого заголовка
+    или ValueError для неудовлетворимого диапазона.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        if not int(last):
+            raise ValueError(header)
+        length = min(int(last), size)
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end - start + 1
+
+
+def media_cache_control(name):
+    """Cache-Control для файла медиа.
+
+    Имя миниатюры sorl — хеш исходника и параметров, содержимое по
+    такому адресу не меняется. Имена загрузок пользователь выбирает сам.
+    """
+    is_thumbnail = name.startswith(thumbnail_settings.THUMBNAIL_PREFIX)
+    if is_thumbnail and HASHED_NAME_RE.search(name):
+        return 'public, max-age=31536000, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+def accel_response(fullpath, name):
+    """Пустой ответ, файл по которому отдаст nginx или Apache."""
+    content_type, _ = mimetypes.guess_type(name)
+    response = HttpResponse(
+        content_type=content_type or 'application/octet-stream',
+    )
+    if settings.MEDIA_ACCEL_HEADER == 'X-Sendfile':
+        response['X-Sendfile'] = fullpath
+    else:
+        response[settings.MEDIA_ACCEL_HEADER] = (
+            settings.MEDIA_ACCEL_PREFIX + quote(name)
+        )
+    return response
+
+
+def file_response(request, fullpath, size, etag):
+    """Файл целиком или диапазон из заголовка Range.
+
+    Range учитывается, только если If-Range отсутствует или совпадает
+    с текущим ETag; неудовлетворимый диапазон даёт 416.
+    """
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(
+                status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+            )
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, 'rb'))
+    else:
+        start, length = byte_range
+        response = FileResponse(
+            FileRange(open(fullpath, 'rb'), start, length),
+            filename=os.path.basename(fullpath),
+            status=HTTPStatus.PARTIAL_CONTENT,
+        )
+        response['Content-Length'] = length
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_media(request, path):
+    """Отдаёт загруженные файлы.
+
+    Если перед приложением стоит nginx или Apache, сама передача файла
+    отдаётся им через MEDIA_ACCEL_HEADER, и воркер Python освобождается
+    сразу. Иначе файл стримится с поддержкой Range и условных запросов.
+    """
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    name = os.path.relpath(fullpath, settings.MEDIA_ROOT).replace(os.sep, '/')
+    if not os.path.isfile(fullpath) or not can_access_media(request, name):
+        raise Http404
+
+    stat = os.stat(fullpath)
+    etag = quote_etag('%x-%x' % (int(stat.st_mtime), stat.st_size))
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(stat.st_mtime),
+    )
+    if response is None and settings.MEDIA_ACCEL_HEADER:
+        response = accel_response(fullpath, name)
+    elif response is None:
+        response = file_response(request, fullpath, stat.st_size, etag)
+    if response.status_code in CACHEABLE_STATUSES:
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = media_cache_control(name)
+    return response
@@ -0,0 +1,150 @@
+import queue
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http import HTTPStatus
+
+from django.conf import settings
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    OperationalError,
+    connections,
+    transaction,
+)
+from django.http import HttpResponse
+
+from core.routers import note_write
+
+
+class WriteTimeout(OperationalError):
+    """Писатель не взялся за запись за SQLITE_WRITE_QUEUE_TIMEOUT."""
+
+
+class WriteQueue:
+    """Очередь записей в базу с единственным потоком-писателем.
+
+    SQLite допускает одного писателя за раз: конкурирующие воркеры ждут
+    блокировку в busy_timeout и мешают друг другу. Здесь записи
+    выстраиваются в очередь, а писатель выполняет их пачками в общей
+    транзакции, каждую в своей точке сохранения. Future вызывающего
+    разрешается только после фиксации, поэтому свои записи сразу видны.
+
+    Очередь своя у каждого процесса: при нескольких воркерах писателей
+    столько же, сколько процессов, и между ними по-прежнему действует
+    busy_timeout.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self.queue.put((future, func, args, kwargs))
+        self.start()
+        return future
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run,
+                    name='sqlite-writer',
+                    daemon=True,
+                )
+                self.thread.start()
+
+    def run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < settings.SQLITE_WRITE_QUEUE_BATCH:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.execute(batch)
+
+    def execute(self, batch):
+        try:
+            with transaction.atomic(using=self.using):
+                outcomes = [self.apply(*item) for item in batch]
+        except Exception as error:
+            outcomes = [(False, error)] * len(batch)
+        finally:
+            connections[self.using].close_if_unusable_or_obsolete()
+        for (future, *_), outcome in zip(batch, outcomes):
+            self.resolve(future, outcome)
+
+    def apply(self, future, func, args, kwargs):
+        """Выполняет запись пачки в своей точке сохранения.
+
+        Returns:
+        None для отменённой записи, иначе пару (успех, результат или
+        исключение).
+        """
+        if not future.set_running_or_notify_cancel():
+            return None
+        try:
+            with transaction.atomic(using=self.using):
+                return True, func(*args, **kwargs)
+        except Exception as error:
+            return False, error
+
+    def resolve(self, future, outcome):
+        """Сообщает итог записи вызывающему после фиксации пачки."""
+        if outcome is None:
+            return
+        succeeded, value = outcome
+        if succeeded:
+            future.set_result(value)
+        elif not future.done():
+            future.set_exception(value)
+
+
+writer = WriteQueue()
+
+
+def run_write(func, *args, **kwargs):
+    """Выполняет запись через очередь писателя, если она включена.
+
+    Внутри уже открытой транзакции запись выполняется на месте: иначе
+    писатель ждал бы блокировку, которую держит сам вызывающий.
+    Запись в потоке писателя отмечается за вызывающим запросом.
+    """
+    if (
+        not settings.SQLITE_WRITE_QUEUE
+        or transaction.get_connection().in_atomic_block
+    ):
+        return func(*args, **kwargs)
+    note_write()
+    future = writer.submit(func, *args, **kwargs)
+    try:
+        return future.result(timeout=settings.SQLITE_WRITE_QUEUE_TIMEOUT)
+    except FutureTimeoutError:
+        if future.cancel():
+            raise WriteTimeout('Очередь записи переполнена.')
+        # Писатель уже выполняет запись: её итог сообщается как есть.
+        return future.result()
+
+
+class WriteTimeoutMiddleware:
+    """Отвечает 503 вместо 500, если очередь записи не успела."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, WriteTimeout):
+            return None
+        response = HttpResponse(
+            'Сервис перегружен, повторите попытку позже.',
+            content_type='text/plain; charset=utf-8',
+            status=HTTPStatus.SERVICE_UNAVAILABLE,
+        )
+        response['Retry-After'] = settings.SQLITE_WRITE_QUEUE_TIMEOUT
+        return response
@@ -0,0 +1,22 @@
+from django.contrib import admin
+
+from events.models import ConsumerOffset, Event
+
+
+@admin.register(Event)
+class EventAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'created')
+    list_filter = ('name',)
+    readonly_fields = ('name', 'payload', 'created')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ConsumerOffset)
+class ConsumerOffsetAdmin(admin.ModelAdmin):
+    list_display = ('consumer', 'last_event_id', 'updated')
+    readonly_fields = ('consumer', 'error', 'updated')
+
+    def has_add_permission(self, request):
+        return False
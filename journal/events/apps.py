@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class EventsConfig(AppConfig):
+    name = 'events'
+    verbose_name = 'события'
+
+    def ready(self):
+        # Потребители регистрируются декоратором consumer в consumers.py.
+        autodiscover_modules('consumers')
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from events.outbox import dispatch, replay
+
+
+class Command(BaseCommand):
+    help = 'Доставляет события из outbox зарегистрированным потребителям.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.EVENTS_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help='Повторять каждые N секунд; 0 — один проход.',
+        )
+        parser.add_argument(
+            '--replay',
+            metavar='CONSUMER',
+            help='Переиграть события этому потребителю.',
+        )
+        parser.add_argument(
+            '--from',
+            dest='from_event',
+            type=int,
+            default=1,
+            help='С какого события переигрывать.',
+        )
+
+    def handle(self, *args, **options):
+        if options['replay']:
+            try:
+                replay(options['replay'], options['from_event'])
+            except LookupError as error:
+                raise CommandError(error)
+        while True:
+            delivered = dispatch(options['batch_size'])
+            self.stdout.write(f'Доставлено событий: {delivered}')
+            if not options['every']:
+                return
+            time.sleep(options['every'])
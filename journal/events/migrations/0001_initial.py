@@ -0,0 +1,82 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumerOffset',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'consumer',
+                    models.CharField(
+                        max_length=200, unique=True, verbose_name='потребитель'
+                    ),
+                ),
+                (
+                    'last_event_id',
+                    models.BigIntegerField(
+                        default=0, verbose_name='последнее событие'
+                    ),
+                ),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                (
+                    'updated',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='обновлено'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Позиция потребителя',
+                'verbose_name_plural': 'Позиции потребителей',
+            },
+        ),
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'created',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'name',
+                    models.CharField(max_length=64, verbose_name='событие'),
+                ),
+                (
+                    'payload',
+                    models.TextField(default='{}', verbose_name='данные'),
+                ),
+            ],
+            options={
+                'verbose_name': 'Событие',
+                'verbose_name_plural': 'События',
+                'ordering': ('id',),
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+import json
+
+from django.db import models
+
+from core.models import CreatedModel
+
+
+class Event(CreatedModel):
+    """Доменное событие, записанное в одной транзакции с изменением.
+
+    Порядок событий — порядок id: SQLite выполняет пишущие транзакции
+    по одной, поэтому id выдаются в порядке фиксации.
+    """
+
+    name = models.CharField('событие', max_length=64)
+    payload = models.TextField('данные', default='{}')
+
+    class Meta:
+        ordering = ('id',)
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
+
+    @property
+    def data(self):
+        return json.loads(self.payload)
+
+
+class ConsumerOffset(models.Model):
+    """Докуда потребитель обработал события.
+
+    Чтобы переиграть события, достаточно уменьшить last_event_id.
+    """
+
+    consumer = models.CharField('потребитель', max_length=200, unique=True)
+    last_event_id = models.BigIntegerField('последнее событие', default=0)
+    error = models.TextField('ошибка', blank=True)
+    updated = models.DateTimeField('обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Позиция потребителя'
+        verbose_name_plural = 'Позиции потребителей'
+
+    def __str__(self) -> str:
+        return self.consumer
@@ -0,0 +1,106 @@
+import json
+import traceback
+
+from django.db import transaction
+
+from events.models import ConsumerOffset, Event
+
+registry = {}
+
+
+class OffsetMovedError(Exception):
+    """Порцию событий успел обработать другой диспетчер."""
+
+
+class Consumer:
+    def __init__(self, func, name, events):
+        self.func = func
+        self.name = name
+        self.events = frozenset(events)
+
+    def __repr__(self):
+        return f'<Consumer {self.name}>'
+
+
+def emit(name, **payload):
+    """Записывает событие в outbox.
+
+    Вызывать нужно в транзакции изменения: тогда событие появится,
+    только если изменение зафиксировано, и наоборот.
+    """
+    return Event.objects.create(name=name, payload=json.dumps(payload))
+
+
+def consumer(*events, name=None):
+    """Регистрирует функцию, которая получает порции событий events.
+
+    Функция вызывается со списком Event в порядке id, в одной транзакции
+    со сдвигом позиции потребителя. При исключении позиция не двигается,
+    и порция придёт снова, поэтому обработка должна быть идемпотентной.
+    """
+
+    def register(func):
+        consumer_name = name or f'{func.__module__}.{func.__qualname__}'
+        registry[consumer_name] = Consumer(func, consumer_name, events)
+        return func
+
+    return register
+
+
+def deliver(handler, batch_size):
+    """Передаёт потребителю новые события порциями.
+
+    Returns:
+    Число доставленных событий.
+    """
+    offset, _ = ConsumerOffset.objects.get_or_create(consumer=handler.name)
+    position = offset.last_event_id
+    delivered = 0
+    while True:
+        events = list(
+            Event.objects.filter(pk__gt=position, name__in=handler.events)
+            .order_by('pk')[:batch_size],
+        )
+        if not events:
+            return delivered
+        try:
+            with transaction.atomic():
+                handler.func(events)
+                moved = ConsumerOffset.objects.filter(
+                    pk=offset.pk,
+                    last_event_id=position,
+                ).update(last_event_id=events[-1].pk, error='')
+                if not moved:
+                    raise OffsetMovedError
+        except OffsetMovedError:
+            return delivered
+        except Exception:
+            ConsumerOffset.objects.filter(pk=offset.pk).update(
+                error=traceback.format_exc(),
+            )
+            return delivered
+        position = events[-1].pk
+        delivered += len(events)
+        if len(events) < batch_size:
+            return delivered
+
+
+def dispatch(batch_size):
+    """Доставляет новые события всем потребителям.
+
+    Ошибка одного потребителя останавливает только его: порядок событий
+    для него сохраняется, а остальные продолжают работу.
+    """
+    return sum(
+        deliver(handler, batch_size) for handler in registry.values()
+    )
+
+
+def replay(consumer_name, from_event_id):
+    """Переигрывает события потребителю, начиная с from_event_id."""
+    if consumer_name not in registry:
+        raise LookupError(f'Потребитель {consumer_name} не зарегистрирован.')
+    ConsumerOffset.objects.update_or_create(
+        consumer=consumer_name,
+        defaults={'last_event_id': from_event_id - 1, 'error': ''},
+    )
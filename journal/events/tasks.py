@@ -0,0 +1,34 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from events.models import ConsumerOffset, Event
+from events.outbox import dispatch
+from jobs.queue import PRIORITY_HIGH, PRIORITY_LOW, task
+
+# Строк за один DELETE при чистке outbox.
+PRUNE_CHUNK_SIZE = 500
+
+
+@task(priority=PRIORITY_HIGH, max_attempts=1)
+def dispatch_events():
+    dispatch(settings.EVENTS_BATCH_SIZE)
+
+
+@task(priority=PRIORITY_LOW, max_attempts=1)
+def prune_events():
+    """Удаляет события старше EVENTS_KEEP_DAYS, которые все уже получили."""
+    cutoff = timezone.now() - timedelta(days=settings.EVENTS_KEEP_DAYS)
+    position = ConsumerOffset.objects.aggregate(
+        position=Min('last_event_id'),
+    )['position']
+    events = Event.objects.filter(created__lt=cutoff)
+    if position is not None:
+        events = events.filter(pk__lte=position)
+    while True:
+        ids = list(events.values_list('pk', flat=True)[:PRUNE_CHUNK_SIZE])
+        if not ids:
+            return
+        Event.objects.filter(pk__in=ids).delete()
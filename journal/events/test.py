@@ -0,0 +1,125 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from events.models import ConsumerOffset, Event
+from events.outbox import consumer, dispatch, emit
+from jobs.models import Job
+from posts.models import Post
+
+User = get_user_model()
+
+received = []
+broken = []
+
+
+@consumer('Test', name='events.test.collect')
+def collect(events):
+    if broken:
+        raise RuntimeError('потребитель сломан')
+    received.extend(event.data['number'] for event in events)
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        received.clear()
+        broken.clear()
+
+    def test_event_rolled_back_with_change(self):
+        """Событие не переживает откат своей транзакции."""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                emit('Test', number=1)
+                raise RuntimeError
+        self.assertFalse(Event.objects.exists())
+
+    def test_delivered_in_order_and_once(self):
+        """Потребитель получает события по порядку и только один раз."""
+        for number in range(5):
+            emit('Test', number=number)
+        emit('Other', number=100)
+        dispatch(batch_size=2)
+        dispatch(batch_size=2)
+        self.assertEqual(received, [0, 1, 2, 3, 4])
+
+    def test_failure_keeps_position(self):
+        """После ошибки потребитель получит ту же порцию снова."""
+        emit('Test', number=1)
+        broken.append(True)
+        dispatch(batch_size=10)
+        offset = ConsumerOffset.objects.get(consumer='events.test.collect')
+        self.assertIn('потребитель сломан', offset.error)
+        self.assertEqual(offset.last_event_id, 0)
+
+        broken.clear()
+        dispatch(batch_size=10)
+        self.assertEqual(received, [1])
+        offset.refresh_from_db()
+        self.assertEqual(offset.error, '')
+
+    def test_replay(self):
+        """События можно переиграть потребителю с нужного места."""
+        first = emit('Test', number=1)
+        emit('Test', number=2)
+        dispatch(batch_size=10)
+        call_command(
+            'dispatch_events',
+            replay='events.test.collect',
+            from_event=first.pk + 1,
+            stdout=StringIO(),
+        )
+        self.assertEqual(received, [1, 2, 2])
+
+
+class PostEventsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='Batman')
+        self.author = User.objects.create_user(username='Robin')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def names(self):
+        return list(Event.objects.values_list('name', flat=True))
+
+    def test_views_emit_events(self):
+        """Изменения из views записывают свои события."""
+        self.client.post(reverse('posts:post_create'), {'text': 'Пост'})
+        post = Post.objects.get()
+        self.client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'Правка'},
+        )
+        self.client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': 'Комментарий'},
+        )
+        self.client.get(reverse('posts:profile_follow', args=('Robin',)))
+        self.client.get(reverse('posts:profile_unfollow', args=('Robin',)))
+        self.client.post(reverse('posts:post_delete', args=(post.pk,)))
+        self.assertEqual(
+            self.names(),
+            [
+                'PostCreated',
+                'PostEdited',
+                'CommentAdded',
+                'Followed',
+                'Unfollowed',
+                'PostDeleted',
+            ],
+        )
+        self.assertEqual(Event.objects.first().data['post_id'], post.pk)
+
+    def test_thumbnails_consumer(self):
+        """Посты с картинками получают задачу на миниатюры."""
+        post = Post.objects.create(author=self.user, text='Без картинки')
+        emit('PostCreated', post_id=post.pk, image='')
+        emit('PostEdited', post_id=post.pk, image='posts/cat.png')
+        dispatch(batch_size=10)
+        job = Job.objects.get()
+        self.assertEqual(job.name, 'posts.tasks.warm_thumbnails')
+        self.assertEqual(json.loads(job.payload)['args'], [post.pk])
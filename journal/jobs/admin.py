@@ -0,0 +1,46 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'priority',
+        'attempts',
+        'run_at',
+        'finished',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    readonly_fields = (
+        'name',
+        'payload',
+        'status',
+        'attempts',
+        'locked_until',
+        'key',
+        'error',
+        'created',
+        'finished',
+    )
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        """Возвращает упавшие задачи в очередь с новым запасом попыток."""
+        count = queryset.filter(status=Job.FAILED).update(
+            status=Job.QUEUED,
+            attempts=0,
+            run_at=timezone.now(),
+            finished=None,
+        )
+        self.message_user(request, f'Возвращено в очередь: {count}')
+
+    retry.short_description = 'Повторить упавшие задачи'
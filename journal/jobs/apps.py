@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    name = 'jobs'
+    verbose_name = 'фоновые задачи'
+
+    def ready(self):
+        # Задачи регистрируются декоратором task в модулях tasks.py.
+        autodiscover_modules('tasks')
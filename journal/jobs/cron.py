@@ -0,0 +1,69 @@
+from django.conf import settings
+
+from jobs.queue import registry
+
+# Поля cron: минута, час, день месяца, месяц, день недели (0 — воскресенье).
+FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+
+def parse_field(field, low, high):
+    """Значения поля cron: ``*``, ``*/15``, ``1-5``, ``0,30``, ``10-50/10``."""
+    values = set()
+    for part in field.split(','):
+        spec, _, step = part.partition('/')
+        if spec == '*':
+            start, stop = low, high
+        elif '-' in spec:
+            start, stop = map(int, spec.split('-'))
+        else:
+            start = stop = int(spec)
+            if step:
+                stop = high
+        if not low <= start <= stop <= high:
+            raise ValueError(f'Поле cron вне диапазона: {field}')
+        values.update(range(start, stop + 1, int(step or 1)))
+    return values
+
+
+def cron_matches(expression, moment):
+    """Подходит ли минута moment под выражение cron.
+
+    Как и в cron, если заданы и день месяца, и день недели, достаточно
+    совпадения одного из них.
+    """
+    fields = expression.split()
+    if len(fields) != len(FIELDS):
+        raise ValueError(f'В выражении cron нужно 5 полей: {expression}')
+    minutes, hours, days, months, weekdays = (
+        parse_field(field, low, high)
+        for field, (low, high) in zip(fields, FIELDS)
+    )
+    if moment.minute not in minutes or moment.hour not in hours:
+        return False
+    if moment.month not in months:
+        return False
+    day = moment.day in days
+    weekday = (moment.weekday() + 1) % 7 in weekdays
+    if fields[2] != '*' and fields[4] != '*':
+        return day or weekday
+    return day and weekday
+
+
+def enqueue_periodic(moment):
+    """Ставит периодические задачи из JOBS_PERIODIC, чей срок — moment.
+
+    Ключ задачи включает минуту, так что при нескольких воркерах
+    каждая задача ставится один раз.
+    """
+    scheduled = []
+    for name, entry in settings.JOBS_PERIODIC.items():
+        if not cron_matches(entry['cron'], moment):
+            continue
+        job = registry[entry['task']].schedule(
+            args=entry.get('args', ()),
+            kwargs=entry.get('kwargs'),
+            key=f'{name}:{moment:%Y-%m-%dT%H:%M}',
+        )
+        if job is not None:
+            scheduled.append(job)
+    return scheduled
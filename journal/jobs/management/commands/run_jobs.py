@@ -0,0 +1,92 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+from django.utils import timezone
+
+from jobs.cron import enqueue_periodic
+from jobs.queue import claim, execute, release_expired
+
+
+class Command(BaseCommand):
+    help = (
+        'Воркер очереди задач: выполняет задачи в пуле потоков и ставит '
+        'периодические задачи из JOBS_PERIODIC.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.JOBS_THREADS,
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=settings.JOBS_POLL_INTERVAL,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Выйти, как только очередь опустеет.',
+        )
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.burst = options['burst']
+        self.poll = options['poll']
+        workers = [
+            threading.Thread(target=self.work, name=f'jobs-{number}')
+            for number in range(options['threads'])
+        ]
+        release_expired()
+        enqueue_periodic(timezone.now().replace(second=0, microsecond=0))
+        for worker in workers:
+            worker.start()
+        try:
+            if self.burst:
+                for worker in workers:
+                    worker.join()
+            else:
+                self.schedule()
+        except KeyboardInterrupt:
+            self.stdout.write('Останавливаемся после текущих задач...')
+        finally:
+            self.stop.set()
+            for worker in workers:
+                worker.join()
+
+    def schedule(self):
+        """Раз в минуту ставит периодические задачи и чинит брошенные."""
+        last = timezone.now().replace(second=0, microsecond=0)
+        while not self.stop.is_set():
+            time.sleep(60 - timezone.now().second)
+            minute = timezone.now().replace(second=0, microsecond=0)
+            if minute == last:
+                continue
+            last = minute
+            release_expired()
+            enqueue_periodic(minute)
+
+    def work(self):
+        try:
+            while not self.stop.is_set():
+                try:
+                    job = claim()
+                    if job is None:
+                        if self.burst:
+                            return
+                        self.stop.wait(self.poll)
+                        continue
+                    if not execute(job):
+                        self.stderr.write(f'{job}: ошибка, см. админку')
+                except DatabaseError as error:
+                    # База занята или недоступна: поток не должен умереть.
+                    self.stderr.write(f'Очередь недоступна: {error}')
+                    self.stop.wait(self.poll)
+                close_old_connections()
+        finally:
+            connection.close()
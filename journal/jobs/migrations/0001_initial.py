@@ -0,0 +1,121 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'created',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'name',
+                    models.CharField(max_length=200, verbose_name='задача'),
+                ),
+                (
+                    'payload',
+                    models.TextField(default='{}', verbose_name='аргументы'),
+                ),
+                (
+                    'priority',
+                    models.SmallIntegerField(
+                        default=0,
+                        help_text='Задачи с меньшим числом выполняются раньше.',
+                        verbose_name='приоритет',
+                    ),
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('queued', 'в очереди'),
+                            ('running', 'выполняется'),
+                            ('done', 'выполнена'),
+                            ('failed', 'ошибка'),
+                        ],
+                        default='queued',
+                        max_length=16,
+                        verbose_name='состояние',
+                    ),
+                ),
+                (
+                    'run_at',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name='выполнить после',
+                    ),
+                ),
+                (
+                    'attempts',
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name='попыток'
+                    ),
+                ),
+                (
+                    'max_attempts',
+                    models.PositiveSmallIntegerField(
+                        default=3, verbose_name='лимит попыток'
+                    ),
+                ),
+                (
+                    'locked_until',
+                    models.DateTimeField(
+                        blank=True,
+                        help_text='Если воркер не успел, задача вернётся в очередь.',
+                        null=True,
+                        verbose_name='занята до',
+                    ),
+                ),
+                (
+                    'key',
+                    models.CharField(
+                        blank=True,
+                        help_text='Вторая задача с тем же ключом не ставится.',
+                        max_length=200,
+                        null=True,
+                        unique=True,
+                        verbose_name='ключ',
+                    ),
+                ),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                (
+                    'finished',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='завершена'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Задача',
+                'verbose_name_plural': 'Задачи',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(
+                fields=['status', 'priority', 'run_at'],
+                name='jobs_job_queue_idx',
+            ),
+        ),
+    ]
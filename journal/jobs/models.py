@@ -0,0 +1,66 @@
+from django.db import models
+from django.utils import timezone
+
+from core.models import CreatedModel
+
+
+class Job(CreatedModel):
+    """Отложенный вызов задачи, зарегистрированной через jobs.queue.task."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'выполнена'),
+        (FAILED, 'ошибка'),
+    )
+
+    name = models.CharField('задача', max_length=200)
+    payload = models.TextField('аргументы', default='{}')
+    priority = models.SmallIntegerField(
+        'приоритет',
+        default=0,
+        help_text='Задачи с меньшим числом выполняются раньше.',
+    )
+    status = models.CharField(
+        'состояние',
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    run_at = models.DateTimeField('выполнить после', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField('лимит попыток', default=3)
+    locked_until = models.DateTimeField(
+        'занята до',
+        blank=True,
+        null=True,
+        help_text='Если воркер не успел, задача вернётся в очередь.',
+    )
+    key = models.CharField(
+        'ключ',
+        max_length=200,
+        blank=True,
+        null=True,
+        unique=True,
+        help_text='Вторая задача с тем же ключом не ставится.',
+    )
+    error = models.TextField('ошибка', blank=True)
+    finished = models.DateTimeField('завершена', blank=True, null=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('status', 'priority', 'run_at'),
+                name='jobs_job_queue_idx',
+            ),
+        )
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+
+    def __str__(self) -> str:
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,185 @@
+import json
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from jobs.models import Job
+
+PRIORITY_HIGH = -10
+PRIORITY_NORMAL = 0
+PRIORITY_LOW = 10
+
+registry = {}
+
+
+class Task:
+    """Функция, которую можно выполнить сейчас или отложить в очередь.
+
+    Аргументы хранятся в JSON, поэтому передавать нужно id, а не объекты.
+    """
+
+    def __init__(self, func, name, priority, max_attempts, retry_delay):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def defer(self, *args, **kwargs):
+        """Ставит вызов в очередь с настройками задачи по умолчанию."""
+        return self.schedule(args, kwargs)
+
+    def schedule(self, args=(), kwargs=None, priority=None, delay=0, key=None):
+        """Ставит вызов в очередь.
+
+        Запись идёт в текущей транзакции: если она откатится, задачи
+        не будет. Задача с уже занятым key не ставится, и тогда
+        возвращается None.
+        """
+        payload = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+        if settings.JOBS_EAGER:
+            self.func(*args, **(kwargs or {}))
+            return None
+        job = Job(
+            name=self.name,
+            payload=payload,
+            priority=self.priority if priority is None else priority,
+            run_at=timezone.now() + timedelta(seconds=delay),
+            max_attempts=self.max_attempts,
+            key=key,
+        )
+        if key is None:
+            job.save()
+            return job
+        try:
+            with transaction.atomic():
+                job.save()
+        except IntegrityError:
+            return None
+        return job
+
+
+def task(
+    func=None,
+    *,
+    name=None,
+    priority=PRIORITY_NORMAL,
+    max_attempts=3,
+    retry_delay=60,
+):
+    """Регистрирует функцию как задачу очереди.
+
+    Имя по умолчанию — путь к функции, например posts.tasks.purge_posts;
+    под этим именем задачу можно указать в JOBS_PERIODIC.
+    """
+
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        registry[task_name] = Task(
+            func,
+            task_name,
+            priority,
+            max_attempts,
+            retry_delay,
+        )
+        return registry[task_name]
+
+    return register(func) if func is not None else register
+
+
+def release_expired():
+    """Возвращает в очередь задачи, воркер которых не дожил до конца."""
+    now = timezone.now()
+    expired = Job.objects.filter(status=Job.RUNNING, locked_until__lt=now)
+    expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED,
+        error='Воркер не завершил задачу.',
+        locked_until=None,
+        finished=now,
+    )
+    expired.update(status=Job.QUEUED, locked_until=None)
+
+
+def claim():
+    """Забирает из очереди самую срочную задачу или возвращает None.
+
+    Выбор и захват — два запроса; захват условный, так что задачу,
+    которую успел взять другой поток, просто пропускаем.
+    """
+    while True:
+        now = timezone.now()
+        pk = (
+            Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+            .order_by('priority', 'run_at', 'pk')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        claimed = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=settings.JOBS_LEASE),
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+
+def finish(job, attempts=5, **fields):
+    """Записывает итог задачи, переждав занятую базу.
+
+    Задача уже выполнена: если итог не записать, её повторит
+    release_expired, поэтому блокировку стоит переждать.
+    """
+    for attempt in range(attempts):
+        try:
+            Job.objects.filter(pk=job.pk).update(locked_until=None, **fields)
+            return
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.1 * 2 ** attempt)
+
+
+def execute(job):
+    """Выполняет захваченную задачу и записывает итог.
+
+    Упавшая задача повторяется через retry_delay, 2 * retry_delay и т. д.,
+    пока не кончатся попытки.
+
+    Returns:
+    True, если задача выполнена.
+    """
+    task = registry.get(job.name)
+    try:
+        if task is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована.')
+        payload = json.loads(job.payload)
+        task.func(*payload['args'], **payload['kwargs'])
+    except Exception:
+        now = timezone.now()
+        error = traceback.format_exc()
+        if task is not None and job.attempts < job.max_attempts:
+            delay = task.retry_delay * 2 ** (job.attempts - 1)
+            finish(
+                job,
+                status=Job.QUEUED,
+                run_at=now + timedelta(seconds=delay),
+                error=error,
+            )
+        else:
+            finish(job, status=Job.FAILED, error=error, finished=now)
+        return False
+    finish(job, status=Job.DONE, error='', finished=timezone.now())
+    return True
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.models import Job
+from jobs.queue import PRIORITY_LOW, task
+
+# Строк за один DELETE при чистке очереди.
+PRUNE_CHUNK_SIZE = 500
+
+
+@task(priority=PRIORITY_LOW, max_attempts=1)
+def prune_jobs():
+    """Удаляет выполненные задачи старше JOBS_KEEP_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.JOBS_KEEP_DAYS)
+    while True:
+        ids = list(
+            Job.objects.filter(status=Job.DONE, finished__lt=cutoff)
+            .values_list('pk', flat=True)[:PRUNE_CHUNK_SIZE],
+        )
+        if not ids:
+            return
+        Job.objects.filter(pk__in=ids).delete()
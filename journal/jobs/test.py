@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from jobs.cron import cron_matches, enqueue_periodic
+from jobs.models import Job
+from jobs.queue import PRIORITY_HIGH, claim, execute, release_expired, task
+
+calls = []
+
+
+@task(name='jobs.test.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='jobs.test.fail', max_attempts=2, retry_delay=10)
+def fail():
+    raise RuntimeError('сбой')
+
+
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_defer_and_execute(self):
+        """Отложенный вызов выполняется воркером с теми же аргументами."""
+        job = record.defer('раз')
+        self.assertEqual(calls, [])
+        self.assertEqual(claim(), job)
+        self.assertTrue(execute(Job.objects.get(pk=job.pk)))
+        self.assertEqual(calls, ['раз'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertIsNone(claim())
+
+    def test_priority_order(self):
+        """Срочные задачи выполняются раньше, задачи на будущее ждут."""
+        record.schedule(('позже',), delay=60)
+        record.defer('обычная')
+        record.schedule(('срочная',), priority=PRIORITY_HIGH)
+        while True:
+            job = claim()
+            if job is None:
+                break
+            execute(job)
+        self.assertEqual(calls, ['срочная', 'обычная'])
+
+    def test_retry_then_fail(self):
+        """Упавшая задача повторяется с задержкой, затем помечается ошибкой."""
+        job = fail.defer()
+        execute(claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('сбой', job.error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=5))
+        self.assertIsNone(claim())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        execute(claim())
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_expired_lease_released(self):
+        """Задача упавшего воркера возвращается в очередь."""
+        job = record.defer('снова')
+        claim()
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+        release_expired()
+        self.assertEqual(claim(), job)
+
+    def test_key_deduplicates(self):
+        """Вторая задача с тем же ключом не ставится."""
+        self.assertIsNotNone(record.schedule(('а',), key='один'))
+        self.assertIsNone(record.schedule(('б',), key='один'))
+        self.assertEqual(Job.objects.count(), 1)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager(self):
+        """В режиме JOBS_EAGER задача выполняется сразу."""
+        self.assertIsNone(record.defer('сразу'))
+        self.assertEqual(calls, ['сразу'])
+        self.assertFalse(Job.objects.exists())
+
+
+class CronTest(TestCase):
+    def test_cron_matches(self):
+        """Выражения cron сопоставляются с минутой."""
+        monday = datetime(2024, 1, 1, 4, 30)
+        cases = (
+            ('* * * * *', True),
+            ('*/15 * * * *', True),
+            ('*/20 * * * *', False),
+            ('30 4 * * *', True),
+            ('0,30 3-5 * * *', True),
+            ('30 4 * * 1', True),
+            ('30 4 * * 0', False),
+            ('30 4 15 * 1', True),
+            ('30 4 15 * 0', False),
+            ('30 4 1 2 *', False),
+        )
+        for expression, expected in cases:
+            with self.subTest(expression=expression):
+                self.assertEqual(cron_matches(expression, monday), expected)
+        with self.assertRaises(ValueError):
+            cron_matches('61 * * * *', monday)
+
+    @override_settings(
+        JOBS_PERIODIC={
+            'every-minute': {
+                'task': 'jobs.test.record',
+                'cron': '* * * * *',
+                'args': ['тик'],
+            },
+            'never': {'task': 'jobs.test.record', 'cron': '0 0 1 1 *'},
+        },
+    )
+    def test_enqueue_periodic_once_per_minute(self):
+        """Периодическая задача ставится один раз на минуту."""
+        moment = datetime(2024, 1, 1, 4, 30, tzinfo=timezone.utc)
+        self.assertEqual(len(enqueue_periodic(moment)), 1)
+        self.assertEqual(enqueue_periodic(moment), [])
+        self.assertEqual(
+            Job.objects.get().key,
+            'every-minute:2024-01-01T04:30',
+        )
+
+
+class RunJobsCommandTest(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(JOBS_PERIODIC={})
+    def test_burst(self):
+        """Воркер выполняет очередь в нескольких потоках и выходит."""
+        for number in range(10):
+            record.defer(number)
+        fail.defer()
+        stderr = StringIO()
+        call_command(
+            'run_jobs',
+            threads=3,
+            burst=True,
+            stdout=StringIO(),
+            stderr=stderr,
+        )
+        self.assertEqual(sorted(calls), list(range(10)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 10)
+        self.assertIn('jobs.test.fail', stderr.getvalue())
@@ -12,8 +12,34 @@ TEXT_BLOCK = 50  # Текстовое ограничение для __str__
 
 TEXT_BLOCK_TITLE = 15
 
+POST_EXCERPT_LENGTH = 300  # Отрывок поста в лентах, символов.
+
 LOGIN_URL = 'users:login'
 
+# Кеш результатов запросов (core.querycache). При нескольких процессах
+# нужен общий для всех бэкенд кеша, иначе сброс по записи не дойдёт до
+# соседних процессов.
+QUERY_CACHE_ALIAS = 'default'
+
+QUERY_CACHE_TIMEOUT = 5 * 60
+
+# Кеш поиска пользователя по username и группы по slug (core.identity).
+IDENTITY_CACHE_TIMEOUT = 60 * 60
+
+IDENTITY_MISS_TIMEOUT = 30  # Сколько помнить, что такого адреса нет.
+
+# Снимок пользователя сессии (core.auth.CachedAuthenticationMiddleware).
+AUTH_USER_CACHE_TIMEOUT = 15 * 60
+
+# Сессии в кеше; в базу пишутся только изменения (core.sessions).
+SESSION_ENGINE = 'core.sessions'
+
+SESSION_SAVE_EVERY_REQUEST = True  # Скользящий срок cookie.
+
+SESSION_REFRESH_INTERVAL = 24 * 60 * 60  # Как часто продлевать срок в базе.
+
+SESSION_CLEANUP_CHUNK_SIZE = 500  # Сессий за один DELETE в clear_sessions.
+
 LOGIN_REDIRECT_URL = 'posts:index'
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,7 +48,58 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Каталоги медиа, открытые без авторизации.
+MEDIA_PUBLIC_PREFIXES = ('posts/', 'cache/')
+
+# 'X-Accel-Redirect' для nginx, 'X-Sendfile' для Apache, None — отдаёт Django.
+MEDIA_ACCEL_HEADER = None
+
+MEDIA_ACCEL_PREFIX = '/protected-media/'  # internal location в nginx.
+
+MEDIA_CACHE_MAX_AGE = 60 * 60  # Для файлов без хеша в имени.
+
+DEFAULT_FILE_STORAGE = 'core.storage.ShardedFileSystemStorage'
+
+MEDIA_SHARD_DEPTH = 2  # Число уровней подкаталогов для загрузок.
+
+MEDIA_SHARD_WIDTH = 2  # Символов хеша на один уровень.
+
+MEDIA_GC_GRACE_HOURS = 24  # Сколько ждать, прежде чем удалить сироту.
+
+MEDIA_GC_CHUNK_SIZE = 1000
+
+# Загрузки крупнее этого размера пишутся во временный файл, а не в память.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+
+IMAGE_MAX_PIXELS = 50 * 1000 * 1000  # Защита от «декомпрессионных бомб».
+
+IMAGE_MAX_SIDE = 1920  # Картинки крупнее уменьшаются при загрузке.
+
+IMAGE_JPEG_QUALITY = 85
+
+# Докачиваемые загрузки собираются здесь до создания поста.
+CHUNKED_UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+
+CHUNKED_UPLOAD_MAX_SIZE = 50 * 1024 * 1024
+
+CHUNKED_UPLOAD_EXPIRE_HOURS = 24  # Брошенные загрузки удаляет gc_media.
+
+# Письма кладутся в очередь mailer, а доставляет их MAILER_BACKEND.
+EMAIL_BACKEND = 'mailer.backends.OutboxBackend'
+
+MAILER_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+MAILER_BATCH_SIZE = 100  # Писем за одно соединение.
+
+MAILER_RATE_LIMIT = 10  # Писем в секунду; 0 — без ограничения.
+
+MAILER_MAX_ATTEMPTS = 5
+
+MAILER_RETRY_DELAY = 60  # Секунд до первой повторной попытки.
+
+MAILER_LEASE = 10 * 60  # Через сколько вернуть письмо упавшего отправителя.
+
+MAILER_KEEP_DAYS = 30  # Сколько хранить отправленные письма.
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -61,16 +138,21 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
+    'jobs.apps.JobsConfig',
+    'events.apps.EventsConfig',
+    'mailer.apps.MailerConfig',
     'sorl.thumbnail',
 
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.routers.PrimaryPinMiddleware',
+    'core.writer.WriteTimeoutMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -97,15 +179,168 @@ TEMPLATES = [
     },
 ]
 
+# Шаблоны, которые рендерит Jinja2 (core.jinja2), например
+# ('posts/index.html', 'posts/includes/feed_card.html'); остальные —
+# шаблонизатор Django. Сравнить движки: manage.py bench_templates.
+JINJA2_TEMPLATES = ()
+
+try:  # Jinja2 — необязательная зависимость.
+    import jinja2.environment  # noqa: F401
+except ImportError:
+    pass
+else:
+    TEMPLATES.insert(
+        0,
+        {
+            'BACKEND': 'core.jinja2.Jinja2Backend',
+            'NAME': 'jinja2',
+            'DIRS': [os.path.join(BASE_DIR, 'templates_jinja2')],
+            'APP_DIRS': False,
+            'OPTIONS': {
+                'environment': 'core.jinja2.environment',
+                'context_processors': TEMPLATES[0]['OPTIONS'][
+                    'context_processors'
+                ],
+            },
+        },
+    )
+
 WSGI_APPLICATION = 'journal.wsgi.application'
 
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
     },
 }
 
+# Локальные реплики для чтения, их обновляет команда sync_replicas.
+DATABASE_REPLICAS = []
+
+DATABASES.update(
+    {
+        f'replica{index}': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{path}?mode=ro',
+            'OPTIONS': {'uri': True},
+            'REPLICA_PATH': path,
+            'CONN_MAX_AGE': 600,
+            'PRAGMAS': {'journal_mode': None, 'query_only': 1},
+            'TEST': {'MIRROR': 'default'},
+        }
+        for index, path in enumerate(DATABASE_REPLICAS)
+    },
+)
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Модели, чтение которых в лентах (@replica_reads) уходит в реплики.
+REPLICA_MODELS = ('posts.post', 'posts.group', 'posts.comment', 'posts.follow')
+
+REPLICA_SYNC_INTERVAL = 5  # Секунд между снимками sync_replicas.
+
+# Сколько помнить время последней записи пользователя; больше интервала
+# синхронизации, иначе после записи можно прочитать устаревшую реплику.
+REPLICA_PIN_MAX_SECONDS = 60 * 60
+
+# Архив старых постов: файлы posts_<год>.sqlite3, их пополняет archive_posts.
+ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive')
+
+# К соединению SQLite подключается не больше 10 баз; лента читает архивы
+# окнами по столько лет, остальные места остаются про запас.
+ARCHIVE_MAX_ATTACHED = 8
+
+ARCHIVE_AFTER_DAYS = 365
+
+ARCHIVE_BATCH_SIZE = 500
+
+# Удаление пользователей и групп из админки: задача run_deletion очереди
+# jobs или команда run_deletions.
+DELETION_CHUNK_SIZE = 500  # Строк за одну транзакцию.
+
+DELETION_SLEEP = 0.05  # Пауза между порциями, чтобы не мешать сайту.
+
+POST_PURGE_AFTER_HOURS = 24  # Когда purge_posts вычищает удалённые посты.
+
+# Кеш готовых карточек постов в лентах (posts.cards); ключ включает
+# версию карточки, так что устаревшие просто вытесняются.
+POST_CARD_TIMEOUT = 24 * 60 * 60
+
+# Дайджест новых постов подписок; расписание — send-digests в JOBS_PERIODIC.
+SITE_URL = 'http://localhost:8000'  # Для ссылок в письмах.
+
+DIGEST_WINDOW_HOURS = 7 * 24  # Посты старше в дайджест не попадают.
+
+DIGEST_MAX_POSTS = 20  # Постов в одном письме.
+
+DIGEST_BATCH_SIZE = 200  # Получателей в одной транзакции.
+
+# Счётчик новых постов на вкладках лент (posts.unread).
+NEW_POSTS_TIMEOUT = 60 * 60  # Сколько хранить отметки последних постов.
+
+NEW_POSTS_MAX_COUNT = 99  # Больше показывается как «99+».
+
+NEW_POSTS_POLL_INTERVAL = 30  # Секунд между опросами счётчика.
+
+# Очередь задач jobs: воркер запускается командой run_jobs.
+JOBS_EAGER = False  # Выполнять задачи сразу, без очереди.
+
+JOBS_THREADS = 2  # Потоков воркера; писатель в SQLite всё равно один.
+
+JOBS_POLL_INTERVAL = 1.0  # Секунд между опросами пустой очереди.
+
+JOBS_LEASE = 15 * 60  # Через сколько задачу упавшего воркера вернуть.
+
+JOBS_KEEP_DAYS = 7  # Сколько хранить выполненные задачи.
+
+# Периодические задачи: имя -> задача и расписание в формате cron (UTC).
+JOBS_PERIODIC = {
+    'purge-posts': {'task': 'posts.tasks.purge_posts', 'cron': '*/30 * * * *'},
+    'prune-jobs': {'task': 'jobs.tasks.prune_jobs', 'cron': '0 4 * * *'},
+    'dispatch-events': {
+        'task': 'events.tasks.dispatch_events',
+        'cron': '* * * * *',
+    },
+    'prune-events': {
+        'task': 'events.tasks.prune_events',
+        'cron': '30 4 * * *',
+    },
+    # Подбирает письма, отложенные после ошибки отправки.
+    'send-mail': {'task': 'mailer.tasks.send_queued_mail', 'cron': '* * * * *'},
+    'prune-mail': {'task': 'mailer.tasks.prune_mail', 'cron': '0 5 * * *'},
+    'send-digests': {'task': 'posts.tasks.send_digests', 'cron': '0 7 * * *'},
+}
+
+# Outbox событий. Раз в минуту их доставляет очередь задач; если нужна
+# задержка меньше, рядом запускается dispatch_events --every 1.
+EVENTS_BATCH_SIZE = 100  # Событий в одной транзакции потребителя.
+
+EVENTS_KEEP_DAYS = 7  # Сколько хранить доставленные события для повтора.
+
+# Переопределения PRAGMA из core.db.DEFAULT_PRAGMAS, None отключает PRAGMA.
+# Для отдельной базы их можно задать ключом PRAGMAS в DATABASES.
+SQLITE_PRAGMAS = {}
+
+# Записи из представлений идут через один поток-писатель (core.writer).
+# Писатель свой в каждом процессе: очередь полностью устраняет ожидание
+# блокировки, только если сайт обслуживает один процесс (например,
+# gunicorn --workers 1 --threads N).
+SQLITE_WRITE_QUEUE = False
+
+SQLITE_WRITE_QUEUE_BATCH = 50  # Записей в одной транзакции писателя.
+
+SQLITE_WRITE_QUEUE_TIMEOUT = 10  # Секунд ожидания результата записи.
+
+# Бэкапы и обслуживание базы командой sqlite_maintenance.
+SQLITE_BACKUP_DIR = os.path.join(BASE_DIR, 'backups')
+
+SQLITE_BACKUP_KEEP = 7  # Сколько последних бэкапов хранить.
+
+SQLITE_ANALYSIS_LIMIT = 1000  # Строк индекса, которые читает ANALYZE.
+
+SQLITE_VACUUM_PAGES = 1000  # Страниц за один incremental_vacuum.
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
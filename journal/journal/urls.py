@@ -1,9 +1,9 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
 
 from about.apps import AboutConfig
+from core.views import serve_media
 from posts.apps import PostsConfig
 from users.apps import UsersConfig
 
@@ -16,13 +16,14 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('auth/', include('users.urls', namespace=UsersConfig.name)),
     path('auth/', include('django.contrib.auth.urls')),
+    re_path(
+        r'^%s(?P<path>.+)$' % settings.MEDIA_URL.lstrip('/'),
+        serve_media,
+        name='media',
+    ),
 ]
 
 
 if settings.DEBUG:
     import debug_toolbar
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT,
-    )
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),) 
@@ -0,0 +1,43 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from mailer.models import Message
+
+
+@admin.register(Message)
+class MessageAdmin(admin.ModelAdmin):
+    list_display = (
+        'subject',
+        'recipients',
+        'status',
+        'attempts',
+        'created',
+        'sent',
+    )
+    list_filter = ('status',)
+    search_fields = ('subject', 'recipients')
+    readonly_fields = (
+        'subject',
+        'recipients',
+        'status',
+        'send_after',
+        'attempts',
+        'error',
+        'created',
+        'sent',
+    )
+    exclude = ('data', 'locked_until')
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        count = queryset.filter(status=Message.FAILED).update(
+            status=Message.QUEUED,
+            attempts=0,
+            send_after=timezone.now(),
+        )
+        self.message_user(request, f'Возвращено в очередь: {count}')
+
+    retry.short_description = 'Отправить ещё раз'
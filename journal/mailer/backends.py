@@ -0,0 +1,26 @@
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+
+from mailer.models import Message
+from mailer.tasks import send_queued_mail
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который только кладёт письма в очередь.
+
+    send_messages() возвращается сразу; письма доставляет отправитель
+    (mailer.sender) через настоящий бэкенд из MAILER_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        messages = [
+            Message.from_email_message(email)
+            for email in email_messages
+            if email.recipients()
+        ]
+        if not messages:
+            return 0
+        with transaction.atomic():
+            Message.objects.bulk_create(messages)
+            send_queued_mail.defer()
+        return len(messages)
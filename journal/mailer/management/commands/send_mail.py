@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from mailer.sender import send_queued
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди mailer через MAILER_BACKEND.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MAILER_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help='Повторять каждые N секунд; 0 — один проход.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = send_queued(options['batch_size'])
+            self.stdout.write(f'Отправлено писем: {sent}')
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,91 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:06
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name='Message',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'created',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'subject',
+                    models.CharField(max_length=255, verbose_name='тема'),
+                ),
+                ('recipients', models.TextField(verbose_name='получатели')),
+                ('data', models.TextField(verbose_name='письмо')),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('queued', 'в очереди'),
+                            ('sending', 'отправляется'),
+                            ('sent', 'отправлено'),
+                            ('failed', 'ошибка'),
+                        ],
+                        default='queued',
+                        max_length=16,
+                        verbose_name='состояние',
+                    ),
+                ),
+                (
+                    'send_after',
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name='отправить после',
+                    ),
+                ),
+                (
+                    'attempts',
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name='попыток'
+                    ),
+                ),
+                (
+                    'locked_until',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='занято до'
+                    ),
+                ),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                (
+                    'sent',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='отправлено'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Письмо',
+                'verbose_name_plural': 'Письма',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(
+                fields=['status', 'send_after'],
+                name='mailer_message_queue_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,69 @@
+import base64
+import pickle
+
+from django.db import models
+from django.utils import timezone
+
+from core.models import CreatedModel
+
+
+class Message(CreatedModel):
+    """Письмо в очереди на отправку."""
+
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'в очереди'),
+        (SENDING, 'отправляется'),
+        (SENT, 'отправлено'),
+        (FAILED, 'ошибка'),
+    )
+
+    subject = models.CharField('тема', max_length=255)
+    recipients = models.TextField('получатели')
+    data = models.TextField('письмо')
+    status = models.CharField(
+        'состояние',
+        max_length=16,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    send_after = models.DateTimeField('отправить после', default=timezone.now)
+    attempts = models.PositiveSmallIntegerField('попыток', default=0)
+    locked_until = models.DateTimeField('занято до', blank=True, null=True)
+    error = models.TextField('ошибка', blank=True)
+    sent = models.DateTimeField('отправлено', blank=True, null=True)
+
+    class Meta:
+        ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('status', 'send_after'),
+                name='mailer_message_queue_idx',
+            ),
+        )
+        verbose_name = 'Письмо'
+        verbose_name_plural = 'Письма'
+
+    def __str__(self) -> str:
+        return self.subject[:50]
+
+    @classmethod
+    def from_email_message(cls, email):
+        """Строка очереди для EmailMessage со всеми вложениями."""
+        connection, email.connection = email.connection, None
+        try:
+            data = base64.b64encode(pickle.dumps(email)).decode()
+        finally:
+            email.connection = connection
+        return cls(
+            subject=email.subject[:255],
+            recipients=', '.join(email.recipients()),
+            data=data,
+        )
+
+    @property
+    def email(self):
+        return pickle.loads(base64.b64decode(self.data))
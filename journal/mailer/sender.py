@@ -0,0 +1,123 @@
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from mailer.models import Message
+
+
+def claim(batch_size):
+    """Забирает порцию писем, которые пора отправить.
+
+    Письма, застрявшие в отправке дольше MAILER_LEASE, забираются снова.
+    """
+    now = timezone.now()
+    ids = list(
+        Message.objects.filter(
+            Q(status=Message.QUEUED, send_after__lte=now)
+            | Q(status=Message.SENDING, locked_until__lt=now),
+        )
+        .order_by('send_after', 'pk')
+        .values_list('pk', flat=True)[:batch_size],
+    )
+    lease = now + timedelta(seconds=settings.MAILER_LEASE)
+    # Захват условный: то, что успел взять другой отправитель, пропускаем.
+    Message.objects.filter(pk__in=ids).filter(
+        Q(status=Message.QUEUED) | Q(locked_until__lt=now),
+    ).update(status=Message.SENDING, locked_until=lease)
+    return list(
+        Message.objects.filter(pk__in=ids, locked_until=lease).order_by('pk'),
+    )
+
+
+class RateLimiter:
+    """Не больше rate писем в секунду; 0 — без ограничения."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next = time.monotonic()
+
+    def wait(self):
+        now = time.monotonic()
+        if self.next > now:
+            time.sleep(self.next - now)
+        self.next = max(now, self.next) + self.interval
+
+
+def fail(message, error):
+    attempts = message.attempts + 1
+    if attempts < settings.MAILER_MAX_ATTEMPTS:
+        delay = settings.MAILER_RETRY_DELAY * 2 ** (attempts - 1)
+        Message.objects.filter(pk=message.pk).update(
+            status=Message.QUEUED,
+            attempts=attempts,
+            send_after=timezone.now() + timedelta(seconds=delay),
+            locked_until=None,
+            error=error,
+        )
+    else:
+        Message.objects.filter(pk=message.pk).update(
+            status=Message.FAILED,
+            attempts=attempts,
+            locked_until=None,
+            error=error,
+        )
+
+
+def send_batch(batch_size=None):
+    """Отправляет порцию писем через одно соединение MAILER_BACKEND.
+
+    Письмо, которое не удалось отправить, повторяется с растущей паузой,
+    пока не кончатся MAILER_MAX_ATTEMPTS; после ошибки соединение
+    открывается заново.
+
+    Returns:
+    Число отправленных писем.
+    """
+    messages = claim(batch_size or settings.MAILER_BATCH_SIZE)
+    if not messages:
+        return 0
+    limiter = RateLimiter(settings.MAILER_RATE_LIMIT)
+    connection = get_connection(settings.MAILER_BACKEND)
+    sent = []
+    try:
+        for message in messages:
+            limiter.wait()
+            try:
+                connection.open()
+                connection.send_messages([message.email])
+            except Exception:
+                fail(message, traceback.format_exc())
+                connection.close()
+                continue
+            sent.append(message.pk)
+    finally:
+        connection.close()
+        Message.objects.filter(pk__in=sent).update(
+            status=Message.SENT,
+            locked_until=None,
+            error='',
+            sent=timezone.now(),
+        )
+    return len(sent)
+
+
+def send_queued(batch_size=None):
+    """Отправляет порции, пока очередь не опустеет."""
+    total = 0
+    while True:
+        count = send_batch(batch_size)
+        if not count and not claimable():
+            return total
+        total += count
+
+
+def claimable():
+    return Message.objects.filter(
+        status=Message.QUEUED,
+        send_after__lte=timezone.now(),
+    ).exists()
@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from jobs.queue import PRIORITY_HIGH, PRIORITY_LOW, task
+from mailer.models import Message
+from mailer.sender import send_queued
+
+# Строк за один DELETE при чистке очереди писем.
+PRUNE_CHUNK_SIZE = 500
+
+
+@task(priority=PRIORITY_HIGH, max_attempts=1)
+def send_queued_mail():
+    send_queued()
+
+
+@task(priority=PRIORITY_LOW, max_attempts=1)
+def prune_mail():
+    """Удаляет отправленные письма старше MAILER_KEEP_DAYS."""
+    cutoff = timezone.now() - timedelta(days=settings.MAILER_KEEP_DAYS)
+    while True:
+        ids = list(
+            Message.objects.filter(status=Message.SENT, sent__lt=cutoff)
+            .values_list('pk', flat=True)[:PRUNE_CHUNK_SIZE],
+        )
+        if not ids:
+            return
+        Message.objects.filter(pk__in=ids).delete()
@@ -0,0 +1,89 @@
+import time
+
+from django.core import mail
+from django.core.mail import EmailMessage, send_mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+
+from jobs.models import Job
+from mailer.models import Message
+from mailer.sender import send_queued
+
+connections_opened = []
+
+
+class CountingBackend(EmailBackend):
+    """locmem с подсчётом соединений; адрес fail@ не принимается."""
+
+    opened = False
+
+    def open(self):
+        if not self.opened:
+            self.opened = True
+            connections_opened.append(self)
+        return True
+
+    def close(self):
+        self.opened = False
+
+    def send_messages(self, messages):
+        for message in messages:
+            if 'fail@example.com' in message.recipients():
+                raise ConnectionError('сервер отказал')
+        return super().send_messages(messages)
+
+
+@override_settings(
+    EMAIL_BACKEND='mailer.backends.OutboxBackend',
+    MAILER_BACKEND='mailer.test.CountingBackend',
+    MAILER_RATE_LIMIT=0,
+)
+class MailerTest(TestCase):
+    def setUp(self):
+        connections_opened.clear()
+
+    def test_send_only_enqueues(self):
+        """send_mail кладёт письмо в очередь и ставит задачу отправки."""
+        send_mail('Тема', 'Текст', 'from@example.com', ['to@example.com'])
+        self.assertEqual(mail.outbox, [])
+        message = Message.objects.get()
+        self.assertEqual(message.recipients, 'to@example.com')
+        self.assertEqual(message.status, Message.QUEUED)
+        self.assertEqual(
+            Job.objects.get().name,
+            'mailer.tasks.send_queued_mail',
+        )
+
+    def test_batch_over_one_connection(self):
+        """Порция писем уходит через одно соединение."""
+        email = EmailMessage('С вложением', 'Текст', to=['to@example.com'])
+        email.attach('notes.txt', 'заметки', 'text/plain')
+        email.send()
+        for number in range(4):
+            send_mail(f'Письмо {number}', 'Текст', None, ['to@example.com'])
+        self.assertEqual(send_queued(), 5)
+        self.assertEqual(len(connections_opened), 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(mail.outbox[0].attachments[0][0], 'notes.txt')
+        self.assertFalse(Message.objects.exclude(status=Message.SENT).exists())
+
+    @override_settings(MAILER_MAX_ATTEMPTS=2, MAILER_RETRY_DELAY=0)
+    def test_retry_then_fail(self):
+        """Неотправленное письмо повторяется, остальные не страдают."""
+        send_mail('Плохое', 'Текст', None, ['fail@example.com'])
+        send_mail('Хорошее', 'Текст', None, ['to@example.com'])
+        self.assertEqual(send_queued(), 1)
+        failed = Message.objects.get(subject='Плохое')
+        self.assertEqual(failed.status, Message.FAILED)
+        self.assertEqual(failed.attempts, 2)
+        self.assertIn('сервер отказал', failed.error)
+        self.assertEqual([email.subject for email in mail.outbox], ['Хорошее'])
+
+    @override_settings(MAILER_RATE_LIMIT=50)
+    def test_rate_limit(self):
+        """Письма отправляются не быстрее MAILER_RATE_LIMIT в секунду."""
+        for number in range(6):
+            send_mail(f'Письмо {number}', 'Текст', None, ['to@example.com'])
+        started = time.monotonic()
+        send_queued()
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
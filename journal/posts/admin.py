@@ -1,6 +1,46 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
-from posts.models import Comment, Follow, Group, Post
+from posts.deletion import schedule_deletion
+from posts.models import Comment, DeletionJob, Follow, Group, Post
+from posts.tasks import run_deletion
+
+User = get_user_model()
+
+
+class BackgroundDeleteMixin:
+    """Удаление из админки ставит задачу в очередь и сразу отвечает.
+
+    Страница подтверждения не перечисляет связанные объекты: их сбор
+    и есть тот каскад, который здесь нужно не делать в запросе.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        objs = list(objs)
+        model_count = {self.opts.verbose_name_plural: len(objs)}
+        return [str(obj) for obj in objs], model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        run_deletion.defer(schedule_deletion(obj).pk)
+        self.message_deletion(request, 1)
+
+    def delete_queryset(self, request, queryset):
+        objs = list(queryset)
+        for obj in objs:
+            run_deletion.defer(schedule_deletion(obj).pk)
+        self.message_deletion(request, len(objs))
+
+    def message_deletion(self, request, count):
+        self.message_user(
+            request,
+            f'Поставлено в очередь на удаление: {count}. '
+            'Ход удаления виден в разделе «Фоновые удаления».',
+            messages.INFO,
+        )
 
 
 @admin.register(Post)
@@ -19,7 +59,7 @@ class PostAdmin(admin.ModelAdmin):
 
 
 @admin.register(Group)
-class GroupAdmin(admin.ModelAdmin):
+class GroupAdmin(BackgroundDeleteMixin, admin.ModelAdmin):
     list_display = (
         'title',
         'description',
@@ -52,3 +92,51 @@ class FollowAdmin(admin.ModelAdmin):
     search_fields = ('author',)
     list_filter = ('author', 'user')
     empty_value_display = '-пусто-'
+
+
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class BackgroundDeleteUserAdmin(BackgroundDeleteMixin, UserAdmin):
+    pass
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = (
+        'kind',
+        'object_repr',
+        'status',
+        'step',
+        'processed',
+        'created',
+        'finished',
+    )
+    list_filter = ('status', 'kind')
+    readonly_fields = (
+        'kind',
+        'object_id',
+        'object_repr',
+        'status',
+        'step',
+        'processed',
+        'error',
+        'created',
+        'finished',
+    )
+    actions = ('retry',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def retry(self, request, queryset):
+        """Возвращает упавшие задачи в очередь; удалённое не повторяется."""
+        jobs = list(queryset.filter(status=DeletionJob.FAILED))
+        for job in jobs:
+            job.status = DeletionJob.PENDING
+            job.save(update_fields=['status'])
+            run_deletion.defer(job.pk)
+        self.message_user(request, f'Возвращено в очередь: {len(jobs)}')
+
+    retry.short_description = 'Повторить упавшие задачи'
@@ -1,6 +1,16 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = 'публикации'
+
+    def ready(self):
+        from posts.identity import group_by_slug, user_by_username
+        from posts.models import Post
+        from posts.unread import post_saved
+
+        user_by_username.connect()
+        group_by_slug.connect()
+        post_save.connect(post_saved, sender=Post)
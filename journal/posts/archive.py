@@ -0,0 +1,312 @@
+import functools
+import heapq
+import os
+import re
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import prefetch_related_objects
+from django.utils.functional import cached_property
+
+from posts.models import Comment, Post
+
+ARCHIVE_FILE_RE = re.compile(r'^posts_(\d{4})\.sqlite3$')
+
+
+def archive_path(year):
+    return os.path.join(settings.ARCHIVE_DIR, f'posts_{year}.sqlite3')
+
+
+def archive_years():
+    """Годы, за которые есть файлы архива, от новых к старым."""
+    try:
+        names = os.listdir(settings.ARCHIVE_DIR)
+    except FileNotFoundError:
+        return []
+    matches = filter(None, map(ARCHIVE_FILE_RE.match, names))
+    return sorted((int(match.group(1)) for match in matches), reverse=True)
+
+
+def table_columns(cursor, schema, table):
+    cursor.execute(f'PRAGMA "{schema}".table_info("{table}")')
+    return [row[1] for row in cursor.fetchall()]
+
+
+def select_from(cursor, model, schema, where=''):
+    """SELECT по таблице модели в архиве.
+
+    Архив мог быть записан при старой схеме: столбцы, которых в нём нет,
+    читаются как NULL.
+    """
+    table = model._meta.db_table
+    columns = table_columns(cursor, schema, table)
+    select_list = ', '.join(
+        f'"{field.column}"'
+        if field.column in columns
+        else f'NULL AS "{field.column}"'
+        for field in model._meta.concrete_fields
+    )
+    return f'SELECT {select_list} FROM "{schema}"."{table}" {where}'
+
+
+def attach_archives(connection, years):
+    """Подключает файлы архива за годы к соединению только на чтение.
+
+    SQLite подключает к соединению ограниченное число баз, поэтому
+    одновременно подключено не больше ARCHIVE_MAX_ATTACHED архивов:
+    когда мест не хватает, архивы других годов отключаются. Подключение
+    переживает запрос вместе с постоянным соединением, так что ATTACH
+    повторяется, только когда нужны другие годы.
+
+    Returns:
+    Схемы в порядке years.
+    """
+    if len(years) > settings.ARCHIVE_MAX_ATTACHED:
+        raise ValueError('Слишком много архивов для одного запроса.')
+    wanted = {
+        f'archive_{year}': os.path.abspath(archive_path(year))
+        for year in years
+    }
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA database_list')
+        attached = {
+            row[1]: row[2]
+            for row in cursor.fetchall()
+            if row[1].startswith('archive_')
+        }
+        missing = [
+            schema
+            for schema, path in wanted.items()
+            if attached.get(schema) != path
+        ]
+        free = settings.ARCHIVE_MAX_ATTACHED - len(attached)
+        for schema, path in attached.items():
+            if wanted.get(schema) == path:
+                continue
+            # Свой год отключается, если ARCHIVE_DIR сменился, пока
+            # соединение было открыто; чужие — только ради места.
+            if schema in wanted or free < len(missing):
+                cursor.execute(f'DETACH DATABASE "{schema}"')
+                free += 1
+        for schema in missing:
+            cursor.execute(
+                f'ATTACH DATABASE %s AS "{schema}"',
+                [f'file:{wanted[schema]}?mode=ro'],
+            )
+    return list(wanted)
+
+
+def file_stat(year):
+    path = archive_path(year)
+    return path, os.stat(path).st_mtime_ns
+
+
+def where_clause(filters):
+    """WHERE по равенству столбцов; список значений даёт IN."""
+    conditions, params = [], []
+    for column, value in filters.items():
+        if isinstance(value, (list, tuple)):
+            if not value:
+                return 'WHERE 0', []
+            placeholders = ', '.join(['%s'] * len(value))
+            conditions.append(f'"{column}" IN ({placeholders})')
+            params.extend(value)
+        else:
+            conditions.append(f'"{column}" = %s')
+            params.append(value)
+    if not conditions:
+        return '', []
+    return 'WHERE ' + ' AND '.join(conditions), params
+
+
+@functools.lru_cache(maxsize=1024)
+def archive_count(alias, year, stat, where, params):
+    """Число постов в архиве; файл меняется только в archive_posts,
+    поэтому результат кешируется, пока не изменились его путь и mtime.
+    """
+    del stat
+    connection = connections[alias]
+    [schema] = attach_archives(connection, [year])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT COUNT(*) FROM "{schema}"."{Post._meta.db_table}" {where}',
+            list(params),
+        )
+        return cursor.fetchone()[0]
+
+
+def attach_comments(posts, alias, schemas):
+    """Кладёт в prefetch-кеш постов их комментарии из архивов."""
+    by_id = {post.pk: post for post in posts}
+    if not by_id:
+        return
+    where = 'WHERE "post_id" IN ({})'.format(', '.join(['%s'] * len(by_id)))
+    with connections[alias].cursor() as cursor:
+        parts = [
+            select_from(cursor, Comment, schema, where) for schema in schemas
+        ]
+    comments = list(
+        Comment.objects.db_manager(alias).raw(
+            ' UNION ALL '.join(parts) + ' ORDER BY "id"',
+            list(by_id) * len(schemas),
+        ),
+    )
+    prefetch_related_objects(comments, 'author')
+    for post in posts:
+        queryset = post.comments.all()
+        queryset._result_cache = [
+            comment for comment in comments if comment.post_id == post.pk
+        ]
+        queryset._prefetch_done = True
+        post._prefetched_objects_cache = {'comments': queryset}
+
+
+def archived_posts(filters, offset, limit):
+    """Посты из архивов, упорядоченные как лента, от новых к старым.
+
+    Годы, целиком лежащие до offset, отбрасываются по кешированным
+    количествам; остальные читаются окнами по ARCHIVE_MAX_ATTACHED лет,
+    каждое одним UNION ALL. Архивы делятся по годам, поэтому порядок
+    годов совпадает с порядком постов.
+    """
+    alias = router.db_for_read(Post)
+    where, params = where_clause(filters)
+    years = []
+    for year in archive_years():
+        if not years and offset:
+            count = archive_count(
+                alias,
+                year,
+                file_stat(year),
+                where,
+                tuple(params),
+            )
+            if count <= offset:
+                offset -= count
+                continue
+        years.append(year)
+
+    posts = []
+    window = settings.ARCHIVE_MAX_ATTACHED
+    for start in range(0, len(years), window):
+        if len(posts) >= limit:
+            break
+        posts += archived_window(
+            alias,
+            years[start:start + window],
+            (where, params),
+            offset,
+            limit - len(posts),
+        )
+        # Offset целиком приходится на первый год окна.
+        offset = 0
+    return posts
+
+
+def archived_window(alias, years, condition, offset, limit):
+    """Посты из архивов за несколько лет одним запросом."""
+    connection = connections[alias]
+    schemas = attach_archives(connection, years)
+    where, params = condition
+    with connection.cursor() as cursor:
+        parts = [
+            select_from(cursor, Post, schema, where) for schema in schemas
+        ]
+    posts = list(
+        Post.objects.db_manager(alias).raw(
+            ' UNION ALL '.join(parts)
+            + ' ORDER BY "pub_date" DESC, "id" DESC LIMIT %s OFFSET %s',
+            params * len(schemas) + [limit, offset],
+        ),
+    )
+    for post in posts:
+        post.archived = True
+    prefetch_related_objects(posts, 'author', 'group')
+    attach_comments(posts, alias, schemas)
+    return posts
+
+
+def archived_post(post_id):
+    """Пост из архива по id или None."""
+    posts = archived_posts({'id': post_id}, 0, 1)
+    return posts[0] if posts else None
+
+
+def archived_image_names(prefix, chunk_size):
+    """Имена картинок архивных постов по возрастанию, порциями по ключу."""
+    connection = connections[router.db_for_read(Post)]
+    streams = [
+        archived_table_names(connection, year, prefix, chunk_size)
+        for year in archive_years()
+    ]
+    return heapq.merge(*streams)
+
+
+def archived_table_names(connection, year, prefix, chunk_size):
+    last = ''
+    while True:
+        # Потоки чередуются, а архивов может быть больше, чем мест
+        # для подключения, поэтому год подключается перед каждой порцией.
+        [schema] = attach_archives(connection, [year])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT DISTINCT "image" FROM "{schema}".'
+                f'"{Post._meta.db_table}" '
+                'WHERE "image" LIKE %s AND "image" > %s '
+                'ORDER BY "image" LIMIT %s',
+                [prefix + '%', last, chunk_size],
+            )
+            chunk = [row[0] for row in cursor.fetchall()]
+        if not chunk:
+            return
+        yield from chunk
+        last = chunk[-1]
+
+
+class ArchivedFeed:
+    """Лента постов: горячая таблица, а за ней архивы по годам.
+
+    Подходит как object_list для Paginator и поддерживает только срезы.
+    Строки архивов читаются, только когда срез уходит дальше горячей
+    таблицы; для числа страниц хватает количества, закешированного до
+    следующего запуска archive_posts.
+    """
+
+    def __init__(self, queryset, **filters):
+        self.queryset = queryset
+        self.filters = filters
+
+    @cached_property
+    def hot_count(self):
+        return self.queryset.count()
+
+    def count(self):
+        alias = router.db_for_read(Post)
+        where, params = where_clause(self.filters)
+        return self.hot_count + sum(
+            archive_count(
+                alias,
+                year,
+                file_stat(year),
+                where,
+                tuple(params),
+            )
+            for year in archive_years()
+        )
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        start, stop = key.start or 0, key.stop
+        posts = []
+        if start < self.hot_count:
+            posts = list(self.queryset[start:min(stop, self.hot_count)])
+        if stop > self.hot_count:
+            skip = max(start - self.hot_count, 0)
+            posts += archived_posts(
+                self.filters,
+                skip,
+                stop - max(start, self.hot_count),
+            )
+        return posts
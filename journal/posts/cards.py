@@ -0,0 +1,58 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+KEY_PREFIX = 'posts:card'
+
+
+def card_version(post):
+    """Версия карточки: меняется вместе со всем, что на ней показано.
+
+    Правка поста, смена группы, переименование автора или группы и новый
+    комментарий дают новую версию, так что сбрасывать кеш не нужно —
+    старые карточки просто вытесняются. Всё это лента уже загрузила
+    через select_related и prefetch_related.
+    """
+    author, group = post.author, post.group
+    signature = repr((
+        post.excerpt,
+        post.image.name,
+        post.pub_date.isoformat(),
+        author.username,
+        author.first_name,
+        author.last_name,
+        group and (group.slug, group.title),
+        len(post.comments.all()),
+        post.archived,
+    ))
+    return hashlib.sha1(signature.encode()).hexdigest()
+
+
+def card_key(post, owner, hide_group):
+    """Ключ карточки; автору она показывается с кнопками правки."""
+    variant = f'{int(owner)}{int(hide_group)}'
+    return f'{KEY_PREFIX}:{post.pk}:{card_version(post)}:{variant}'
+
+
+def render_cards(user, posts, hide_group=False):
+    """Готовые карточки постов ленты по порядку.
+
+    Карточки берутся из кеша одним get_many; рендерятся и сохраняются
+    только отсутствующие.
+    """
+    keys = [card_key(post, user == post.author, hide_group) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = render_to_string(
+                'posts/includes/feed_card.html',
+                {'post': post, 'user': user, 'hide_group': hide_group},
+            )
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,13 @@
+from events.outbox import consumer
+from posts.events import POST_CREATED, POST_EDITED
+from posts.tasks import warm_thumbnails
+
+
+@consumer(POST_CREATED, POST_EDITED)
+def thumbnails(events):
+    """Ставит в очередь миниатюры постов с картинками."""
+    post_ids = {
+        event.data['post_id'] for event in events if event.data['image']
+    }
+    for post_id in sorted(post_ids):
+        warm_thumbnails.defer(post_id)
@@ -0,0 +1,289 @@
+import contextlib
+import functools
+import os
+import sqlite3
+import time
+import traceback
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_image
+
+from posts.archive import archive_path, archive_years
+from posts.models import Comment, DeletionJob, Follow, Group, Post, Upload
+
+User = get_user_model()
+
+
+def schedule_deletion(obj):
+    """Заводит задачу удаления пользователя или группы.
+
+    Пользователь сразу теряет возможность войти; сами строки удаляет
+    run_job — из очереди задач или командой run_deletions. Повторный
+    вызов возвращает уже созданную задачу.
+    """
+    kind = DeletionJob.USER if isinstance(obj, User) else DeletionJob.GROUP
+    if kind == DeletionJob.USER and obj.is_active:
+        obj.is_active = False
+        obj.save(update_fields=['is_active'])
+    job = DeletionJob.objects.filter(
+        kind=kind,
+        object_id=obj.pk,
+        finished__isnull=True,
+    ).first()
+    if job is not None:
+        return job
+    return DeletionJob.objects.create(
+        kind=kind,
+        object_id=obj.pk,
+        object_repr=str(obj)[:200],
+    )
+
+
+def delete_images(names):
+    """Удаляет файлы картинок вместе с миниатюрами.
+
+    Картинки, на которые ещё ссылаются посты, остаются на месте.
+    """
+    names = set(filter(None, names))
+    if not names:
+        return
+    names -= set(
+        Post.all_objects.filter(image__in=names)
+        .values_list('image', flat=True),
+    )
+    for name in names:
+        delete_image(name)
+
+
+def delete_chunk(queryset, limit):
+    """Удаляет первые limit строк выборки; возвращает их число."""
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:limit])
+    if ids:
+        queryset.model.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def delete_post_comments(user_id, limit):
+    return delete_chunk(Comment.objects.filter(post__author_id=user_id), limit)
+
+
+def delete_comments(user_id, limit):
+    return delete_chunk(Comment.objects.filter(author_id=user_id), limit)
+
+
+def delete_follows(user_id, limit):
+    return delete_chunk(
+        Follow.objects.filter(Q(user_id=user_id) | Q(author_id=user_id)),
+        limit,
+    )
+
+
+def delete_uploads(user_id, limit):
+    uploads = list(Upload.objects.filter(user_id=user_id)[:limit])
+    if uploads:
+        ids = [upload.pk for upload in uploads]
+        Upload.objects.filter(pk__in=ids).delete()
+        paths = [upload.path for upload in uploads]
+        transaction.on_commit(lambda: remove_files(paths))
+    return len(uploads)
+
+
+def remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def delete_posts(user_id, limit):
+    return purge_chunk(Post.all_objects.filter(author_id=user_id), limit)
+
+
+def purge_chunk(posts, limit):
+    """Удаляет первые limit постов выборки с комментариями и картинками."""
+    rows = list(posts.order_by('pk').values_list('pk', 'image')[:limit])
+    if rows:
+        Post.all_objects.filter(pk__in=[pk for pk, _ in rows]).delete()
+        names = [image for _, image in rows]
+        transaction.on_commit(lambda: delete_images(names))
+    return len(rows)
+
+
+def purge_deleted_posts(hours, chunk_size, sleep=0):
+    """Вычищает посты, удалённые больше hours часов назад.
+
+    Returns:
+    Число вычищенных постов.
+    """
+    cutoff = timezone.now() - timedelta(hours=hours)
+    posts = Post.all_objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+    purged = 0
+    while True:
+        with transaction.atomic():
+            count = purge_chunk(posts, chunk_size)
+        purged += count
+        if count < chunk_size:
+            return purged
+        if sleep:
+            time.sleep(sleep)
+
+
+def delete_archived_posts(user_id, limit):
+    """Удаляет посты пользователя и комментарии к ним из архивов."""
+    posts, comments = Post._meta.db_table, Comment._meta.db_table
+    done = 0
+    for year in archive_years():
+        with archive_connection(year) as archive:
+            if not archive_has(archive, posts):
+                continue
+            if archive_has(archive, comments):
+                done += archive.execute(
+                    f'DELETE FROM "{comments}" WHERE rowid IN ('
+                    f'SELECT rowid FROM "{comments}" WHERE "author_id" = ? '
+                    f'OR "post_id" IN (SELECT "id" FROM "{posts}" '
+                    f'WHERE "author_id" = ?) LIMIT ?)',
+                    (user_id, user_id, limit - done),
+                ).rowcount
+            if done < limit:
+                rows = archive.execute(
+                    f'SELECT rowid, "image" FROM "{posts}" '
+                    f'WHERE "author_id" = ? ORDER BY rowid LIMIT ?',
+                    (user_id, limit - done),
+                ).fetchall()
+                archive.executemany(
+                    f'DELETE FROM "{posts}" WHERE rowid = ?',
+                    [(rowid,) for rowid, _ in rows],
+                )
+                done += len(rows)
+                # Картинки удаляются ровно те, чьи строки удалены здесь.
+                transaction.on_commit(
+                    functools.partial(
+                        delete_images,
+                        [image for _, image in rows],
+                    ),
+                )
+        if done >= limit:
+            break
+    return done
+
+
+def delete_user(user_id, limit):
+    return delete_chunk(User.objects.filter(pk=user_id), limit)
+
+
+def ungroup_posts(group_id, limit):
+    ids = list(
+        Post.all_objects.filter(group_id=group_id)
+        .order_by('pk')
+        .values_list('pk', flat=True)[:limit],
+    )
+    if ids:
+        Post.all_objects.filter(pk__in=ids).update(group=None)
+    return len(ids)
+
+
+def ungroup_archived_posts(group_id, limit):
+    posts = Post._meta.db_table
+    done = 0
+    for year in archive_years():
+        with archive_connection(year) as archive:
+            if archive_has(archive, posts):
+                done += archive.execute(
+                    f'UPDATE "{posts}" SET "group_id" = NULL WHERE rowid IN ('
+                    f'SELECT rowid FROM "{posts}" WHERE "group_id" = ? '
+                    f'LIMIT ?)',
+                    (group_id, limit - done),
+                ).rowcount
+        if done >= limit:
+            break
+    return done
+
+
+def delete_group(group_id, limit):
+    return delete_chunk(Group.objects.filter(pk=group_id), limit)
+
+
+@contextlib.contextmanager
+def archive_connection(year):
+    """Соединение с файлом архива; изменения фиксируются на выходе."""
+    archive = sqlite3.connect(archive_path(year), timeout=30)
+    try:
+        with archive:
+            yield archive
+    finally:
+        archive.close()
+
+
+def archive_has(archive, table):
+    return archive.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+        (table,),
+    ).fetchone() is not None
+
+
+# Этапы удаления по порядку: сначала зависимые строки, потом сам объект.
+# Каждый этап удаляет не больше limit строк за вызов и возвращает их число;
+# повторный запуск после сбоя продолжает с того, что осталось.
+STEPS = {
+    DeletionJob.USER: (
+        ('post_comments', delete_post_comments),
+        ('comments', delete_comments),
+        ('follows', delete_follows),
+        ('uploads', delete_uploads),
+        ('posts', delete_posts),
+        ('archive', delete_archived_posts),
+        ('user', delete_user),
+    ),
+    DeletionJob.GROUP: (
+        ('posts', ungroup_posts),
+        ('archive', ungroup_archived_posts),
+        ('group', delete_group),
+    ),
+}
+
+
+def run_job(job, chunk_size, sleep=0):
+    """Выполняет задачу порциями, каждую в своей транзакции.
+
+    Между порциями блокировка записи отпускается, так что запросы сайта
+    ждут не дольше одной порции. Прогресс виден в админке.
+
+    Returns:
+    False, если задачу уже взял другой процесс.
+    """
+    claimed = DeletionJob.objects.filter(
+        pk=job.pk,
+        status=DeletionJob.PENDING,
+    ).update(status=DeletionJob.RUNNING)
+    if not claimed:
+        return False
+    try:
+        for step, delete in STEPS[job.kind]:
+            while True:
+                with transaction.atomic():
+                    count = delete(job.object_id, chunk_size)
+                    DeletionJob.objects.filter(pk=job.pk).update(
+                        step=step,
+                        processed=F('processed') + count,
+                    )
+                if count < chunk_size:
+                    break
+                if sleep:
+                    time.sleep(sleep)
+    except Exception:
+        DeletionJob.objects.filter(pk=job.pk).update(
+            status=DeletionJob.FAILED,
+            error=traceback.format_exc(),
+        )
+        raise
+    DeletionJob.objects.filter(pk=job.pk).update(
+        status=DeletionJob.DONE,
+        error='',
+        finished=timezone.now(),
+    )
+    return True
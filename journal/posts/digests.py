@@ -0,0 +1,185 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import DigestMark, Follow, Post
+
+User = get_user_model()
+
+
+class FragmentCache:
+    """Фрагменты писем по постам: каждый пост рендерится один раз
+    за прогон, сколько бы подписчиков его ни получило.
+    """
+
+    def __init__(self):
+        self.fragments = {}
+
+    def get(self, post):
+        if post.pk not in self.fragments:
+            context = {
+                'post': post,
+                'post_url': settings.SITE_URL
+                + reverse('posts:post_detail', args=(post.pk,)),
+            }
+            self.fragments[post.pk] = (
+                render_to_string('posts/email/digest_post.txt', context),
+                render_to_string('posts/email/digest_post.html', context),
+            )
+        return self.fragments[post.pk]
+
+
+def window_start_id(now):
+    """Последний id перед окном DIGEST_WINDOW_HOURS.
+
+    Посты старше окна в дайджест не попадают: первый дайджест не
+    присылает всю историю, а выборка постов для порции не уходит далеко
+    назад из-за пользователя, чьи авторы давно молчат.
+    """
+    start = now - timedelta(hours=settings.DIGEST_WINDOW_HOURS)
+    first = (
+        Post.all_objects.filter(pub_date__gte=start)
+        .order_by('pk')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if first is None:
+        last = Post.all_objects.order_by('-pk').values_list('pk', flat=True)
+        return last.first() or 0
+    return first - 1
+
+
+def recipients(batch_size):
+    """Активные пользователи с подписками, порциями по возрастанию id."""
+    last = 0
+    while True:
+        users = list(
+            User.objects.filter(
+                pk__gt=last,
+                is_active=True,
+                follower__isnull=False,
+            )
+            .distinct()
+            .order_by('pk')[:batch_size],
+        )
+        if not users:
+            return
+        yield users
+        last = users[-1].pk
+
+
+def render_digest(user, posts, fragments):
+    """Письмо пользователю, собранное из общих фрагментов постов."""
+    texts, htmls = zip(*(fragments.get(post) for post in posts))
+    context = {
+        'user': user,
+        'count': len(posts),
+        'site_url': settings.SITE_URL,
+    }
+    subject = render_to_string('posts/email/digest_subject.txt', context)
+    email = EmailMultiAlternatives(
+        ' '.join(subject.split()),
+        render_to_string(
+            'posts/email/digest.txt',
+            {**context, 'posts': ''.join(texts)},
+        ),
+        to=[user.email],
+    )
+    email.attach_alternative(
+        render_to_string(
+            'posts/email/digest.html',
+            {**context, 'posts': ''.join(htmls)},
+        ),
+        'text/html',
+    )
+    return email
+
+
+def send_batch(users, fragments, floor, now):
+    """Дайджесты для порции пользователей.
+
+    Запросов — несколько на порцию, а не на пользователя; каждый
+    пользователь перебирает только посты своих авторов.
+
+    Письма и новые отметки записываются в одной транзакции, так что
+    после сбоя посты не придут ни дважды, ни ни разу.
+
+    Returns:
+    Число поставленных в очередь писем.
+    """
+    marks = {
+        mark.user_id: mark
+        for mark in DigestMark.objects.filter(user__in=users)
+    }
+    authors = defaultdict(set)
+    for user_id, author_id in Follow.objects.filter(
+        user__in=users,
+    ).values_list('user_id', 'author_id'):
+        authors[user_id].add(author_id)
+    since = {
+        user.pk: max(
+            marks[user.pk].last_post_id if user.pk in marks else 0,
+            floor,
+        )
+        for user in users
+    }
+    by_author = defaultdict(list)
+    for post in Post.objects.filter(
+        pk__gt=min(since.values()),
+        author_id__in=set().union(*authors.values()),
+    ).select_related('author', 'group'):
+        by_author[post.author_id].append(post)
+
+    emails, new_marks, changed_marks = [], [], []
+    for user in users:
+        mine = sorted(
+            (
+                post
+                for author_id in authors[user.pk]
+                for post in by_author[author_id]
+                if post.pk > since[user.pk]
+            ),
+            key=lambda post: post.pk,
+        )
+        if not mine:
+            continue
+        if user.email:
+            # Самые новые посты, если их больше DIGEST_MAX_POSTS.
+            latest = mine[-settings.DIGEST_MAX_POSTS:][::-1]
+            emails.append(render_digest(user, latest, fragments))
+        mark = marks.get(user.pk) or DigestMark(user=user)
+        mark.last_post_id = mine[-1].pk
+        mark.sent = now
+        (changed_marks if mark.pk else new_marks).append(mark)
+
+    with transaction.atomic():
+        if emails:
+            get_connection().send_messages(emails)
+        DigestMark.objects.bulk_create(new_marks)
+        DigestMark.objects.bulk_update(
+            changed_marks,
+            ('last_post_id', 'sent'),
+        )
+    return len(emails)
+
+
+def send_digests(batch_size=None):
+    """Рассылает дайджесты новых постов всем подписчикам.
+
+    Returns:
+    Число поставленных в очередь писем.
+    """
+    now = timezone.now()
+    floor = window_start_id(now)
+    fragments = FragmentCache()
+    sent = 0
+    for users in recipients(batch_size or settings.DIGEST_BATCH_SIZE):
+        sent += send_batch(users, fragments, floor, now)
+    return sent
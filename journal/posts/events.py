@@ -0,0 +1,8 @@
+"""Имена доменных событий публикаций для events.outbox."""
+
+POST_CREATED = 'PostCreated'
+POST_EDITED = 'PostEdited'
+POST_DELETED = 'PostDeleted'
+COMMENT_ADDED = 'CommentAdded'
+FOLLOWED = 'Followed'
+UNFOLLOWED = 'Unfollowed'
@@ -1,9 +1,21 @@
+import mimetypes
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm, TextInput, Textarea
 
-from posts.models import Comment, Post
+from posts.images import ingest_image
+from posts.models import Comment, Post, Upload
 
 
 class PostForm(ModelForm):
+    """Форма поста.
+
+    Вместо файла в ``image`` можно передать в поле ``upload`` токен
+    завершённой докачиваемой загрузки.
+    """
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -20,6 +32,74 @@ class PostForm(ModelForm):
             ),
         }
 
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = user
+        self.finished_upload = None
+        self.upload_file = None
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return ingest_image(image)
+        return image
+
+    def clean(self):
+        cleaned_data = super().clean()
+        token = self.data.get('upload')
+        if not token or isinstance(cleaned_data.get('image'), UploadedFile):
+            return cleaned_data
+
+        try:
+            upload = Upload.objects.filter(
+                token=token,
+                user_id=getattr(self.user, 'pk', None),
+                completed=True,
+            ).first()
+        except ValidationError:
+            upload = None
+        if upload is None or not os.path.isfile(upload.path):
+            self.add_error('image', 'Загрузка не найдена или не завершена.')
+            return cleaned_data
+
+        content_type, _ = mimetypes.guess_type(upload.filename)
+        image = UploadedFile(
+            open(upload.path, 'rb'),
+            name=upload.filename,
+            content_type=content_type,
+            size=upload.size,
+        )
+        self.finished_upload = upload
+        self.upload_file = image
+        try:
+            cleaned_data['image'] = ingest_image(image)
+        except ValidationError as error:
+            self.add_error('image', error)
+        if cleaned_data.get('image') is not image:
+            # Картинка пересохранена в отдельный файл или отклонена.
+            self.close_upload()
+        return cleaned_data
+
+    def full_clean(self):
+        super().full_clean()
+        if self._errors:
+            self.close_upload()
+
+    def close_upload(self):
+        if self.upload_file is not None:
+            self.upload_file.close()
+            self.upload_file = None
+
+    def discard_upload(self):
+        """Удаляет собранный файл после того, как пост сохранён."""
+        if self.finished_upload is None:
+            return
+        self.close_upload()
+        if os.path.isfile(self.finished_upload.path):
+            os.remove(self.finished_upload.path)
+        self.finished_upload.delete()
+        self.finished_upload = None
+
 
 class CommentForm(ModelForm):
     class Meta:
@@ -0,0 +1,8 @@
+from django.contrib.auth import get_user_model
+
+from core.identity import IdentityCache
+from posts.models import Group
+
+user_by_username = IdentityCache(get_user_model(), 'username')
+
+group_by_slug = IdentityCache(Group, 'slug')
@@ -0,0 +1,69 @@
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+EXIF_ORIENTATION = 0x0112
+
+
+def ingest_image(upload):
+    """Готовит загруженную картинку к сохранению в хранилище.
+
+    Размер проверяется по заголовку, до полного декодирования. Картинка
+    поворачивается по EXIF, уменьшается до IMAGE_MAX_SIDE и
+    пересохраняется без метаданных. Небольшие картинки без EXIF и
+    анимации сохраняются как есть.
+
+    Returns:
+    Файл, который можно присвоить Post.image.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Файл не является изображением.',
+            code='invalid_image',
+        )
+    width, height = image.size
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое изображение: %(pixels)s пикселей.',
+            code='too_many_pixels',
+            params={'pixels': width * height},
+        )
+
+    max_side = settings.IMAGE_MAX_SIDE
+    exif = image.getexif()
+    if getattr(image, 'is_animated', False) or (
+        max(width, height) <= max_side and not exif
+    ):
+        upload.seek(0)
+        return upload
+
+    image_format = image.format
+    # Для JPEG декодер сразу уменьшает картинку в 2-8 раз.
+    image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side))
+    for key in ('exif', 'xmp', 'XML:com.adobe.xmp'):
+        image.info.pop(key, None)
+
+    options = {}
+    if image_format == 'JPEG':
+        options['quality'] = settings.IMAGE_JPEG_QUALITY
+        options['optimize'] = True
+    output = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+    )
+    image.save(output, image_format, **options)
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(
+        output,
+        name=upload.name,
+        content_type=upload.content_type,
+        size=size,
+    )
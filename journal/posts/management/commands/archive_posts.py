@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from core.querycache import invalidate_tables
+from posts.archive import archive_path
+from posts.models import Comment, Post
+
+# Индексы архива под запросы лент и gc_media.
+ARCHIVE_INDEXES = {
+    Post: (
+        ('pub_date',),
+        ('author_id', 'pub_date'),
+        ('group_id', 'pub_date'),
+        ('image',),
+    ),
+    Comment: (('post_id',),),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит старые посты с комментариями в архивные файлы SQLite, '
+        'по файлу на год.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.ARCHIVE_AFTER_DAYS,
+            help='Архивировать посты старше N дней.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.ARCHIVE_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Пауза между пачками в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            raise CommandError('Нельзя архивировать внутри транзакции.')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        os.makedirs(settings.ARCHIVE_DIR, exist_ok=True)
+        params = connections[DEFAULT_DB_ALIAS].get_connection_params()
+        self.db = sqlite3.connect(
+            params['database'],
+            uri=params.get('uri', False),
+            timeout=30,
+            isolation_level=None,
+        )
+        moved = 0
+        try:
+            while True:
+                batch = list(
+                    Post.objects.filter(pub_date__lt=cutoff)
+                    .order_by('pub_date')
+                    .values_list('pk', 'pub_date')[: options['batch_size']],
+                )
+                if not batch:
+                    break
+                by_year = defaultdict(list)
+                for pk, pub_date in batch:
+                    by_year[pub_date.year].append(pk)
+                for year, ids in by_year.items():
+                    self.move(year, ids)
+                moved += len(batch)
+                if options['sleep']:
+                    time.sleep(options['sleep'])
+        finally:
+            self.db.close()
+        self.stdout.write(f'Перенесено в архив: {moved}')
+
+    def move(self, year, ids):
+        """Копирует пачку постов в архив года и удаляет их из основной базы.
+
+        Копирование и удаление — две транзакции: при сбое между ними пост
+        окажется в обеих базах, и повторный запуск просто перезапишет
+        его копию. Потерять пост так нельзя.
+        """
+        self.db.execute(
+            'ATTACH DATABASE ? AS archive',
+            (f'file:{archive_path(year)}?mode=rwc',),
+        )
+        try:
+            for model in ARCHIVE_INDEXES:
+                self.prepare(model)
+            placeholders = ', '.join('?' * len(ids))
+            keys = ((Post, 'id'), (Comment, 'post_id'))
+            with self.db:
+                self.db.execute('BEGIN IMMEDIATE')
+                for model, column in keys:
+                    table = model._meta.db_table
+                    columns = ', '.join(
+                        f'"{name}"' for name in self.columns('main', table)
+                    )
+                    self.db.execute(
+                        f'INSERT OR REPLACE INTO archive."{table}" '
+                        f'({columns}) SELECT {columns} FROM main."{table}" '
+                        f'WHERE "{column}" IN ({placeholders})',
+                        ids,
+                    )
+            with self.db:
+                self.db.execute('BEGIN IMMEDIATE')
+                for model, column in reversed(keys):
+                    self.db.execute(
+                        f'DELETE FROM main."{model._meta.db_table}" '
+                        f'WHERE "{column}" IN ({placeholders})',
+                        ids,
+                    )
+        finally:
+            self.db.execute('DETACH DATABASE archive')
+        # Запись шла мимо соединений Django.
+        invalidate_tables(Post._meta.db_table, Comment._meta.db_table)
+
+    def columns(self, schema, table):
+        """Столбцы таблицы с их типами."""
+        rows = self.db.execute(f'PRAGMA {schema}.table_info("{table}")')
+        return {row[1]: (row[2], row[5]) for row in rows}
+
+    def prepare(self, model):
+        """Создаёт таблицу в архиве или дополняет её новыми столбцами.
+
+        Ограничения и внешние ключи в архив не переносятся: он только
+        читается, а пользователи и группы остаются в основной базе.
+        """
+        table = model._meta.db_table
+        main = self.columns('main', table)
+        archived = self.columns('archive', table)
+        if not archived:
+            definitions = ', '.join(
+                f'"{name}" {column_type}' + (' PRIMARY KEY' if pk else '')
+                for name, (column_type, pk) in main.items()
+            )
+            self.db.execute(f'CREATE TABLE archive."{table}" ({definitions})')
+        for name, (column_type, _) in main.items():
+            if archived and name not in archived:
+                self.db.execute(
+                    f'ALTER TABLE archive."{table}" '
+                    f'ADD COLUMN "{name}" {column_type}',
+                )
+        for columns in ARCHIVE_INDEXES[model]:
+            self.db.execute(
+                f'CREATE INDEX IF NOT EXISTS '
+                f'archive."{table}_{"_".join(columns)}" '
+                f'ON "{table}" ({", ".join(columns)})',
+            )
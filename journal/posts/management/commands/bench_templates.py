@@ -0,0 +1,115 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management.base import BaseCommand, CommandError
+from django.core.paginator import Paginator
+from django.template import engines
+from django.test import RequestFactory
+
+from posts.cards import render_cards
+from posts.models import Group
+from posts.views import group_feed, index_feed, profile_feed
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время рендера горячих шаблонов лент шаблонизатором '
+        'Django и Jinja2 на постах из базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=100)
+        parser.add_argument(
+            '--username',
+            help='Зритель страниц; по умолчанию аноним.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            jinja = engines['jinja2']
+        except KeyError:
+            raise CommandError('Jinja2 не установлен.')
+        django = engines['django']
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        if options['username']:
+            request.user = User.objects.get(username=options['username'])
+        self.stdout.write(
+            f'{"шаблон":<40}{"Django, мс":>12}{"Jinja2, мс":>12}{"x":>7}',
+        )
+        for name, context in self.cases(request):
+            django_ms = self.measure(
+                django.get_template(name),
+                context,
+                request,
+                options['repeat'],
+            )
+            jinja_ms = self.measure(
+                jinja.load(name),
+                context,
+                request,
+                options['repeat'],
+            )
+            self.stdout.write(
+                f'{name:<40}{django_ms:>12.3f}{jinja_ms:>12.3f}'
+                f'{django_ms / jinja_ms:>7.2f}',
+            )
+
+    def cases(self, request):
+        """Шаблоны и контексты, как их строят представления лент."""
+        page = Paginator(index_feed(), settings.COUNT_ENTRY).get_page(1)
+        posts = list(page)
+        if not posts:
+            raise CommandError('В базе нет постов.')
+        yield 'posts/includes/feed_card.html', {
+            'post': posts[0],
+            'user': request.user,
+            'hide_group': False,
+        }
+        common = {'latest_post_id': posts[0].pk, 'poll_interval': 30}
+        yield 'posts/index.html', {
+            **common,
+            'page_obj': page,
+            'cards': render_cards(request.user, page),
+            'index_version': 'bench',
+        }
+        group = Group.objects.filter(groups__isnull=False).first()
+        if group is not None:
+            page = Paginator(group_feed(group), settings.COUNT_ENTRY)
+            page = page.get_page(1)
+            yield 'posts/group_list.html', {
+                'page_obj': page,
+                'cards': render_cards(request.user, page, hide_group=True),
+                'group': group,
+            }
+        author = posts[0].author
+        page = Paginator(profile_feed(author), settings.COUNT_ENTRY)
+        page = page.get_page(1)
+        yield 'posts/profile.html', {
+            'page_obj': page,
+            'cards': render_cards(request.user, page),
+            'author': author,
+            'following': False,
+        }
+
+    def measure(self, template, context, request, repeat):
+        """Среднее время рендера в миллисекундах.
+
+        Кеш фрагмента ленты сбрасывается перед каждым рендером, иначе
+        index.html сравнивал бы чтения из кеша.
+        """
+        key = make_template_fragment_key('index_page', [1, 'bench'])
+        template.render(context, request)
+        total = 0
+        for _ in range(repeat):
+            cache.delete(key)
+            start = time.perf_counter()
+            template.render(context, request)
+            total += time.perf_counter() - start
+        return total / repeat * 1000
@@ -0,0 +1,221 @@
+import heapq
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+from core.storage import iter_files_sorted
+from posts.archive import archived_image_names
+from posts.models import Post, Upload
+
+# Не больше 999 параметров в одном запросе SQLite.
+KVSTORE_BATCH = 500
+
+
+def referenced_names(prefix, chunk_size):
+    """Имена картинок из Post.image по возрастанию, порциями по ключу.
+
+    Картинки удалённых постов тоже считаются занятыми: их удалит
+    purge_posts вместе с постом.
+    """
+    last = ''
+    while True:
+        chunk = list(
+            Post.all_objects.filter(image__startswith=prefix, image__gt=last)
+            .order_by('image')
+            .values_list('image', flat=True)
+            .distinct()[:chunk_size],
+        )
+        if not chunk:
+            return
+        yield from chunk
+        last = chunk[-1]
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def kvstore_values(keys):
+    """Значения хранилища ключей sorl одним запросом на порцию."""
+    values = {}
+    for chunk in chunked(keys, KVSTORE_BATCH):
+        values.update(
+            KVStore.objects.filter(key__in=chunk).values_list('key', 'value'),
+        )
+    return values
+
+
+def kvstore_chunks(identity, chunk_size):
+    """Записи хранилища ключей sorl порциями по возрастанию ключа."""
+    prefix = add_prefix('', identity)
+    last = prefix
+    while True:
+        chunk = list(
+            KVStore.objects.filter(key__startswith=prefix, key__gt=last)
+            .order_by('key')
+            .values_list('key', 'value')[:chunk_size],
+        )
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1][0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит и удаляет картинки постов и миниатюры, на которые '
+        'больше ничто не ссылается.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours',
+            type=float,
+            default=settings.MEDIA_GC_GRACE_HOURS,
+            help='Не трогать файлы моложе этого срока.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.MEDIA_GC_CHUNK_SIZE,
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        self.dry_run = options['dry_run']
+        self.deadline = time.time() - options['grace_hours'] * 3600
+        self.removed = self.young = self.freed = 0
+
+        self.collect_sources(options['chunk_size'])
+        self.collect_stale_thumbnails(options['chunk_size'])
+        self.collect_loose_thumbnails(options['chunk_size'])
+        self.collect_stale_uploads()
+
+        verb = 'Будет удалено' if self.dry_run else 'Удалено'
+        self.stdout.write(
+            f'{verb}: {self.removed} файлов, {self.freed} байт; '
+            f'отложено до конца срока: {self.young}',
+        )
+
+    def collect_sources(self, chunk_size):
+        """Слияние отсортированных списков файлов и ссылок из базы
+        и архива.
+        """
+        storage = Post._meta.get_field('image').storage
+        prefix = Post._meta.get_field('image').upload_to
+        references = heapq.merge(
+            referenced_names(prefix, chunk_size),
+            archived_image_names(prefix, chunk_size),
+        )
+        reference = next(references, None)
+        for name, mtime in iter_files_sorted(storage, prefix):
+            while reference is not None and reference < name:
+                reference = next(references, None)
+            if reference == name:
+                continue
+            if self.expired(name, mtime):
+                self.remove(storage, name)
+                if not self.dry_run:
+                    default.kvstore.delete(ImageFile(name, storage))
+
+    def collect_stale_thumbnails(self, chunk_size):
+        """Миниатюры, чей исходник уже удалён с диска.
+
+        Списки миниатюр читаются из хранилища ключей sorl порциями,
+        записи исходников для порции — одним запросом.
+        """
+        for chunk in kvstore_chunks('thumbnails', chunk_size):
+            sources = kvstore_values(
+                [add_prefix(del_prefix(key)) for key, _ in chunk],
+            )
+            for key, value in chunk:
+                raw_source = sources.get(add_prefix(del_prefix(key)))
+                source = raw_source and deserialize_image_file(raw_source)
+                if source and source.exists():
+                    continue
+                thumbnail_keys = deserialize(value) or []
+                self.stdout.write(
+                    f'миниатюры без исходника: {len(thumbnail_keys)}',
+                )
+                self.removed += len(thumbnail_keys)
+                if self.dry_run:
+                    continue
+                if source:
+                    default.kvstore.delete(source)
+                    continue
+                thumbnails = kvstore_values(
+                    [add_prefix(thumbnail) for thumbnail in thumbnail_keys],
+                )
+                for raw_thumbnail in thumbnails.values():
+                    thumbnail = deserialize_image_file(raw_thumbnail)
+                    default.kvstore.delete(thumbnail, delete_thumbnails=False)
+                    thumbnail.delete()
+                KVStore.objects.filter(key=key).delete()
+
+    def collect_loose_thumbnails(self, chunk_size):
+        """Файлы миниатюр, о которых не знает хранилище ключей sorl.
+
+        Ключи для порции файлов проверяются одним запросом.
+        """
+        storage = default.storage
+        files = iter_files_sorted(storage, thumbnail_settings.THUMBNAIL_PREFIX)
+        for chunk in chunked(files, min(chunk_size, KVSTORE_BATCH)):
+            keys = {
+                add_prefix(ImageFile(name, storage).key): (name, mtime)
+                for name, mtime in chunk
+            }
+            known = set(
+                KVStore.objects.filter(key__in=list(keys)).values_list(
+                    'key',
+                    flat=True,
+                ),
+            )
+            for key, (name, mtime) in keys.items():
+                if key not in known and self.expired(name, mtime):
+                    self.remove(storage, name)
+
+    def collect_stale_uploads(self):
+        """Брошенные докачиваемые загрузки, так и не ставшие постом."""
+        expired = Upload.objects.filter(
+            created__lt=timezone.now()
+            - timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRE_HOURS),
+        )
+        for upload in expired.iterator():
+            self.stdout.write(upload.path)
+            self.removed += 1
+            if os.path.isfile(upload.path):
+                self.freed += os.path.getsize(upload.path)
+                if not self.dry_run:
+                    os.remove(upload.path)
+            if not self.dry_run:
+                upload.delete()
+
+    def expired(self, name, mtime):
+        if mtime > self.deadline:
+            self.young += 1
+            return False
+        self.stdout.write(name)
+        return True
+
+    def remove(self, storage, name):
+        self.removed += 1
+        self.freed += storage.size(name)
+        if not self.dry_run:
+            storage.delete(name)
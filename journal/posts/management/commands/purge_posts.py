@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.deletion import purge_deleted_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Окончательно удаляет посты, помеченные удалёнными, вместе с '
+        'комментариями и картинками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=float,
+            default=settings.POST_PURGE_AFTER_HOURS,
+            help='Вычищать посты, удалённые больше N часов назад.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.DELETION_CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.DELETION_SLEEP,
+            help='Пауза между порциями в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            raise CommandError('Нельзя вычищать посты внутри транзакции.')
+        purged = purge_deleted_posts(
+            options['hours'],
+            options['chunk_size'],
+            options['sleep'],
+        )
+        self.stdout.write(f'Вычищено постов: {purged}')
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет готовый HTML и отрывки постов, сохранённых до их '
+        'появления; с --all пересчитывает все посты.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать и уже заполненные, например после смены '
+            'POST_EXCERPT_LENGTH.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Пауза между пачками в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.all_objects.only('pk', 'text').order_by('pk')
+        if not options['all']:
+            posts = posts.filter(text_html='')
+        last = 0
+        rendered = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last)[: options['batch_size']])
+            if not batch:
+                break
+            for post in batch:
+                post.render_text()
+            Post.all_objects.bulk_update(batch, ('text_html', 'excerpt'))
+            rendered += len(batch)
+            last = batch[-1].pk
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(f'Обработано постов: {rendered}')
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from posts.deletion import run_job
+from posts.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет задачи фонового удаления пользователей и групп, '
+        'поставленные из админки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.DELETION_CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=settings.DELETION_SLEEP,
+            help='Пауза между порциями в секундах.',
+        )
+        parser.add_argument(
+            '--every',
+            type=float,
+            default=0,
+            help='Проверять очередь каждые N секунд; 0 — один проход.',
+        )
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            raise CommandError('Нельзя удалять порциями внутри транзакции.')
+        while True:
+            jobs = DeletionJob.objects.filter(
+                status=DeletionJob.PENDING,
+            ).order_by('created')
+            for job in jobs:
+                try:
+                    done = run_job(
+                        job,
+                        options['chunk_size'],
+                        options['sleep'],
+                    )
+                except Exception as error:
+                    # Ошибка сохранена в задаче; остальные задачи идут дальше.
+                    self.stderr.write(f'{job}: {error}')
+                    continue
+                if done:
+                    self.stdout.write(f'Удалено: {job}')
+            if not options['every']:
+                return
+            time.sleep(options['every'])
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = 'Рассылает подписчикам дайджест новых постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.DIGEST_BATCH_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        sent = send_digests(options['batch_size'])
+        self.stdout.write(f'Поставлено в очередь писем: {sent}')
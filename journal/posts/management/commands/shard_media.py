@@ -0,0 +1,97 @@
+import os
+import shutil
+import time
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import is_sharded, shard_name
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога в шардированные '
+        'подкаталоги пачками, без остановки сайта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Пауза между пачками в секундах.',
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        moved = skipped = missing = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Post.all_objects.filter(pk__gt=last_pk)
+                .exclude(image='')
+                .exclude(image__isnull=True)
+                .order_by('pk')
+                .values_list('pk', 'image')[: options['batch_size']],
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            for pk, name in batch:
+                if is_sharded(name):
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(f'{name} -> {shard_name(name)}')
+                    moved += 1
+                    continue
+                if self.move(storage, pk, name):
+                    moved += 1
+                else:
+                    skipped += 1
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(
+            f'Перенесено: {moved}, пропущено: {skipped}, '
+            f'нет на диске: {missing}',
+        )
+
+    def move(self, storage, pk, name):
+        """Переносит один файл: ссылка, обновление строки, удаление старого.
+
+        Пока строка не обновлена, файл доступен по обоим путям, поэтому
+        открытые страницы со старыми адресами продолжают работать.
+        """
+        src = storage.path(name)
+        new_name = shard_name(name)
+        dst = storage.path(new_name)
+        if os.path.exists(dst) and not os.path.samefile(src, dst):
+            new_name = storage.get_available_name(new_name)
+            dst = storage.path(new_name)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        if not os.path.exists(dst):
+            try:
+                os.link(src, dst)
+            except OSError:
+                shutil.copy2(src, dst)
+        # Ссылка наследует старый mtime: без этого gc_media, запущенный
+        # до обновления строки, принял бы новый путь за давнюю сироту.
+        os.utime(dst)
+
+        updated = Post.all_objects.filter(pk=pk, image=name).update(
+            image=new_name,
+        )
+        if not updated:
+            # Пост успели отредактировать или удалить — копия не нужна.
+            os.remove(dst)
+            return False
+        default.kvstore.delete(ImageFile(name, storage))
+        os.remove(src)
+        return True
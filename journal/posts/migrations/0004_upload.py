@@ -0,0 +1,79 @@
+# Generated by Django 2.2.16 on 2026-10-19 13:15
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0003_auto_20230302_1659'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'created',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'token',
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, unique=True
+                    ),
+                ),
+                (
+                    'filename',
+                    models.CharField(max_length=255, verbose_name='имя файла'),
+                ),
+                ('size', models.PositiveIntegerField(verbose_name='размер')),
+                (
+                    'sha256',
+                    models.CharField(
+                        max_length=64, verbose_name='контрольная сумма'
+                    ),
+                ),
+                (
+                    'received',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='получено байт'
+                    ),
+                ),
+                (
+                    'completed',
+                    models.BooleanField(
+                        default=False, verbose_name='загрузка завершена'
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='uploads',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='пользователь',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Загрузка',
+                'verbose_name_plural': 'Загрузки',
+            },
+        ),
+    ]
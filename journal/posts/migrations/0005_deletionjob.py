@@ -0,0 +1,100 @@
+# Generated by Django 2.2.16 on 2026-10-19 13:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('posts', '0004_upload'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJob',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'created',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='Дата создания'
+                    ),
+                ),
+                (
+                    'kind',
+                    models.CharField(
+                        choices=[
+                            ('user', 'пользователь'),
+                            ('group', 'группа'),
+                        ],
+                        max_length=16,
+                        verbose_name='что удаляется',
+                    ),
+                ),
+                (
+                    'object_id',
+                    models.BigIntegerField(verbose_name='id объекта'),
+                ),
+                (
+                    'object_repr',
+                    models.CharField(max_length=200, verbose_name='объект'),
+                ),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('pending', 'в очереди'),
+                            ('running', 'выполняется'),
+                            ('done', 'завершено'),
+                            ('failed', 'ошибка'),
+                        ],
+                        default='pending',
+                        max_length=16,
+                        verbose_name='состояние',
+                    ),
+                ),
+                (
+                    'step',
+                    models.CharField(
+                        blank=True, max_length=32, verbose_name='этап'
+                    ),
+                ),
+                (
+                    'processed',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='обработано строк'
+                    ),
+                ),
+                ('error', models.TextField(blank=True, verbose_name='ошибка')),
+                (
+                    'finished',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='завершено'
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Фоновое удаление',
+                'verbose_name_plural': 'Фоновые удаления',
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(
+                blank=True,
+                db_index=True,
+                null=True,
+                upload_to='posts/',
+                verbose_name='Картинка',
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 13:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('posts', '0005_deletionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='deleted_at',
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name='дата удаления'
+            ),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_deleted',
+            field=models.BooleanField(
+                db_index=True, default=False, verbose_name='удалён'
+            ),
+        ),
+    ]
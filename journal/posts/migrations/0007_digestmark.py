@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_post_is_deleted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestMark',
+            fields=[
+                (
+                    'id',
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'last_post_id',
+                    models.BigIntegerField(
+                        default=0, verbose_name='последний пост'
+                    ),
+                ),
+                (
+                    'sent',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='отправлен'
+                    ),
+                ),
+                (
+                    'user',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='digest_mark',
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name='пользователь',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Отметка дайджеста',
+                'verbose_name_plural': 'Отметки дайджестов',
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-19 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('posts', '0007_digestmark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(
+                blank=True, editable=False, verbose_name='отрывок'
+            ),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(
+                blank=True, editable=False, verbose_name='HTML текста'
+            ),
+        ),
+    ]
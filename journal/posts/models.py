@@ -1,12 +1,34 @@
+import os
+import uuid
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+from core.models import CreatedModel
+from core.querycache import CachedManager, CachedQuerySet
 
 User = get_user_model()
 
 
+class PostManager(models.Manager.from_queryset(CachedQuerySet)):
+    """Менеджер по умолчанию: посты без удалённых.
+
+    Удалённые, но ещё не вычищенные посты доступны через Post.all_objects.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class Post(models.Model):
     text = models.TextField('Текст поста', help_text='Введите текст поста')
+    # Готовый HTML текста и короткий отрывок для лент пишутся при
+    # сохранении (render_text), а не при каждом показе.
+    text_html = models.TextField('HTML текста', blank=True, editable=False)
+    excerpt = models.TextField('отрывок', blank=True, editable=False)
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     author = models.ForeignKey(
         User,
@@ -29,8 +51,20 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
         null=True,
+        db_index=True,
     )
 
+    # Удалённый автором пост скрыт сразу, а строку, комментарии и
+    # картинку позже удаляет purge_posts.
+    is_deleted = models.BooleanField('удалён', default=False, db_index=True)
+    deleted_at = models.DateTimeField('дата удаления', blank=True, null=True)
+
+    # Посты, прочитанные из архива (posts.archive), только для чтения.
+    archived = False
+
+    objects = PostManager()
+    all_objects = CachedQuerySet.as_manager()
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
@@ -39,12 +73,30 @@ class Post(models.Model):
     def __str__(self) -> str:
         return self.text[: settings.TEXT_BLOCK]
 
+    def save(self, *args, update_fields=None, **kwargs):
+        if update_fields is None or 'text' in update_fields:
+            self.render_text()
+            if update_fields is not None:
+                update_fields = {*update_fields, 'text_html', 'excerpt'}
+        super().save(*args, update_fields=update_fields, **kwargs)
+
+    def render_text(self):
+        """Заполняет text_html и excerpt по тексту поста.
+
+        Отрывок — обычный текст, обрезанный по символам, а не по HTML,
+        так что разметку он не рвёт.
+        """
+        self.text_html = linebreaksbr(self.text)
+        self.excerpt = Truncator(self.text).chars(settings.POST_EXCERPT_LENGTH)
+
 
 class Group(models.Model):
     title = models.CharField('название', max_length=200)
     description = models.TextField('описание')
     slug = models.SlugField('slug', max_length=50, unique=True)
 
+    objects = CachedManager()
+
     def __str__(self) -> str:
         return self.title[: settings.TEXT_BLOCK_TITLE]
 
@@ -86,5 +138,96 @@ class Follow(models.Model):
         related_name='following',
     )
 
+    objects = CachedQuerySet.as_manager()
+
     def __str__(self) -> str:
         return self.author[: settings.TEXT_BLOCK_TITLE]
+
+
+class Upload(CreatedModel):
+    """Картинка, загружаемая по частям до создания поста."""
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='uploads',
+        verbose_name='пользователь',
+    )
+    filename = models.CharField('имя файла', max_length=255)
+    size = models.PositiveIntegerField('размер')
+    sha256 = models.CharField('контрольная сумма', max_length=64)
+    received = models.PositiveIntegerField('получено байт', default=0)
+    completed = models.BooleanField('загрузка завершена', default=False)
+
+    class Meta:
+        verbose_name = 'Загрузка'
+        verbose_name_plural = 'Загрузки'
+
+    def __str__(self) -> str:
+        return self.filename[: settings.TEXT_BLOCK_TITLE]
+
+    @property
+    def path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{self.token}.part')
+
+
+class DeletionJob(CreatedModel):
+    """Удаление пользователя или группы, выполняемое в фоне порциями."""
+
+    USER = 'user'
+    GROUP = 'group'
+    KINDS = ((USER, 'пользователь'), (GROUP, 'группа'))
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'в очереди'),
+        (RUNNING, 'выполняется'),
+        (DONE, 'завершено'),
+        (FAILED, 'ошибка'),
+    )
+
+    kind = models.CharField('что удаляется', max_length=16, choices=KINDS)
+    object_id = models.BigIntegerField('id объекта')
+    object_repr = models.CharField('объект', max_length=200)
+    status = models.CharField(
+        'состояние',
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    step = models.CharField('этап', max_length=32, blank=True)
+    processed = models.PositiveIntegerField('обработано строк', default=0)
+    error = models.TextField('ошибка', blank=True)
+    finished = models.DateTimeField('завершено', blank=True, null=True)
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Фоновое удаление'
+        verbose_name_plural = 'Фоновые удаления'
+
+    def __str__(self) -> str:
+        return f'{self.get_kind_display()} {self.object_repr}'
+
+
+class DigestMark(models.Model):
+    """Докуда пользователь получил посты в дайджесте подписок."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='digest_mark',
+        verbose_name='пользователь',
+    )
+    last_post_id = models.BigIntegerField('последний пост', default=0)
+    sent = models.DateTimeField('отправлен', blank=True, null=True)
+
+    class Meta:
+        verbose_name = 'Отметка дайджеста'
+        verbose_name_plural = 'Отметки дайджестов'
+
+    def __str__(self) -> str:
+        return f'{self.user} #{self.last_post_id}'
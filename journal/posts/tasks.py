@@ -0,0 +1,42 @@
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+
+from jobs.queue import PRIORITY_LOW, task
+from posts.deletion import purge_deleted_posts, run_job
+from posts.digests import send_digests as send_all_digests
+from posts.models import DeletionJob, Post
+
+# Миниатюры, которые показывают ленты и страница поста.
+FEED_THUMBNAILS = (('960x339', {'crop': 'center', 'upscale': True}),)
+
+
+@task(priority=PRIORITY_LOW)
+def warm_thumbnails(post_id):
+    """Готовит миниатюры нового поста, чтобы их не делала первая лента."""
+    post = Post.all_objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    for geometry, options in FEED_THUMBNAILS:
+        get_thumbnail(post.image, geometry, **options)
+
+
+@task(max_attempts=1)
+def run_deletion(job_id):
+    """Выполняет фоновое удаление; повтор — через админку задач удаления."""
+    job = DeletionJob.objects.filter(pk=job_id).first()
+    if job is not None:
+        run_job(job, settings.DELETION_CHUNK_SIZE, settings.DELETION_SLEEP)
+
+
+@task(max_attempts=1)
+def purge_posts():
+    purge_deleted_posts(
+        settings.POST_PURGE_AFTER_HOURS,
+        settings.DELETION_CHUNK_SIZE,
+        settings.DELETION_SLEEP,
+    )
+
+
+@task(priority=PRIORITY_LOW, max_attempts=1)
+def send_digests():
+    send_all_digests()
@@ -0,0 +1,182 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.archive import archive_path
+from posts.deletion import schedule_deletion
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COUNT_ENTRY=3)
+class ArchivePostsTest(TransactionTestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        archive_settings = override_settings(ARCHIVE_DIR=self.archive_dir)
+        archive_settings.enable()
+        self.addCleanup(archive_settings.disable)
+
+        self.user = User.objects.create_user(username='Batman')
+        self.client = Client()
+        now = timezone.now()
+        for days in (1, 2, 400, 401, 800):
+            post = Post.objects.create(author=self.user, text=f'{days} дней')
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(days=days),
+            )
+            Comment.objects.create(
+                author=self.user,
+                post=post,
+                text=f'Комментарий к {days}',
+            )
+
+    def archive(self):
+        call_command('archive_posts', days=365, stdout=StringIO())
+
+    def page(self, number):
+        response = self.client.get(
+            reverse('posts:profile', args=(self.user.username,)),
+            {'page': number},
+        )
+        return response.context['page_obj']
+
+    def test_old_posts_moved_by_year(self):
+        """Старые посты с комментариями переезжают в файлы по годам."""
+        self.archive()
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 2)
+        years = {
+            (timezone.now() - timedelta(days=days)).year
+            for days in (400, 401, 800)
+        }
+        archived = 0
+        for year in years:
+            archive = sqlite3.connect(archive_path(year))
+            archived += archive.execute(
+                'SELECT COUNT(*) FROM posts_post',
+            ).fetchone()[0]
+            archive.close()
+        self.assertEqual(archived, 3)
+
+    def test_feed_continues_into_archive(self):
+        """Лента профиля продолжается архивом после горячих постов."""
+        self.archive()
+        first = self.page(1)
+        self.assertEqual(first.paginator.count, 5)
+        self.assertEqual(
+            [post.text for post in first],
+            ['1 дней', '2 дней', '400 дней'],
+        )
+        second = self.page(2)
+        self.assertEqual(
+            [post.text for post in second],
+            ['401 дней', '800 дней'],
+        )
+        self.assertTrue(all(post.archived for post in second))
+        self.assertEqual(
+            [comment.text for comment in second[0].comments.all()],
+            ['Комментарий к 401'],
+        )
+
+    def test_feed_over_more_years_than_attach_limit(self):
+        """Архив больше чем за 10 лет читается окнами по годам."""
+        now = timezone.now()
+        ages = [1, 2, 400, 401, 800]
+        for number in range(12):
+            days = 1100 + 366 * number
+            post = Post.objects.create(author=self.user, text=f'{days} дней')
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=now - timedelta(days=days),
+            )
+            ages.append(days)
+        self.archive()
+        self.assertGreater(len(os.listdir(self.archive_dir)), 10)
+
+        first = self.page(1)
+        texts = [post.text for post in first]
+        for number in first.paginator.page_range[1:]:
+            texts += [post.text for post in self.page(number)]
+        self.assertEqual(first.paginator.count, len(ages))
+        self.assertEqual(texts, [f'{days} дней' for days in ages])
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA database_list')
+            attached = [
+                row for row in cursor.fetchall()
+                if row[1].startswith('archive_')
+            ]
+        self.assertLessEqual(len(attached), settings.ARCHIVE_MAX_ATTACHED)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        self.assertEqual(response.context['post'].text, texts[-1])
+
+    def test_archived_post_detail(self):
+        """Страница архивного поста открывается без формы комментария."""
+        post = Post.objects.get(text='800 дней')
+        self.archive()
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(post.pk,)),
+        )
+        self.assertEqual(response.context['post'].text, '800 дней')
+        self.assertNotContains(response, 'Добавить комментарий')
+
+    def test_archive_with_older_schema(self):
+        """Архив без нового столбца читается, а при дозаписи дополняется."""
+        year = (timezone.now() - timedelta(days=800)).year
+        archive = sqlite3.connect(archive_path(year))
+        archive.execute(
+            'CREATE TABLE posts_post (id integer PRIMARY KEY, text text, '
+            'pub_date datetime, author_id integer, group_id integer)',
+        )
+        archive.close()
+
+        self.archive()
+        second = self.page(2)
+        self.assertEqual(second[1].text, '800 дней')
+        self.assertFalse(second[1].image)
+
+    def test_deleted_user_removed_from_archive(self):
+        """Фоновое удаление пользователя чистит и архивы."""
+        self.archive()
+        other = User.objects.create_user(username='Robin')
+        Post.objects.create(author=other, text='Пост Робина')
+        schedule_deletion(self.user)
+        call_command('run_deletions', chunk_size=2, stdout=StringIO())
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.context['page_obj'].paginator.count, 1)
+
+    def test_deleted_user_images_removed_from_every_year(self):
+        """Картинки архивных постов удаляются во всех годах сразу."""
+        media_settings = override_settings(MEDIA_ROOT=self.archive_dir)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        images = []
+        for days in (400, 800):
+            image = default_storage.save(
+                f'posts/{days}.png',
+                ContentFile(b'x'),
+            )
+            Post.objects.filter(text=f'{days} дней').update(image=image)
+            images.append(image)
+        self.archive()
+        schedule_deletion(self.user)
+        call_command('run_deletions', chunk_size=100, stdout=StringIO())
+        for image in images:
+            with self.subTest(image=image):
+                self.assertFalse(default_storage.exists(image))
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+
+from posts.cards import render_cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.batman = User.objects.create_user(username='Batman')
+        cls.robin = User.objects.create_user(username='Robin')
+        cls.group = Group.objects.create(title='Готэм', slug='gotham')
+        Post.objects.create(author=cls.batman, text='Первый', group=cls.group)
+        Post.objects.create(author=cls.robin, text='Второй')
+
+    def setUp(self):
+        cache.clear()
+
+    def feed(self):
+        return list(
+            Post.objects.select_related('author', 'group')
+            .prefetch_related('comments')
+            .order_by('pk'),
+        )
+
+    def render(self, user=None):
+        """Карточки ленты и число отрендеренных заново."""
+        with mock.patch(
+            'posts.cards.render_to_string',
+            wraps=render_to_string,
+        ) as rendered:
+            cards = render_cards(user or AnonymousUser(), self.feed())
+        return cards, rendered.call_count
+
+    def test_cards_cached(self):
+        """Повторная лента собирается из кеша без рендера."""
+        cards, rendered = self.render()
+        self.assertEqual(rendered, 2)
+        self.assertIn('Первый', cards[0])
+        self.assertEqual(self.render(), (cards, 0))
+
+    def test_version_changes(self):
+        """Правка, смена группы, переименование и комментарий
+        дают новую карточку только затронутому посту.
+        """
+        first = Post.objects.get(text='Первый')
+        first.text = 'Правка'
+        for change in (
+            first.save,
+            lambda: Post.objects.filter(pk=first.pk).update(group=None),
+            lambda: User.objects.filter(pk=self.batman.pk).update(
+                first_name='Брюс',
+            ),
+            lambda: first.comments.create(author=self.robin, text='!'),
+        ):
+            self.render()
+            change()
+            cards, rendered = self.render()
+            self.assertEqual(rendered, 1)
+        self.assertIn('Правка', cards[0])
+        self.assertIn('Брюс', cards[0])
+        self.assertNotIn('gotham', cards[0])
+
+    def test_owner_variant(self):
+        """Кнопки правки видит только автор, чужим они не достаются."""
+        edit = 'Изменить'
+        owner_cards, _ = self.render(self.batman)
+        self.assertIn(edit, owner_cards[0])
+        self.assertNotIn(edit, owner_cards[1])
+        cards, rendered = self.render(self.robin)
+        self.assertEqual(rendered, 2)
+        self.assertNotIn(edit, cards[0])
+        self.assertIn(edit, cards[1])
@@ -0,0 +1,185 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, DeletionJob, Follow, Group, Post
+
+User = get_user_model()
+
+
+class BackgroundDeletionTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(
+            MEDIA_ROOT=media_root,
+            ARCHIVE_DIR=media_root,
+        )
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.admin = User.objects.create_superuser(
+            username='Alfred',
+            email='alfred@example.com',
+            password='secret',
+        )
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.user = User.objects.create_user(username='Joker')
+        self.other = User.objects.create_user(username='Batman')
+        self.group = Group.objects.create(
+            title='Готэм',
+            slug='gotham',
+            description='Город',
+        )
+        self.image = default_storage.save('posts/joker.png', ContentFile(b'x'))
+        for number in range(5):
+            post = Post.objects.create(
+                author=self.user,
+                group=self.group,
+                text=f'Пост {number}',
+                image=self.image if number == 0 else None,
+            )
+            Comment.objects.create(author=self.other, post=post, text='Нет')
+        self.kept = Post.objects.create(
+            author=self.other,
+            group=self.group,
+            text='Пост Бэтмена',
+        )
+        Comment.objects.create(author=self.user, post=self.kept, text='Ха')
+        Follow.objects.create(user=self.other, author=self.user)
+
+    def run_deletions(self):
+        call_command('run_deletions', chunk_size=2, sleep=0, stdout=StringIO())
+
+    def test_admin_delete_only_schedules(self):
+        """Удаление из админки ставит задачу, а не удаляет строки."""
+        response = self.client.post(
+            reverse('admin:auth_user_delete', args=(self.user.pk,)),
+            {'post': 'yes'},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(Post.objects.filter(author=self.user).count(), 5)
+        job = DeletionJob.objects.get()
+        self.assertEqual(job.status, DeletionJob.PENDING)
+        self.assertEqual(job.object_id, self.user.pk)
+
+    def test_user_deleted_in_chunks(self):
+        """Задача удаляет пользователя со всем, что на него ссылается."""
+        self.client.post(
+            reverse('admin:auth_user_delete', args=(self.user.pk,)),
+            {'post': 'yes'},
+        )
+        self.run_deletions()
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(list(Post.objects.all()), [self.kept])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(default_storage.exists(self.image))
+        job = DeletionJob.objects.get()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        # Комментарии к постам, свой комментарий, подписка, посты, сам он.
+        self.assertEqual(job.processed, 5 + 1 + 1 + 5 + 1)
+        self.assertIsNotNone(job.finished)
+
+    def test_group_deleted_keeps_posts(self):
+        """Удаление группы отвязывает от неё посты порциями."""
+        self.client.post(
+            reverse('admin:posts_group_delete', args=(self.group.pk,)),
+            {'post': 'yes'},
+        )
+        self.assertTrue(Group.objects.filter(pk=self.group.pk).exists())
+        self.run_deletions()
+        self.assertFalse(Group.objects.exists())
+        self.assertEqual(Post.objects.filter(group__isnull=True).count(), 6)
+        self.assertEqual(
+            self.client.get(reverse('posts:group_list', args=('gotham',)))
+            .status_code,
+            404,
+        )
+
+    def test_failed_job_can_be_retried(self):
+        """Упавшая задача сохраняет ошибку и возвращается в очередь."""
+        job = DeletionJob.objects.create(
+            kind='unknown',
+            object_id=self.user.pk,
+            object_repr='Joker',
+        )
+        stderr = StringIO()
+        call_command('run_deletions', stdout=StringIO(), stderr=stderr)
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.FAILED)
+        self.assertIn('KeyError', job.error)
+        self.assertIn('Joker', stderr.getvalue())
+
+        self.client.post(
+            reverse('admin:posts_deletionjob_changelist'),
+            {'action': 'retry', '_selected_action': [job.pk]},
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.PENDING)
+
+
+class SoftDeleteTest(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.user = User.objects.create_user(username='Joker')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.image = default_storage.save('posts/joker.png', ContentFile(b'x'))
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Пост',
+            image=self.image,
+        )
+        Comment.objects.create(author=self.user, post=self.post, text='Ха')
+        self.client.post(reverse('posts:post_delete', args=(self.post.pk,)))
+
+    def test_deleted_post_hidden(self):
+        """Удалённый пост пропадает из лент, но строка и картинка живы."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        self.assertEqual(response.status_code, 404)
+        post = Post.all_objects.get(pk=self.post.pk)
+        self.assertTrue(post.is_deleted)
+        self.assertIsNotNone(post.deleted_at)
+        self.assertTrue(default_storage.exists(self.image))
+
+    def test_deleted_post_leaves_cached_index(self):
+        """Удалённый пост сразу пропадает и из закешированной главной."""
+        post = Post.objects.create(author=self.user, text='Исчезающий пост')
+        self.assertContains(self.client.get(reverse('posts:index')), post)
+        response = self.client.post(
+            reverse('posts:post_delete', args=(post.pk,)),
+            follow=True,
+            HTTP_REFERER=reverse('posts:index'),
+        )
+        self.assertNotContains(response, post)
+
+    def test_purge_after_grace_period(self):
+        """purge_posts вычищает только посты, удалённые достаточно давно."""
+        call_command('purge_posts', stdout=StringIO())
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+
+        call_command('purge_posts', hours=0, stdout=StringIO())
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(default_storage.exists(self.image))
@@ -0,0 +1,95 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import DigestMark, Follow, Post
+
+User = get_user_model()
+
+
+class DigestTest(TestCase):
+    def setUp(self):
+        self.batman = User.objects.create_user(username='Batman')
+        self.robin = User.objects.create_user(username='Robin')
+        self.alfred = User.objects.create_user(
+            username='Alfred',
+            email='alfred@example.com',
+        )
+        self.gordon = User.objects.create_user(
+            username='Gordon',
+            email='gordon@example.com',
+        )
+        self.joker = User.objects.create_user(username='Joker')
+        for reader, author in (
+            (self.alfred, self.batman),
+            (self.alfred, self.robin),
+            (self.gordon, self.batman),
+            (self.joker, self.robin),
+        ):
+            Follow.objects.create(user=reader, author=author)
+        old = Post.objects.create(author=self.batman, text='Старый пост')
+        Post.objects.filter(pk=old.pk).update(
+            pub_date=timezone.now() - timedelta(days=30),
+        )
+        Post.objects.create(author=self.batman, text='Бэтмен 1')
+        Post.objects.create(author=self.batman, text='Бэтмен 2')
+        Post.objects.create(author=self.robin, text='Робин 1')
+
+    def send(self):
+        call_command('send_digests', batch_size=2, stdout=StringIO())
+        try:
+            return {email.to[0]: email.body for email in mail.outbox}
+        finally:
+            mail.outbox.clear()
+
+    def test_digest_per_follower(self):
+        """Каждый подписчик получает одно письмо с постами своих авторов."""
+        emails = self.send()
+        self.assertEqual(
+            set(emails),
+            {'alfred@example.com', 'gordon@example.com'},
+        )
+        alfred = emails['alfred@example.com']
+        for text in ('Бэтмен 1', 'Бэтмен 2', 'Робин 1'):
+            self.assertIn(text, alfred)
+        self.assertNotIn('Старый пост', alfred)
+        self.assertNotIn('Робин', emails['gordon@example.com'])
+        # Без адреса письма нет, но отметка сдвигается.
+        self.assertEqual(
+            DigestMark.objects.get(user=self.joker).last_post_id,
+            Post.objects.get(text='Робин 1').pk,
+        )
+
+    def test_high_water_mark(self):
+        """Повторная рассылка присылает только новые посты."""
+        self.send()
+        self.assertEqual(self.send(), {})
+        Post.objects.create(author=self.batman, text='Бэтмен 3')
+        emails = self.send()
+        self.assertEqual(
+            set(emails),
+            {'alfred@example.com', 'gordon@example.com'},
+        )
+        self.assertIn('Бэтмен 3', emails['gordon@example.com'])
+        self.assertNotIn('Бэтмен 1', emails['gordon@example.com'])
+
+    def test_fragments_rendered_once(self):
+        """Фрагмент поста рендерится один раз на всех получателей."""
+        with mock.patch(
+            'posts.digests.render_to_string',
+            wraps=render_to_string,
+        ) as render:
+            self.send()
+        fragments = [
+            call
+            for call in render.call_args_list
+            if call[0][0] == 'posts/email/digest_post.txt'
+        ]
+        self.assertEqual(len(fragments), 3)
@@ -8,6 +8,7 @@ from django.core.cache import cache
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.storage import is_sharded
 from posts.models import Follow, Group, Post
 from posts.tests.common import image
 
@@ -140,12 +141,12 @@ class PostCreateTest(TestCase):
         post = Post.objects.filter(
             author=self.user,
             text='Тест поста с картинкой',
-            image='posts/test.png',
+            image__endswith='/test.png',
         )
 
         self.assertEqual(post[0].text, create_post['text'])
         self.assertEqual(post[0].author, create_post['author'])
-        self.assertEqual(post[0].image, 'posts/test.png')
+        self.assertTrue(is_sharded(post[0].image.name))
 
 
 class FollowCreateTest(TestCase):
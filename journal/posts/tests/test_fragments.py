@@ -0,0 +1,88 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(COUNT_ENTRY=2)
+class FeedFragmentTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.batman = User.objects.create_user(username='Batman')
+        cls.robin = User.objects.create_user(username='Robin')
+        cls.group = Group.objects.create(title='Готэм', slug='gotham')
+        Follow.objects.create(user=cls.batman, author=cls.robin)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.robin,
+                text=f'Пост {number}',
+                group=cls.group,
+            )
+            for number in range(3)
+        ]
+        Post.objects.create(author=cls.batman, text='Свой пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.batman)
+
+    def post_ids(self, response):
+        return [post.pk for post in response.context['posts']]
+
+    def test_fragment_pages(self):
+        """Фрагмент отдаёт только карточки и номер следующей страницы."""
+        url = reverse('posts:group_fragment', args=(self.group.slug,))
+        response = self.client.get(url, {'page': 1})
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['X-Next-Page'], '2')
+        self.assertNotContains(response, '<html')
+        self.assertNotContains(response, 'pagination')
+        self.assertContains(response, 'data-post-id', count=2)
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual(self.post_ids(response), [self.posts[0].pk])
+        self.assertFalse(response.has_header('X-Next-Page'))
+
+    def test_fragment_per_feed(self):
+        """Каждый фрагмент берёт посты из своей ленты."""
+        robin = {post.pk for post in self.posts}
+        for url, expected in (
+            (reverse('posts:index_fragment'), 4),
+            (reverse('posts:follow_fragment'), 3),
+            (reverse('posts:profile_fragment', args=('Batman',)), 1),
+        ):
+            with self.subTest(url=url):
+                ids = []
+                page = '1'
+                while page:
+                    response = self.client.get(url, {'page': page})
+                    ids += self.post_ids(response)
+                    page = response.get('X-Next-Page')
+                self.assertEqual(len(ids), expected)
+                self.assertEqual(len(set(ids)), expected)
+                if 'follow' in url:
+                    self.assertEqual(set(ids), robin)
+
+    def test_bad_page(self):
+        for page in ('abc', '0'):
+            with self.subTest(page=page):
+                response = self.client.get(
+                    reverse('posts:index_fragment'),
+                    {'page': page},
+                )
+                self.assertEqual(
+                    response.status_code,
+                    HTTPStatus.BAD_REQUEST,
+                )
+
+    def test_page_has_next_cursor(self):
+        """Полная страница передаёт скрипту номер следующей страницы."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'data-next-page="2"')
+        self.assertContains(response, reverse('posts:index_fragment'))
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.test import TestCase
+
+from posts.identity import group_by_slug, user_by_username
+from posts.models import Group
+
+User = get_user_model()
+
+
+class IdentityCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_and_miss_cached(self):
+        """Найденный и ненайденный объект второй раз берутся из кеша."""
+        user = User.objects.create_user(username='Batman')
+        for username in ('Batman', 'Joker'):
+            user_by_username.get(username)
+        with self.assertNumQueries(0):
+            self.assertEqual(user_by_username.get('Batman'), user)
+            self.assertIsNone(user_by_username.get('Joker'))
+
+    def test_create_clears_miss(self):
+        """Созданная группа находится сразу, несмотря на кеш промаха."""
+        self.assertIsNone(group_by_slug.get('gotham'))
+        group = Group.objects.create(title='Готэм', slug='gotham')
+        self.assertEqual(group_by_slug.get('gotham'), group)
+
+    def test_rename_and_delete(self):
+        """Переименование и удаление сбрасывают старые записи."""
+        user = User.objects.create_user(username='Batman')
+        user_by_username.get('Batman')
+        user.username = 'Bruce'
+        user.save()
+        self.assertIsNone(user_by_username.get('Batman'))
+        self.assertEqual(user_by_username.get('Bruce'), user)
+        user.delete()
+        with self.assertRaises(Http404):
+            user_by_username.get_or_404('Bruce')
@@ -0,0 +1,97 @@
+import re
+import unittest
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import engines
+from django.template.loader import get_template
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.management.commands.bench_templates import Command
+from posts.models import Group, Post
+
+try:
+    import jinja2.environment
+except ImportError:
+    jinja2 = None
+
+User = get_user_model()
+
+
+def squeeze(html):
+    """HTML без различий в пробелах между тегами."""
+    html = re.sub(r'\s+<', '<', re.sub(r'>\s+', '>', html))
+    return ' '.join(html.split())
+
+
+@unittest.skipUnless(jinja2, 'Jinja2 не установлен')
+class Jinja2TemplatesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='Batman',
+            first_name='Брюс',
+        )
+        cls.group = Group.objects.create(title='Готэм', slug='gotham')
+        for number in range(12):
+            Post.objects.create(
+                author=cls.user,
+                text=f'<b>Пост</b> {number}\nвторая строка',
+                group=cls.group if number % 2 else None,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def test_switch_per_template(self):
+        """Jinja2 рендерит только шаблоны из JINJA2_TEMPLATES."""
+        names = ('posts/index.html', 'posts/profile.html')
+        with override_settings(JINJA2_TEMPLATES=('posts/index.html',)):
+            backends = [get_template(name).backend.name for name in names]
+        self.assertEqual(backends, ['jinja2', 'django'])
+
+    def test_ported_templates_match(self):
+        """Перенесённые шаблоны дают ту же разметку, что и шаблоны Django."""
+        for name, context in Command().cases(self.request):
+            with self.subTest(name=name):
+                cache.clear()
+                expected = engines['django'].get_template(name).render(
+                    context,
+                    self.request,
+                )
+                cache.clear()
+                rendered = engines['jinja2'].load(name).render(
+                    context,
+                    self.request,
+                )
+                self.assertEqual(squeeze(rendered), squeeze(expected))
+
+    @override_settings(
+        JINJA2_TEMPLATES=(
+            'posts/follow.html',
+            'posts/includes/feed_card.html',
+            'posts/includes/feed_fragment.html',
+        ),
+    )
+    def test_pages_with_jinja2(self):
+        reader = User.objects.create_user(username='Robin')
+        reader.follower.create(author=self.user)
+        client = Client()
+        client.force_login(reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'data-post-id', count=10)
+        self.assertContains(response, '&lt;b&gt;Пост&lt;/b&gt; 11<br>')
+        self.assertContains(response, 'data-next-page="2"')
+        response = client.get(reverse('posts:follow_fragment'), {'page': 2})
+        self.assertContains(response, 'data-post-id', count=2)
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('bench_templates', repeat=1, stdout=out)
+        for name in ('feed_card.html', 'index.html', 'profile.html'):
+            self.assertIn(name, out.getvalue())
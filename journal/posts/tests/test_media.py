@@ -0,0 +1,195 @@
+import os
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from core.storage import is_sharded, shard_name
+from posts.forms import PostForm
+from posts.images import EXIF_ORIENTATION, ingest_image
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ShardedStorageTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Batman')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_shard_name(self):
+        """Имя файла раскладывается по двум уровням подкаталогов."""
+        name = shard_name('posts/cat.jpg')
+        dirname, filename = os.path.split(name)
+        self.assertEqual(filename, 'cat.jpg')
+        self.assertEqual(len(name.split('/')), 4)
+        self.assertTrue(is_sharded(name))
+        self.assertFalse(is_sharded('posts/cat.jpg'))
+        self.assertTrue(name.startswith('posts/'))
+
+    def test_same_names_spread_across_shards(self):
+        """Одинаковые имена файлов не скапливаются в одном шарде."""
+        dirs = {
+            os.path.dirname(shard_name('posts/image.jpg')) for _ in range(20)
+        }
+        self.assertGreater(len(dirs), 1)
+
+    def test_upload_goes_to_shard(self):
+        """Загруженная картинка поста сохраняется в подкаталог шарда."""
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=ContentFile(b'gif', name='small.gif'),
+        )
+        self.assertTrue(is_sharded(post.image.name))
+        self.assertTrue(post.image.name.endswith('/small.gif'))
+        self.assertTrue(os.path.isfile(post.image.path))
+
+    def test_shard_media_command(self):
+        """Команда переносит плоские файлы и переписывает Post.image."""
+        flat_name = default_storage.save('posts/old.gif', ContentFile(b'gif'))
+        post = Post.objects.create(author=self.user, text='Старый пост')
+        Post.objects.filter(pk=post.pk).update(image=flat_name)
+
+        call_command('shard_media', batch_size=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        self.assertTrue(is_sharded(post.image.name))
+        self.assertTrue(post.image.name.endswith('/old.gif'))
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertFalse(default_storage.exists(flat_name))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GarbageCollectMediaTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Batman')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def save_file(self, name, age_hours):
+        name = default_storage.save(name, ContentFile(b'gif'))
+        mtime = time.time() - age_hours * 3600
+        os.utime(default_storage.path(name), (mtime, mtime))
+        return name
+
+    def test_gc_removes_only_old_orphans(self):
+        """Удаляются только старые файлы, на которые нет ссылок."""
+        post = Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=ContentFile(b'gif', name='kept.gif'),
+        )
+        old_orphan = self.save_file(shard_name('posts/old.gif'), 48)
+        young_orphan = self.save_file(shard_name('posts/young.gif'), 1)
+
+        call_command('gc_media', dry_run=True, stdout=StringIO())
+        self.assertTrue(default_storage.exists(old_orphan))
+
+        call_command('gc_media', stdout=StringIO())
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertTrue(default_storage.exists(young_orphan))
+        self.assertFalse(default_storage.exists(old_orphan))
+
+    def save_image(self, name):
+        file = BytesIO()
+        Image.new('RGB', (40, 20)).save(file, 'PNG')
+        return default_storage.save(name, ContentFile(file.getvalue()))
+
+    def save_thumbnail(self, source_name, name):
+        """Миниатюра с записями в хранилище ключей, как у sorl."""
+        source = ImageFile(source_name, default_storage)
+        thumbnail = ImageFile(self.save_image(name), default_storage)
+        default.kvstore.set(source)
+        default.kvstore.set(thumbnail, source)
+        return thumbnail
+
+    def test_gc_removes_orphaned_thumbnail(self):
+        """Старый файл миниатюры без записи в хранилище ключей удаляется."""
+        source = self.save_image(shard_name('posts/cat.png'))
+        thumbnail = self.save_thumbnail(source, 'cache/aa/bb/cat.png').name
+        orphan = self.save_file('cache/00/00/orphan.png', 48)
+
+        call_command('gc_media', stdout=StringIO())
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(thumbnail))
+
+    def test_gc_removes_thumbnails_of_missing_source(self):
+        """Миниатюры удалённого исходника удаляются вместе с записями."""
+        source = self.save_image(shard_name('posts/dog.png'))
+        Post.objects.create(author=self.user, text='Пост', image=source)
+        thumbnail = self.save_thumbnail(source, 'cache/cc/dd/dog.png')
+        default_storage.delete(source)
+
+        call_command('gc_media', chunk_size=1, stdout=StringIO())
+        self.assertFalse(default_storage.exists(thumbnail.name))
+        self.assertIsNone(default.kvstore.get(thumbnail))
+        self.assertIsNone(
+            default.kvstore.get(ImageFile(source, default_storage)),
+        )
+
+
+class IngestImageTest(TestCase):
+    def upload(self, image, image_format='JPEG', **options):
+        file = BytesIO()
+        image.save(file, image_format, **options)
+        return SimpleUploadedFile(
+            'photo.jpg',
+            file.getvalue(),
+            content_type='image/jpeg',
+        )
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_large_image_downscaled(self):
+        """Крупная картинка уменьшается до IMAGE_MAX_SIDE."""
+        result = ingest_image(self.upload(Image.new('RGB', (400, 200))))
+        self.assertEqual(Image.open(result).size, (100, 50))
+
+    def test_exif_orientation_applied_and_stripped(self):
+        """Картинка поворачивается по EXIF, метаданные удаляются."""
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = 6
+        result = ingest_image(
+            self.upload(Image.new('RGB', (40, 20)), exif=exif.tobytes()),
+        )
+        stored = Image.open(result)
+        self.assertEqual(stored.size, (20, 40))
+        self.assertFalse(stored.getexif())
+
+    def test_small_image_kept_as_is(self):
+        """Небольшая картинка без EXIF не пересохраняется."""
+        upload = self.upload(Image.new('RGB', (40, 20)))
+        self.assertIs(ingest_image(upload), upload)
+
+    @override_settings(IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Форма отклоняет картинку с чрезмерным числом пикселей."""
+        form = PostForm(
+            data={'text': 'Пост'},
+            files={'image': self.upload(Image.new('RGB', (20, 20)))},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
@@ -1,5 +1,8 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 
 from posts.models import Comment, Group, Post
 
@@ -50,6 +53,41 @@ class PostModelTest(TestCase):
                 )
 
 
+class PostRenderTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+
+    @override_settings(POST_EXCERPT_LENGTH=10)
+    def test_rendered_on_save(self):
+        """HTML и отрывок считаются при сохранении, текст экранируется."""
+        post = Post.objects.create(
+            author=self.user,
+            text='<b>Жирный</b>\nвторая строка',
+        )
+        post.refresh_from_db()
+        self.assertEqual(
+            post.text_html,
+            '&lt;b&gt;Жирный&lt;/b&gt;<br>вторая строка',
+        )
+        self.assertEqual(post.excerpt, '<b>Жирный…')
+        post.text = 'Новый'
+        post.save(update_fields=('text',))
+        post.refresh_from_db()
+        self.assertEqual((post.text_html, post.excerpt), ('Новый', 'Новый'))
+
+    def test_backfill(self):
+        """render_posts заполняет посты, сохранённые без HTML."""
+        post = Post.objects.create(author=self.user, text='Старый\nпост')
+        Post.objects.filter(pk=post.pk).update(text_html='', excerpt='')
+        out = StringIO()
+        call_command('render_posts', batch_size=1, stdout=out)
+        self.assertIn('Обработано постов: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'Старый<br>пост')
+        self.assertEqual(post.excerpt, 'Старый\nпост')
+
+
 class GroupModelTest(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -0,0 +1,117 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+from posts.unread import latest_post_id, mark_key, raise_marks
+
+User = get_user_model()
+
+
+class NewPostsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.batman = User.objects.create_user(username='Batman')
+        self.robin = User.objects.create_user(username='Robin')
+        self.group = Group.objects.create(title='Готэм', slug='gotham')
+        Follow.objects.create(user=self.batman, author=self.robin)
+        self.first = Post.objects.create(author=self.robin, text='Первый')
+        self.client = Client()
+        self.client.force_login(self.batman)
+
+    def new_posts(self, **params):
+        return self.client.get(reverse('posts:new_posts'), params)
+
+    def test_counts_per_feed(self):
+        """Счётчик учитывает только посты своей ленты."""
+        Post.objects.create(author=self.batman, text='Свой', group=self.group)
+        Post.objects.create(author=self.robin, text='Робин')
+        since = self.first.pk
+        for params, count in (
+            ({'feed': 'index'}, 2),
+            ({'feed': 'group', 'slug': 'gotham'}, 1),
+            ({'feed': 'follow'}, 1),
+        ):
+            with self.subTest(params=params):
+                response = self.new_posts(since=since, **params)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.json()['count'], count)
+
+    def test_marks_raised_on_save(self):
+        """Новый пост поднимает отметки, и ответ не ходит в базу."""
+        self.assertEqual(latest_post_id(), self.first.pk)
+        self.assertEqual(latest_post_id(group=self.group), 0)
+        self.assertEqual(
+            latest_post_id(authors=[self.robin.pk]),
+            self.first.pk,
+        )
+        post = Post.objects.create(
+            author=self.robin,
+            text='Новый',
+            group=self.group,
+        )
+        self.assertEqual(latest_post_id(), post.pk)
+        self.assertEqual(latest_post_id(group=self.group), post.pk)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.new_posts(feed='follow', since=post.pk)
+        self.assertFalse(
+            [query for query in queries if 'posts_post' in query['sql']],
+        )
+        self.assertEqual(
+            response.json(),
+            {'count': 0, 'more': False, 'latest': post.pk},
+        )
+
+    def test_lowered_mark_raised_again(self):
+        """Отметку, опущенную параллельным вызовом, поднимают обратно."""
+        latest_post_id()
+        post = Post.objects.create(author=self.robin, text='Новый')
+        # Вызов для первого поста прочитал старую отметку раньше и
+        # записал её уже после подъёма.
+        cache.set(mark_key('index'), self.first.pk)
+        raise_marks(self.first)
+        self.assertEqual(latest_post_id(), post.pk)
+
+    def test_deleted_posts_not_counted(self):
+        """Удалённый пост не попадает в счётчик, хоть отметка и выше."""
+        latest_post_id()
+        post = Post.objects.create(author=self.robin, text='Удалю')
+        self.client.force_login(self.robin)
+        self.client.post(reverse('posts:post_delete', args=(post.pk,)))
+        response = self.new_posts(since=self.first.pk)
+        self.assertEqual(response.json()['count'], 0)
+        self.assertEqual(response.json()['latest'], post.pk)
+
+    @override_settings(NEW_POSTS_MAX_COUNT=2)
+    def test_count_capped(self):
+        for number in range(3):
+            Post.objects.create(author=self.robin, text=f'Пост {number}')
+        response = self.new_posts(since=self.first.pk)
+        self.assertEqual(response.json()['count'], 2)
+        self.assertTrue(response.json()['more'])
+
+    def test_bad_requests(self):
+        self.assertEqual(
+            self.new_posts(since='abc').status_code,
+            HTTPStatus.BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.new_posts(since=0, feed='other').status_code,
+            HTTPStatus.BAD_REQUEST,
+        )
+        self.client.logout()
+        self.assertEqual(
+            self.new_posts(since=0, feed='follow').status_code,
+            HTTPStatus.FORBIDDEN,
+        )
+
+    def test_switcher_passes_cursor(self):
+        """Вкладки получают отметку текущей ленты для счётчика."""
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, f'data-latest="{self.first.pk}"')
+        self.assertContains(response, 'data-feed="follow"', count=2)
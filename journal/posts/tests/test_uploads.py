@@ -0,0 +1,124 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, Upload
+from posts.tests.common import image
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_UPLOAD_DIR = os.path.join(TEMP_MEDIA_ROOT, 'parts')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    CHUNKED_UPLOAD_DIR=TEMP_UPLOAD_DIR,
+)
+class ChunkedUploadTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='Batman')
+        cls.content = image().read()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def start(self, sha256=None):
+        response = self.authorized_client.post(
+            reverse('posts:upload_start'),
+            {
+                'filename': 'test.png',
+                'size': len(self.content),
+                'sha256': sha256 or hashlib.sha256(self.content).hexdigest(),
+            },
+        )
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        return response.json()['token']
+
+    def put(self, token, offset, data):
+        return self.authorized_client.put(
+            reverse('posts:upload_chunk', kwargs={'token': token})
+            + f'?offset={offset}',
+            data,
+            content_type='application/octet-stream',
+        )
+
+    def test_resumable_upload_creates_post(self):
+        """Загрузка по частям с повтором и создание поста по токену."""
+        token = self.start()
+        half = len(self.content) // 2
+        response = self.put(token, 0, self.content[:half])
+        self.assertEqual(response.json()['offset'], half)
+
+        response = self.put(token, 0, self.content[:half])
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        self.assertEqual(response.json()['offset'], half)
+
+        response = self.put(token, half, self.content[half:])
+        self.assertTrue(response.json()['completed'])
+
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': 'Пост из докачки', 'upload': token},
+        )
+        post = Post.objects.get(text='Пост из докачки')
+        self.assertTrue(post.image.name.endswith('test.png'))
+        self.assertFalse(Upload.objects.filter(token=token).exists())
+
+    def test_checksum_mismatch(self):
+        """Несовпадение контрольной суммы сбрасывает загрузку."""
+        token = self.start(sha256='0' * 64)
+        response = self.put(token, 0, self.content)
+        self.assertEqual(response.status_code, HTTPStatus.UNPROCESSABLE_ENTITY)
+        upload = Upload.objects.get(token=token)
+        self.assertFalse(upload.completed)
+        self.assertEqual(upload.received, 0)
+
+    def test_foreign_token_rejected(self):
+        """Чужой токен не прикрепляется к посту."""
+        token = self.start()
+        self.put(token, 0, self.content)
+        other = Client()
+        other.force_login(User.objects.create_user(username='Joker'))
+        response = other.post(
+            reverse('posts:post_create'),
+            {'text': 'Чужая картинка', 'upload': token},
+        )
+        self.assertIn('image', response.context['form'].errors)
+
+    def test_upload_file_closed_on_invalid_form(self):
+        """Файл загрузки закрывается, если форма не прошла проверку."""
+        token = self.start()
+        self.put(token, 0, self.content)
+        response = self.authorized_client.post(
+            reverse('posts:post_create'),
+            {'text': '', 'upload': token},
+        )
+        form = response.context['form']
+        self.assertIn('text', form.errors)
+        self.assertIsNone(form.upload_file)
+        self.assertTrue(Upload.objects.filter(token=token).exists())
+
+    def test_resend_after_lost_response(self):
+        """Повтор принятой части отклоняется, загрузка продолжается."""
+        token = self.start()
+        self.put(token, 0, self.content[:10])
+        self.put(token, 10, self.content[10:20])
+        response = self.put(token, 10, self.content[10:20])
+        self.assertEqual(response.status_code, HTTPStatus.CONFLICT)
+        response = self.put(token, 20, self.content[20:])
+        self.assertTrue(response.json()['completed'])
@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from posts.models import Follow, Post
+
+KEY_PREFIX = 'posts:latest'
+
+
+def mark_key(kind, pk=None):
+    if pk is None:
+        return f'{KEY_PREFIX}:{kind}'
+    return f'{KEY_PREFIX}:{kind}:{pk}'
+
+
+def feed_marks(kind, ids):
+    """Высшие id постов лент авторов или групп, недостающие — из базы.
+
+    Отметка, которой нет в кеше, ставится через add: если пост успели
+    опубликовать между запросом и записью, raise_marks уже поставил
+    отметку выше, и её нельзя перезаписать старым значением.
+    """
+    keys = {mark_key(kind, pk): pk for pk in ids}
+    found = cache.get_many(keys)
+    marks = {keys[key]: mark for key, mark in found.items()}
+    missing = [pk for key, pk in keys.items() if key not in found]
+    if missing:
+        computed = dict.fromkeys(missing, 0)
+        computed.update(
+            Post.objects.filter(**{f'{kind}_id__in': missing})
+            .order_by()
+            .values_list(f'{kind}_id')
+            .annotate(Max('pk')),
+        )
+        for pk, mark in computed.items():
+            cache.add(mark_key(kind, pk), mark, settings.NEW_POSTS_TIMEOUT)
+        marks.update(computed)
+    return marks
+
+
+def latest_post_id(group=None, authors=None):
+    """Высший id поста общей ленты, группы или ленты подписок.
+
+    Это отметка сверху: после удаления поста она не опускается, и
+    тогда точный ответ даёт count_new_posts.
+    """
+    if group is not None:
+        return feed_marks('group', [group.pk])[group.pk]
+    if authors is not None:
+        return max(feed_marks('author', authors).values(), default=0)
+    mark = cache.get(mark_key('index'))
+    if mark is None:
+        mark = Post.objects.aggregate(mark=Max('pk'))['mark'] or 0
+        cache.add(mark_key('index'), mark, settings.NEW_POSTS_TIMEOUT)
+    return mark
+
+
+def raise_marks(post):
+    """Поднимает отметки лент, в которые попал пост.
+
+    get_many и set_many не атомарны: параллельный вызов для более
+    старого поста может записать отметку ниже уже поднятой. Поэтому
+    отметка берётся из базы, и проход повторяется, пока что-то
+    записывается: последний записавший перечитывает базу уже после
+    своей записи и возвращает отметку наверх.
+
+    Отсутствующие отметки не ставятся: их посчитает feed_marks.
+    """
+    feeds = {
+        mark_key('index'): Post.objects.all(),
+        mark_key('author', post.author_id): Post.objects.filter(
+            author_id=post.author_id,
+        ),
+    }
+    if post.group_id is not None:
+        feeds[mark_key('group', post.group_id)] = Post.objects.filter(
+            group_id=post.group_id,
+        )
+    while True:
+        higher = {}
+        for key, mark in cache.get_many(feeds).items():
+            latest = feeds[key].aggregate(mark=Max('pk'))['mark'] or 0
+            if mark < latest:
+                higher[key] = latest
+        if not higher:
+            return
+        cache.set_many(higher, settings.NEW_POSTS_TIMEOUT)
+
+
+def post_saved(sender, instance, raw=False, **kwargs):
+    """Подключается к post_save модели Post в PostsConfig.ready().
+
+    Отметки поднимаются после фиксации, иначе клиент узнал бы
+    о новом посте раньше, чем тот станет виден в ленте.
+    """
+    if not raw and not instance.is_deleted:
+        transaction.on_commit(lambda: raise_marks(instance))
+
+
+def follow_authors(user):
+    return list(
+        Follow.objects.cached()
+        .filter(user=user)
+        .values_list('author_id', flat=True),
+    )
+
+
+def count_new_posts(since, group=None, authors=None):
+    """Число постов ленты новее since, но не больше NEW_POSTS_MAX_COUNT + 1.
+
+    Если отметка ленты не выше since, база не нужна вовсе; иначе
+    считаются только посты с id больше since.
+
+    Returns:
+    Пару (число постов, отметка ленты).
+    """
+    latest = latest_post_id(group=group, authors=authors)
+    if latest <= since:
+        return 0, latest
+    posts = Post.objects.filter(pk__gt=since)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if authors is not None:
+        posts = posts.filter(author_id__in=authors)
+    count = posts.order_by()[: settings.NEW_POSTS_MAX_COUNT + 1].count()
+    return count, latest
@@ -3,29 +3,49 @@ from django.urls import path
 from posts.apps import PostsConfig
 from posts.views import (
     add_comment,
+    follow_fragment,
     follow_index,
+    group_fragment,
     group_posts,
     index,
+    index_fragment,
+    new_posts,
     post_create,
     post_delete,
     post_detail,
     post_edit,
     profile,
     profile_follow,
+    profile_fragment,
     profile_unfollow,
+    upload_chunk,
+    upload_start,
 )
 
 app_name = PostsConfig.name
 
 urlpatterns = [
     path('', index, name='index'),
+    path('fragment/', index_fragment, name='index_fragment'),
     path('create/', post_create, name='post_create'),
     path('group/<slug:slug>/', group_posts, name='group_list'),
+    path(
+        'group/<slug:slug>/fragment/',
+        group_fragment,
+        name='group_fragment',
+    ),
     path('posts/<int:post_id>/', post_detail, name='post_detail'),
     path('posts/<post_id>/edit/', post_edit, name='post_edit'),
     path('profile/<str:username>/', profile, name='profile'),
+    path(
+        'profile/<str:username>/fragment/',
+        profile_fragment,
+        name='profile_fragment',
+    ),
     path('posts/<int:post_id>/comment/', add_comment, name='add_comment'),
     path('follow/', follow_index, name='follow_index'),
+    path('follow/fragment/', follow_fragment, name='follow_fragment'),
+    path('new/', new_posts, name='new_posts'),
     path(
         'profile/<str:username>/follow/',
         profile_follow,
@@ -37,4 +57,6 @@ urlpatterns = [
         name='profile_unfollow',
     ),
     path('delete/<post_id>/', post_delete, name='post_delete'),
+    path('uploads/', upload_start, name='upload_start'),
+    path('uploads/<uuid:token>/', upload_chunk, name='upload_chunk'),
 ]
@@ -1,24 +1,131 @@
+import hashlib
 import os
+import uuid
+from http import HTTPStatus
 
 from django.conf import settings
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_GET, require_http_methods
 
+from core.routers import replica_reads
+from core.writer import WriteTimeout, run_write
+from events.outbox import emit
+from posts.archive import ArchivedFeed, archived_post
+from posts.cards import render_cards
+from posts.events import (
+    COMMENT_ADDED,
+    FOLLOWED,
+    POST_CREATED,
+    POST_DELETED,
+    POST_EDITED,
+    UNFOLLOWED,
+)
 from posts.forms import CommentForm, PostForm
-from posts.models import Follow, Group, Post
+from posts.identity import group_by_slug, user_by_username
+from posts.models import Follow, Post, Upload
+from posts.unread import count_new_posts, follow_authors, latest_post_id
 
-User = get_user_model()
 
+INDEX_VERSION_KEY = 'posts:index_version'
 
+
+def index_version():
+    """Версия ленты index для ключа кеша её фрагмента.
+
+    Фрагмент кешируется на 20 секунд; удаление поста меняет версию,
+    чтобы удалённый пост не оставался на главной всё это время.
+    """
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is not None:
+        return version
+    cache.add(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+    return cache.get(INDEX_VERSION_KEY)
+
+
+def bump_index_version():
+    cache.set(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def index_feed():
+    return ArchivedFeed(
+        Post.objects.cached()
+        .select_related('author', 'group')
+        .prefetch_related('comments')
+        .defer('text'),
+    )
+
+
+def group_feed(group):
+    return ArchivedFeed(
+        group.groups.cached()
+        .select_related('author', 'group')
+        .prefetch_related('comments')
+        .defer('text'),
+        group_id=group.pk,
+    )
+
+
+def profile_feed(author):
+    return ArchivedFeed(
+        author.posts.cached()
+        .select_related('author', 'group')
+        .prefetch_related('comments')
+        .defer('text'),
+        author_id=author.pk,
+    )
+
+
+def follow_feed(user, authors):
+    return ArchivedFeed(
+        Post.objects.cached()
+        .filter(author__following__user=user)
+        .select_related('author', 'group')
+        .prefetch_related('comments')
+        .defer('text'),
+        author_id=authors,
+    )
+
+
+def feed_fragment(request, post_list, hide_group=False):
+    """Следующая порция карточек ленты для бесконечной прокрутки.
+
+    Отдаётся только HTML карточек без base.html и пагинатора; номер
+    следующей страницы — в заголовке X-Next-Page, его нет на последней.
+    Число постов в ленте не считается: берётся один лишний пост.
+    """
+    try:
+        number = int(request.GET.get('page', 1))
+    except ValueError:
+        number = 0
+    if number < 1:
+        return HttpResponseBadRequest('Нужен номер страницы.')
+    start = (number - 1) * settings.COUNT_ENTRY
+    posts = post_list[start:start + settings.COUNT_ENTRY + 1]
+    page = posts[: settings.COUNT_ENTRY]
+    response = render(
+        request,
+        'posts/includes/feed_fragment.html',
+        {
+            'posts': page,
+            'cards': render_cards(request.user, page, hide_group),
+        },
+    )
+    if len(posts) > settings.COUNT_ENTRY:
+        response['X-Next-Page'] = number + 1
+    return response
+
+
+@replica_reads
 def index(request):
-    post_list = Post.objects.select_related(
-        'author', 'group'
-    ).prefetch_related('comments')
-    paginator = Paginator(post_list, settings.COUNT_ENTRY)
+    paginator = Paginator(index_feed(), settings.COUNT_ENTRY)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return render(
@@ -26,14 +133,23 @@ def index(request):
         'posts/index.html',
         context={
             'page_obj': page_obj,
+            'cards': render_cards(request.user, page_obj),
+            'index_version': index_version(),
+            'latest_post_id': latest_post_id(),
+            'poll_interval': settings.NEW_POSTS_POLL_INTERVAL,
         },
     )
 
 
+@replica_reads
+def index_fragment(request):
+    return feed_fragment(request, index_feed())
+
+
+@replica_reads
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.groups.all()
-    paginator = Paginator(post_list, settings.COUNT_ENTRY)
+    group = group_by_slug.get_or_404(slug)
+    paginator = Paginator(group_feed(group), settings.COUNT_ENTRY)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return render(
@@ -41,42 +157,62 @@ def group_posts(request, slug):
         'posts/group_list.html',
         {
             'page_obj': page_obj,
+            'cards': render_cards(request.user, page_obj, hide_group=True),
             'group': group,
         },
     )
 
 
+@replica_reads
+def group_fragment(request, slug):
+    group = group_by_slug.get_or_404(slug)
+    return feed_fragment(request, group_feed(group), hide_group=True)
+
+
+@replica_reads
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, settings.COUNT_ENTRY)
+    author = user_by_username.get_or_404(username)
+    paginator = Paginator(profile_feed(author), settings.COUNT_ENTRY)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     follow = False
     if request.user.is_authenticated and request.user != author:
-        follow = Follow.objects.filter(
-            user=request.user,
-            author=author,
-        ).exists()
+        follow = (
+            Follow.objects.cached()
+            .filter(
+                user=request.user,
+                author=author,
+            )
+            .exists()
+        )
 
     return render(
         request,
         'posts/profile.html',
         context={
             'page_obj': page_obj,
+            'cards': render_cards(request.user, page_obj),
             'author': author,
             'following': follow,
         },
     )
 
 
+@replica_reads
+def profile_fragment(request, username):
+    author = user_by_username.get_or_404(username)
+    return feed_fragment(request, profile_feed(author))
+
+
 def post_detail(request, post_id):
-    post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
-        id=post_id,
-    )
+    try:
+        post = Post.objects.select_related('author', 'group').get(id=post_id)
+    except Post.DoesNotExist:
+        post = archived_post(post_id)
+        if post is None:
+            raise Http404
     form = CommentForm(request.POST or None)
-    if request.user.id == post.author.id:
+    if request.user.id == post.author.id and not post.archived:
         return render(
             request,
             'posts/post_detail.html',
@@ -97,15 +233,84 @@ def post_detail(request, post_id):
     )
 
 
+@transaction.atomic
+def save_post(post):
+    created = post.pk is None
+    post.save()
+    emit(
+        POST_CREATED if created else POST_EDITED,
+        post_id=post.pk,
+        author_id=post.author_id,
+        group_id=post.group_id,
+        image=post.image.name or '',
+    )
+
+
+@transaction.atomic
+def delete_post(post):
+    Post.objects.filter(pk=post.pk).update(
+        is_deleted=True,
+        deleted_at=timezone.now(),
+    )
+    emit(POST_DELETED, post_id=post.pk, author_id=post.author_id)
+    transaction.on_commit(bump_index_version)
+
+
+@transaction.atomic
+def save_comment(comment):
+    comment.save()
+    emit(
+        COMMENT_ADDED,
+        comment_id=comment.pk,
+        post_id=comment.post_id,
+        author_id=comment.author_id,
+    )
+
+
+@transaction.atomic
+def follow(user, author):
+    _, created = Follow.objects.get_or_create(user=user, author=author)
+    if created:
+        emit(FOLLOWED, user_id=user.pk, author_id=author.pk)
+
+
+@transaction.atomic
+def unfollow(subscription):
+    subscription.delete()
+    emit(
+        UNFOLLOWED,
+        user_id=subscription.user_id,
+        author_id=subscription.author_id,
+    )
+
+
 @login_required
 def post_create(request):
-    form = PostForm(request.POST, files=request.FILES or None)
+    form = PostForm(
+        request.POST,
+        files=request.FILES or None,
+        user=request.user,
+    )
     if not form.is_valid():
         return render(request, 'posts/create_post.html', {'form': form})
 
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    if post.image and not post.image._committed:
+        # Файл пишется здесь, чтобы писатель очереди занимался только строкой.
+        post.image.save(post.image.name, post.image.file, save=False)
+    try:
+        run_write(save_post, post)
+    except WriteTimeout:
+        form.close_upload()
+        form.add_error(None, 'Сервис перегружен, попробуйте ещё раз.')
+        return render(
+            request,
+            'posts/create_post.html',
+            {'form': form},
+            status=HTTPStatus.SERVICE_UNAVAILABLE,
+        )
+    form.discard_upload()
     return redirect('posts:profile', post.author)
 
 
@@ -116,10 +321,12 @@ def post_edit(request, post_id):
         request.POST or None,
         files=request.FILES or None,
         instance=post,
+        user=request.user,
     )
     if request.user == post.author:
         if form.is_valid():
-            form.save()
+            save_post(form.save(commit=False))
+            form.discard_upload()
             return redirect(
                 'posts:post_detail',
                 post_id,
@@ -143,16 +350,18 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = get_object_or_404(Post, id=post_id)
-        comment.save()
+        run_write(save_comment, comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    post_list = Post.objects.filter(
-        author__following__user=request.user,
-    ).select_related('author', 'group')
-    paginator = Paginator(post_list, settings.COUNT_ENTRY)
+    authors = follow_authors(request.user)
+    paginator = Paginator(
+        follow_feed(request.user, authors),
+        settings.COUNT_ENTRY,
+    )
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
@@ -161,26 +370,82 @@ def follow_index(request):
         'posts/follow.html',
         context={
             'page_obj': page_obj,
+            'cards': render_cards(request.user, page_obj),
+            'latest_post_id': latest_post_id(authors=authors),
+            'poll_interval': settings.NEW_POSTS_POLL_INTERVAL,
+        },
+    )
+
+
+@login_required
+@replica_reads
+def follow_fragment(request):
+    authors = follow_authors(request.user)
+    return feed_fragment(request, follow_feed(request.user, authors))
+
+
+@require_GET
+@cache_control(private=True, max_age=settings.NEW_POSTS_POLL_INTERVAL)
+@replica_reads
+def new_posts(request):
+    """Сколько в ленте постов новее since.
+
+    Параметр feed — index, group (со slug) или follow. Ответ берётся
+    из отметок последних постов в кеше, так что частые опросы почти
+    не нагружают базу.
+    """
+    try:
+        since = int(request.GET.get('since', ''))
+    except ValueError:
+        return JsonResponse(
+            {'error': 'Нужен числовой параметр since.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+    feed = request.GET.get('feed', 'index')
+    if feed == 'index':
+        count, latest = count_new_posts(since)
+    elif feed == 'group':
+        group = group_by_slug.get_or_404(request.GET.get('slug', ''))
+        count, latest = count_new_posts(since, group=group)
+    elif feed == 'follow':
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'error': 'Лента подписок доступна только после входа.'},
+                status=HTTPStatus.FORBIDDEN,
+            )
+        authors = follow_authors(request.user)
+        count, latest = count_new_posts(since, authors=authors)
+    else:
+        return JsonResponse(
+            {'error': f'Неизвестная лента: {feed}.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+    return JsonResponse(
+        {
+            'count': min(count, settings.NEW_POSTS_MAX_COUNT),
+            'more': count > settings.NEW_POSTS_MAX_COUNT,
+            'latest': latest,
         },
     )
 
 
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = user_by_username.get_or_404(username)
     if request.user != author:
-        Follow.objects.get_or_create(user=request.user, author=author)
+        run_write(follow, request.user, author)
         return redirect('posts:profile', author)
     return redirect('posts:profile', author)
 
 
 @login_required
 def profile_unfollow(request, username):
-    get_object_or_404(
+    subscription = get_object_or_404(
         Follow,
         user=request.user,
-        author__username=username,
-    ).delete()
+        author=user_by_username.get_or_404(username),
+    )
+    run_write(unfollow, subscription)
     return redirect('posts:profile', username)
 
 
@@ -189,15 +454,124 @@ def post_delete(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id=post_id)
+    # Пост только помечается удалённым и сразу пропадает из лент;
+    # комментарии и картинку позже вычищает purge_posts.
+    run_write(delete_post, post)
     back_point = request.META.get('HTTP_REFERER')
-    post.delete()
-    if post.image:
-        if os.path.isfile(post.image.path):
-            os.remove(post.image.path)
-    if (f'posts/{post_id}/') not in back_point:
-        cache.clear()
+    if back_point and f'posts/{post_id}/' not in back_point:
         return redirect(back_point)
     return redirect(
         'posts:profile',
         username=request.user.username,
     )
+
+
+def upload_state(upload):
+    return {
+        'token': upload.token,
+        'offset': upload.received,
+        'size': upload.size,
+        'completed': upload.completed,
+    }
+
+
+@login_required
+@require_http_methods(['POST'])
+def upload_start(request):
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        size = -1
+    filename = os.path.basename(request.POST.get('filename', ''))
+    sha256 = request.POST.get('sha256', '').lower()
+    if (
+        not filename
+        or len(sha256) != 64
+        or not 0 < size <= settings.CHUNKED_UPLOAD_MAX_SIZE
+    ):
+        return JsonResponse(
+            {'error': 'Нужны filename, size и sha256.'},
+            status=HTTPStatus.BAD_REQUEST,
+        )
+    upload = Upload.objects.create(
+        user=request.user,
+        filename=filename[:255],
+        size=size,
+        sha256=sha256,
+    )
+    return JsonResponse(upload_state(upload), status=HTTPStatus.CREATED)
+
+
+def write_chunk(request, upload, offset):
+    """Пишет тело запроса в файл загрузки начиная с offset.
+
+    Returns:
+    Смещение за последним записанным байтом.
+    """
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    received = offset
+    # Без O_TRUNC: файл могут одновременно дописывать другие запросы.
+    fd = os.open(upload.path, os.O_WRONLY | os.O_CREAT, 0o600)
+    with os.fdopen(fd, 'wb') as part:
+        part.seek(offset)
+        while received < upload.size:
+            data = request.read(min(64 * 1024, upload.size - received))
+            if not data:
+                break
+            part.write(data)
+            received += len(data)
+    return received
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as part:
+        for block in iter(lambda: part.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def upload_chunk(request, token):
+    """Принимает очередную часть загрузки или сообщает, с какого места
+    продолжить.
+
+    Часть пишется в файл по своему смещению, а полученный объём
+    сдвигается условным UPDATE только если его никто не сдвинул раньше.
+    Поэтому повтор после обрыва и параллельные запросы безопасны:
+    проигравший получает 409, а байты по одному смещению всегда одни и те же.
+    """
+    upload = get_object_or_404(Upload, token=token, user=request.user)
+    if request.method == 'GET' or upload.completed:
+        return JsonResponse(upload_state(upload))
+
+    try:
+        offset = int(request.GET.get('offset', ''))
+    except ValueError:
+        offset = -1
+    if offset != upload.received:
+        return JsonResponse(upload_state(upload), status=HTTPStatus.CONFLICT)
+
+    received = write_chunk(request, upload, offset)
+    claimed = Upload.objects.filter(
+        pk=upload.pk,
+        received=offset,
+        completed=False,
+    ).update(received=received)
+    upload.refresh_from_db()
+    if not claimed:
+        return JsonResponse(upload_state(upload), status=HTTPStatus.CONFLICT)
+
+    if received == upload.size:
+        if file_sha256(upload.path) != upload.sha256:
+            Upload.objects.filter(pk=upload.pk, received=received).update(
+                received=0,
+            )
+            return JsonResponse(
+                {'error': 'Контрольная сумма не совпала.'},
+                status=HTTPStatus.UNPROCESSABLE_ENTITY,
+            )
+        Upload.objects.filter(pk=upload.pk).update(completed=True)
+        upload.completed = True
+    return JsonResponse(upload_state(upload))
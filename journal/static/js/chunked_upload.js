@@ -0,0 +1,80 @@
+// Крупные картинки загружаются по частям с докачкой после обрыва.
+// Форма поста затем ссылается на готовую загрузку по токену.
+(function () {
+  var script = document.currentScript;
+  var startUrl = script.dataset.startUrl;
+  var chunkSize = 1024 * 1024;
+  var form = script.parentNode.querySelector('form');
+  var input = form.querySelector('input[type=file]');
+  var tokenInput = form.querySelector('input[name=upload]');
+  var csrf = form.querySelector('input[name=csrfmiddlewaretoken]').value;
+  var submit = form.querySelector('button[type=submit]');
+
+  function hex(buffer) {
+    return Array.prototype.map.call(new Uint8Array(buffer), function (b) {
+      return ('0' + b.toString(16)).slice(-2);
+    }).join('');
+  }
+
+  function request(method, url, body) {
+    return fetch(url, {
+      method: method,
+      body: body,
+      credentials: 'same-origin',
+      headers: {'X-CSRFToken': csrf},
+    }).then(function (response) { return response.json(); });
+  }
+
+  function sendFrom(file, state, attempt) {
+    if (state.completed) {
+      return Promise.resolve(state);
+    }
+    var url = startUrl + state.token + '/';
+    var chunk = file.slice(state.offset, state.offset + chunkSize);
+    return request('PUT', url + '?offset=' + state.offset, chunk)
+      .then(function (next) {
+        if (next.error) {
+          throw new Error(next.error);
+        }
+        return sendFrom(file, next, 0);
+      })
+      .catch(function (error) {
+        if (attempt >= 5) {
+          throw error;
+        }
+        return new Promise(function (resolve) {
+          setTimeout(resolve, 1000 * Math.pow(2, attempt));
+        }).then(function () {
+          return request('GET', url);
+        }).then(function (current) {
+          return sendFrom(file, current, attempt + 1);
+        });
+      });
+  }
+
+  input.addEventListener('change', function () {
+    var file = input.files[0];
+    if (!file || file.size <= chunkSize || !window.crypto.subtle) {
+      return;
+    }
+    submit.disabled = true;
+    file.arrayBuffer()
+      .then(function (buffer) { return crypto.subtle.digest('SHA-256', buffer); })
+      .then(function (digest) {
+        var data = new FormData();
+        data.append('filename', file.name);
+        data.append('size', file.size);
+        data.append('sha256', hex(digest));
+        return request('POST', startUrl, data);
+      })
+      .then(function (state) { return sendFrom(file, state, 0); })
+      .then(function (state) {
+        tokenInput.value = state.token;
+        input.value = '';
+      })
+      .catch(function () {
+        tokenInput.value = '';
+      })
+      .finally(function () { submit.disabled = false; });
+  });
+})();
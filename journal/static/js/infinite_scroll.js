@@ -0,0 +1,87 @@
+// Бесконечная прокрутка ленты: следующая страница подгружается
+// фрагментом с одними карточками постов. Без JS остаётся пагинатор.
+(function () {
+  var script = document.currentScript;
+  var feed = script.parentNode.querySelector('[data-feed-posts]');
+  if (!feed || !window.IntersectionObserver) {
+    return;
+  }
+  var url = feed.dataset.fragmentUrl;
+  var next = feed.dataset.nextPage;
+  var paginator = feed.nextElementSibling;
+  var sentinel = document.createElement('div');
+  var loading = false;
+
+  if (paginator && paginator.tagName === 'NAV') {
+    paginator.hidden = true;
+  }
+  feed.after(sentinel);
+
+  function seen() {
+    var ids = {};
+    feed.querySelectorAll('[data-post-id]').forEach(function (post) {
+      ids[post.dataset.postId] = true;
+    });
+    return ids;
+  }
+
+  function append(html) {
+    // Пока читали ленту, сверху могли появиться посты и сдвинуть
+    // страницы: уже показанные карточки пропускаем.
+    var ids = seen();
+    var batch = document.createElement('template');
+    batch.innerHTML = html;
+    batch.content.querySelectorAll('[data-post-id]').forEach(function (post) {
+      if (ids[post.dataset.postId]) {
+        var rule = post.previousElementSibling;
+        if (rule && rule.tagName === 'HR') {
+          rule.remove();
+        }
+        post.remove();
+      }
+    });
+    feed.appendChild(batch.content);
+  }
+
+  function load() {
+    if (loading || !next) {
+      return;
+    }
+    loading = true;
+    fetch(url + '?page=' + next, {credentials: 'same-origin'})
+      .then(function (response) {
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        next = response.headers.get('X-Next-Page');
+        return response.text();
+      })
+      .then(function (html) {
+        append(html);
+        loading = false;
+        observer.unobserve(sentinel);
+        if (next) {
+          // Если конец ленты всё ещё виден, наблюдатель сработает снова.
+          observer.observe(sentinel);
+        } else {
+          sentinel.remove();
+        }
+      })
+      .catch(function () {
+        // Не вышло: возвращаем обычный пагинатор.
+        observer.disconnect();
+        if (paginator) {
+          paginator.hidden = false;
+        }
+      });
+  }
+
+  var observer = new IntersectionObserver(function (entries) {
+    if (entries[0].isIntersecting) {
+      load();
+    }
+  }, {rootMargin: '600px'});
+  if (next) {
+    observer.observe(sentinel);
+  }
+})();
@@ -0,0 +1,58 @@
+// Счётчики новых постов на вкладках лент. Для каждой ленты в браузере
+// запоминается последний виденный пост, а сервер отвечает, сколько
+// постов новее него, по отметкам в кеше.
+(function () {
+  var script = document.currentScript;
+  var url = script.dataset.url;
+  var poll = (parseInt(script.dataset.poll, 10) || 30) * 1000;
+  var tabs = script.parentNode.querySelector('.nav-tabs');
+
+  function key(feed) {
+    return 'new-posts:' + feed;
+  }
+
+  function store(feed, latest) {
+    try {
+      window.localStorage.setItem(key(feed), latest);
+    } catch (error) {
+      // Хранилище недоступно: счётчики просто не покажутся.
+    }
+  }
+
+  function seen(feed) {
+    try {
+      return window.localStorage.getItem(key(feed));
+    } catch (error) {
+      return null;
+    }
+  }
+
+  function update(badge) {
+    var since = seen(badge.dataset.feed);
+    if (since === null) {
+      return;
+    }
+    var query = '?feed=' + badge.dataset.feed + '&since=' + since;
+    fetch(url + query, {credentials: 'same-origin'})
+      .then(function (response) { return response.json(); })
+      .then(function (state) {
+        badge.hidden = !state.count;
+        badge.textContent = state.count + (state.more ? '+' : '');
+      })
+      .catch(function () {});
+  }
+
+  function refresh() {
+    if (document.hidden) {
+      return;
+    }
+    tabs.querySelectorAll('[data-feed]').forEach(update);
+  }
+
+  if (script.dataset.latest) {
+    store(script.dataset.feed, script.dataset.latest);
+  }
+  refresh();
+  setInterval(refresh, poll);
+  document.addEventListener('visibilitychange', refresh);
+})();
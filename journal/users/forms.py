@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
+
+from users.tasks import send_password_reset
 
 User = get_user_model()
 
@@ -8,3 +10,27 @@ class CreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
         model = User
         fields = ('first_name', 'last_name', 'username', 'email')
+
+
+class DeferredPasswordResetForm(PasswordResetForm):
+    """Письмо со ссылкой сброса пароля собирает и шлёт очередь задач."""
+
+    def send_mail(
+        self,
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name=None,
+    ):
+        context = dict(context)
+        context['user_id'] = context.pop('user').pk
+        send_password_reset.defer(
+            subject_template_name,
+            email_template_name,
+            context,
+            from_email,
+            to_email,
+            html_email_template_name,
+        )
@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.forms import PasswordResetForm
+
+from jobs.queue import PRIORITY_HIGH, task
+
+User = get_user_model()
+
+
+@task(priority=PRIORITY_HIGH)
+def send_password_reset(
+    subject_template_name,
+    email_template_name,
+    context,
+    from_email,
+    to_email,
+    html_email_template_name=None,
+):
+    """Отправляет письмо, подготовленное DeferredPasswordResetForm."""
+    context = dict(context)
+    user = User.objects.filter(pk=context.pop('user_id')).first()
+    if user is None:
+        return
+    context['user'] = user
+    PasswordResetForm().send_mail(
+        subject_template_name,
+        email_template_name,
+        context,
+        from_email,
+        to_email,
+        html_email_template_name,
+    )
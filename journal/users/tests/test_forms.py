@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import TestCase
+from django.urls import reverse
+
+from jobs.models import Job
+from jobs.queue import claim, execute
+
+User = get_user_model()
+
+
+class PasswordResetTest(TestCase):
+    def test_reset_email_sent_by_worker(self):
+        """Письмо сброса пароля отправляет очередь, а не запрос."""
+        User.objects.create_user(
+            username='Batman',
+            email='batman@example.com',
+            password='secret',
+        )
+        response = self.client.post(
+            reverse('users:reset'),
+            {'email': 'batman@example.com'},
+        )
+        self.assertRedirects(response, reverse('users:reset_done'))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(
+            Job.objects.get().name,
+            'users.tasks.send_password_reset',
+        )
+
+        execute(claim())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['batman@example.com'])
+        self.assertIn('/auth/reset/', mail.outbox[0].body)
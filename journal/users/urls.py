@@ -11,6 +11,7 @@ from django.contrib.auth.views import (
 from django.urls import path
 
 from users import views
+from users.forms import DeferredPasswordResetForm
 
 app_name = 'users'
 
@@ -30,6 +31,7 @@ urlpatterns = [
         'password_reset/',
         PasswordResetView.as_view(
             template_name='users/password_reset_form.html',
+            form_class=DeferredPasswordResetForm,
         ),
         name='reset',
     ),